@@ -0,0 +1,218 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from mudream_deals import TDigest
+from mudream_snapshots import list_snapshots, open_text
+
+DAY = 86400
+
+
+def plan_shards(paths, shard_bytes):
+    """Split snapshot files into (path, start, end) byte ranges
+
+    Plain .jsonl files are cut at roughly shard_bytes; a shard starting
+    mid-line skips to the next line and one ending mid-line reads through
+    it, so every line is processed exactly once. Gzip files cannot be
+    seeked cheaply and are one shard each.
+    """
+    shards = []
+    for path in paths:
+        size = os.path.getsize(path)
+        if path.endswith('.gz') or size <= shard_bytes:
+            shards.append((path, 0, None))
+            continue
+        start = 0
+        while start < size:
+            end = min(size, start + shard_bytes)
+            shards.append((path, start, end if end < size else None))
+            start = end
+    return shards
+
+
+def iter_shard(path, start, end):
+    """Yield parsed rows whose line starts inside [start, end)"""
+    if path.endswith('.gz'):
+        with open_text(path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    with open(path, 'rb') as f:
+        if start:
+            f.seek(start - 1)
+            # Only skip ahead if start is not already at a line boundary
+            if f.read(1) != b"\n":
+                f.readline()
+        while True:
+            position = f.tell()
+            if end is not None and position >= end:
+                break
+            line = f.readline()
+            if not line:
+                break
+            if line.strip():
+                yield json.loads(line)
+
+
+def map_shard(args):
+    """Aggregate one shard into mergeable partial results"""
+    path, start, end, bucket_seconds, compression = args
+    buckets = {}
+    lots = {}
+    scans = {}
+    latest = 0.0
+
+    for row in iter_shard(path, start, end):
+        ts = row['ts']
+        latest = max(latest, ts)
+        key = (row['set'], row['piece'])
+        if 'id' not in row:
+            # Coverage row: the piece was scanned, possibly with no lots left
+            scans.setdefault(key, set()).add(ts)
+            continue
+        bucket = int(ts // bucket_seconds) * bucket_seconds
+
+        entry = buckets.get(key + (bucket,))
+        if entry is None:
+            entry = buckets[key + (bucket,)] = {'digest': TDigest(compression), 'listings': 0, 'scans': set()}
+        entry['listings'] += 1
+        entry['scans'].add(ts)
+        if row.get('value') is not None:
+            entry['digest'].add(row['value'])
+
+        scans.setdefault(key, set()).add(ts)
+
+        lot_key = key + (row['id'],)
+        seen = lots.get(lot_key)
+        if seen is None:
+            lots[lot_key] = [ts, ts]
+        else:
+            if ts < seen[0]:
+                seen[0] = ts
+            if ts > seen[1]:
+                seen[1] = ts
+
+    # Ship centroids, not digest objects, back to the parent
+    for entry in buckets.values():
+        digest = entry.pop('digest')
+        digest.compress()
+        entry['centroids'] = list(zip(digest.means, digest.counts))
+    return {'buckets': buckets, 'lots': lots, 'scans': scans, 'latest': latest}
+
+
+def reduce_partials(partials, compression):
+    """Merge shard partials into one aggregate"""
+    buckets = {}
+    lots = {}
+    scans = {}
+    latest = 0.0
+
+    for partial in partials:
+        latest = max(latest, partial['latest'])
+        for key, entry in partial['buckets'].items():
+            merged = buckets.get(key)
+            if merged is None:
+                merged = buckets[key] = {'digest': TDigest(compression), 'listings': 0, 'scans': set()}
+            merged['listings'] += entry['listings']
+            merged['scans'] |= entry['scans']
+            for mean, count in entry['centroids']:
+                merged['digest'].add(mean, count)
+        for key, (first, last) in partial['lots'].items():
+            seen = lots.get(key)
+            if seen is None:
+                lots[key] = [first, last]
+            else:
+                seen[0] = min(seen[0], first)
+                seen[1] = max(seen[1], last)
+        for key, timestamps in partial['scans'].items():
+            scans.setdefault(key, set()).update(timestamps)
+
+    return {'buckets': buckets, 'lots': lots, 'scans': scans, 'latest': latest}
+
+
+def build_trends(aggregate):
+    """Per-piece trend tables: price quantiles, listing volume and time-to-sell"""
+    trends = {}
+    for (set_name, piece, bucket), entry in sorted(aggregate['buckets'].items()):
+        digest = entry['digest']
+        series = trends.setdefault(f"{set_name}|{piece}", {'set': set_name, 'piece': piece, 'series': []})
+        series['series'].append({
+            'bucket': bucket,
+            'date': time.strftime("%Y-%m-%d %H:%M", time.localtime(bucket)),
+            'median': digest.quantile(0.5),
+            'p25': digest.quantile(0.25),
+            'p75': digest.quantile(0.75),
+            'listings': entry['listings'],
+            'avg_listings_per_scan': entry['listings'] / max(1, len(entry['scans']))
+        })
+
+    # A lot is counted as sold once it is missing from a later scan of its piece
+    durations = {}
+    latest_scan = {key: max(timestamps) for key, timestamps in aggregate['scans'].items() if timestamps}
+    for (set_name, piece, _), (first, last) in aggregate['lots'].items():
+        if latest_scan.get((set_name, piece), last) > last:
+            durations.setdefault(f"{set_name}|{piece}", []).append(last - first)
+
+    for key, series in trends.items():
+        sold = sorted(durations.get(key, []))
+        series['sold'] = len(sold)
+        series['median_hours_to_sell'] = sold[len(sold) // 2] / 3600 if sold else None
+    return trends
+
+
+def run_analytics(paths, workers=None, bucket_seconds=DAY, shard_bytes=32 * 1024 * 1024, compression=100):
+    """Map snapshot shards across a process pool and reduce them into trends"""
+    shards = plan_shards(paths, shard_bytes)
+    tasks = [(path, start, end, bucket_seconds, compression) for path, start, end in shards]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) <= 1:
+        partials = [map_shard(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(map_shard, tasks))
+
+    return build_trends(reduce_partials(partials, compression)), len(tasks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Price/volume trends from stored MuDream market snapshots")
+    parser.add_argument("paths", nargs="*", default=["snapshots"], help="Snapshot files or directories")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--bucket", choices=["hour", "day", "week"], default="day")
+    parser.add_argument("--shard-mb", type=float, default=32.0, help="Split large snapshot files into shards of this size")
+    parser.add_argument("--output", default="trends.json")
+    args = parser.parse_args(argv)
+
+    files = []
+    for path in args.paths:
+        files.extend(list_snapshots(path) if os.path.isdir(path) else [path])
+    if not files:
+        parser.error("no snapshot files found")
+
+    bucket_seconds = {'hour': 3600, 'day': DAY, 'week': 7 * DAY}[args.bucket]
+    start = time.perf_counter()
+    trends, shard_count = run_analytics(files, args.workers, bucket_seconds, int(args.shard_mb * 1024 * 1024))
+    elapsed = time.perf_counter() - start
+
+    for series in trends.values():
+        latest = series['series'][-1]
+        hours = series['median_hours_to_sell']
+        median = f"{latest['median']:.2f}" if latest['median'] is not None else "-"
+        print(f"{series['set']:<16} {series['piece']:<7} median {median:>9}  "
+              f"listings/scan {latest['avg_listings_per_scan']:>6.1f}  "
+              f"time-to-sell {f'{hours:.1f}h' if hours is not None else '-':>7}  ({len(series['series'])} buckets)")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(trends, f, indent=2)
+    print(f"\n{len(files)} file(s), {shard_count} shard(s) in {elapsed:.2f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,295 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from mudream_export import ResultExporter, parse_limit
+from mudream_market import API_URL, DEFAULT_LIMITS, LOTS_QUERY, OPTION_LABELS, PAGE_SIZE, PIECE_TYPES, MarketSearcher, read_config
+from mudream_scheduler import QueryPlan
+from mudream_transport import HttpTransport, ReplayTransport, query_key
+
+# The lots query plus each lot's excellent options, used for covering
+# fetches so stricter queries can be answered by filtering locally
+COVER_QUERY = LOTS_QUERY.replace(
+    "                        gearScore\n",
+    "                        gearScore\n"
+    "                        Item {\n"
+    "                            options\n"
+    "                            __typename\n"
+    "                        }\n",
+    1
+)
+
+
+def load_profiles(paths):
+    """{profile name: config} for several collection_config.json files (name = file name)"""
+    profiles = {}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        while name in profiles:
+            name += "_"
+        profiles[name] = read_config(path)
+    return profiles
+
+
+def profile_queries(profiles):
+    """(set, piece, options) -> [profile names] for every piece a scan would request"""
+    queries = {}
+    for name, config in profiles.items():
+        plan = QueryPlan()
+        plan.update(config['sets'])
+        for (set_name, piece), entry in plan.entries.items():
+            if entry['action'] == 'query':
+                queries.setdefault((set_name, piece, frozenset(entry['options'])), []).append(name)
+    return queries
+
+
+def plan_covers(queries):
+    """Map every query to the query whose fetch answers it
+
+    Identical queries share one fetch by construction. A query requiring a
+    strict superset of another query's options (same set and piece) is
+    covered by the tightest such query that is not covered itself.
+    """
+    by_piece = {}
+    for set_name, piece, options in queries:
+        by_piece.setdefault((set_name, piece), []).append(options)
+
+    covers = {}
+    for (set_name, piece), option_sets in by_piece.items():
+        minimal = [o for o in option_sets if not any(other < o for other in option_sets)]
+        for options in option_sets:
+            subsets = [m for m in minimal if m < options]
+            cover = max(subsets, key=lambda m: (len(m), sorted(m))) if subsets else options
+            covers[(set_name, piece, options)] = (set_name, piece, cover)
+    return covers
+
+
+def lot_options(lot):
+    """Option codes of a lot from a covering fetch, or None if the API did not provide them
+
+    Only the filter codes (OPTION_LABELS keys) are accepted; any other shape -
+    display labels, ids - gives None, as it cannot be matched against a
+    filter.
+    """
+    item = lot.get('Item')
+    options = item.get('options') if isinstance(item, dict) else None
+    if isinstance(options, dict):
+        options = list(options)
+    if not isinstance(options, list):
+        return None
+    codes = set()
+    for option in options:
+        if isinstance(option, dict):
+            option = option.get('code') or option.get('name')
+        if not isinstance(option, str) or option not in OPTION_LABELS:
+            return None
+        codes.add(option)
+    return codes
+
+
+def filter_options(filter_):
+    """The option codes a lots filter requires"""
+    return frozenset(key for key in filter_ if key not in ('name', 'type'))
+
+
+class BatchTransport:
+    """Send each distinct lots query of a batch once, answering the rest locally
+
+    Identical requests (same variables) are answered from the first body.
+    A query with a cover (see plan_covers) is answered by filtering the
+    cover's lots on their options - as long as the cover fetch was complete
+    (no further pages) and every lot came with its option codes. Otherwise the
+    query is sent as is, so results never depend on what was deduplicated.
+    """
+
+    def __init__(self, inner, covers, max_pages=1):
+        self.inner = inner
+        self.max_pages = max_pages
+        self.lock = threading.Lock()
+        self.bodies = {}  # variables -> body
+        self.cover_filters = {}  # filter key -> cover filter (dict), for covered queries and covers
+        self.cover_lots = {}  # cover filter key -> complete lot list, or None when unusable
+        self.subsume = True
+        self.sent = 0
+        self.reused = 0
+        self.derived = 0
+        for (set_name, piece, options), (_, _, cover) in covers.items():
+            if cover == options:
+                continue
+            levels = [0, 1, 2, 3, 4]
+            filter_ = {'name': set_name, 'type': [piece], **{opt: levels for opt in options}}
+            cover_filter = {'name': set_name, 'type': [piece], **{opt: levels for opt in cover}}
+            self.cover_filters[query_key({'filter': filter_})] = cover_filter
+            self.cover_filters[query_key({'filter': cover_filter})] = cover_filter
+
+    def send(self, url, payload, headers, timeout):
+        with self.lock:
+            self.sent += 1
+        return self.inner.post(url, payload, headers, timeout)
+
+    def post(self, url, payload, headers, timeout):
+        variables = payload.get('variables', {})
+        key = json.dumps(variables, sort_keys=True)
+        with self.lock:
+            body = self.bodies.get(key)
+            if body is not None:
+                self.reused += 1
+                return body
+
+        cover_filter = self.cover_filters.get(query_key(variables)) if payload.get('operationName') == 'GET_ALL_LOTS' else None
+        if cover_filter is not None and self.subsume:
+            body = self.covered_body(url, payload, headers, timeout, cover_filter)
+            if body is not None:
+                return body
+
+        body = self.send(url, payload, headers, timeout)
+        with self.lock:
+            self.bodies[key] = body
+        return body
+
+    def fetch_cover(self, url, payload, headers, timeout, cover_filter):
+        """Fetch a cover query with lot options, page by page; returns its lots or None"""
+        cover_key = query_key({'filter': cover_filter})
+        lots = []
+        offset = 0
+        for _ in range(max(1, self.max_pages)):
+            variables = dict(payload['variables'], filter=cover_filter, offset=offset, limit=PAGE_SIZE)
+            body = self.send(url, dict(payload, query=COVER_QUERY, variables=variables), headers, timeout)
+            data = json.loads(body)
+            if data.get('errors') or not (data.get('data') or {}).get('lots'):
+                # The API does not serve options in lot lists: send every query as is
+                self.subsume = False
+                return None
+            page = data['data']['lots']
+            with self.lock:
+                self.bodies[json.dumps(variables, sort_keys=True)] = body
+            lots.extend(page['Lots'])
+            if not (page.get('Pagination') or {}).get('nextPageExists') or not page['Lots']:
+                break
+            offset += len(page['Lots'])
+        else:
+            return None  # Cut off by max_pages, so stricter queries may miss lots
+        if any(lot_options(lot) is None for lot in lots):
+            # Options in a shape that cannot be matched against filters
+            self.subsume = False
+            return None
+        with self.lock:
+            self.cover_lots[cover_key] = lots
+        return lots
+
+    def covered_body(self, url, payload, headers, timeout, cover_filter):
+        """A response for payload derived from its cover's lots, or None to send it"""
+        cover_key = query_key({'filter': cover_filter})
+        with self.lock:
+            known = cover_key in self.cover_lots
+            lots = self.cover_lots.get(cover_key)
+        if not known:
+            lots = self.fetch_cover(url, payload, headers, timeout, cover_filter)
+            with self.lock:
+                self.cover_lots.setdefault(cover_key, lots)
+
+        variables = payload['variables']
+        key = json.dumps(variables, sort_keys=True)
+        with self.lock:
+            if key in self.bodies:
+                self.reused += 1
+                return self.bodies[key]  # The cover itself, stored by fetch_cover
+        if lots is None:
+            return None
+
+        required = filter_options(variables['filter'])
+        matching = [lot for lot in lots if required <= lot_options(lot)]
+        offset = variables.get('offset', 0)
+        limit = variables.get('limit', PAGE_SIZE)
+        body = json.dumps({'data': {'lots': {
+            'Lots': matching[offset:offset + limit],
+            'Pagination': {
+                'total': len(matching),
+                'currentPage': offset // max(1, limit) + 1,
+                'nextPageExists': offset + limit < len(matching)
+            }
+        }}}).encode('utf-8')
+        with self.lock:
+            self.bodies[key] = body
+            self.derived += 1
+        return body
+
+
+def run_batch(profiles, bearer_token, transport, api_url=API_URL, pages=1, price_filters=None, sets=None):
+    """Scan several profiles with shared queries
+
+    Returns ({profile: {set: [results]}}, the BatchTransport with its
+    request counters, the MarketSearcher used).
+    """
+    queries = profile_queries(profiles)
+    batch = BatchTransport(transport, plan_covers(queries), pages)
+    market = MarketSearcher(api_url, batch, max_pages=pages)
+
+    results = {}
+    for name, config in profiles.items():
+        # Reset every limit so one profile's caps never carry over to the next
+        market.apply_limits(dict(DEFAULT_LIMITS, **config.get('limits', {})))
+        results[name] = {
+            set_name: [
+                market.search_piece(set_name, piece, requirements, bearer_token, price_filters or {})
+                for piece in PIECE_TYPES
+            ]
+            for set_name, requirements in config['sets'].items()
+            if not sets or set_name in sets
+        }
+    return results, batch, market
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan several MuDream collection profiles, sending shared queries once")
+    parser.add_argument("configs", nargs="+", metavar="CONFIG", help="collection_config.json files, one per profile")
+    parser.add_argument("--output-dir", default="exports", help="Results are written to <profile>.<format> here")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--set", dest="sets", action="append", help="Only search this set (repeatable)")
+    parser.add_argument("--max", dest="limits", action="append", type=parse_limit, default=[],
+                        metavar="CURRENCY=VALUE", help="Price filter, e.g. --max Life=2 (repeatable)")
+    parser.add_argument("--token", default=os.environ.get("MUDREAM_TOKEN", ""),
+                        help="Bearer token (default: $MUDREAM_TOKEN)")
+    parser.add_argument("--api-url", default=API_URL)
+    parser.add_argument("--replay", metavar="FILE", help="Serve the scan from a recorded session")
+    parser.add_argument("--pages", type=int, default=1, help="Pages per piece")
+    args = parser.parse_args(argv)
+
+    if not args.token and not args.replay:
+        parser.error("a bearer token is required (--token or $MUDREAM_TOKEN)")
+    try:
+        profiles = load_profiles(args.configs)
+    except (OSError, ValueError) as e:
+        parser.error(f"cannot read profile: {e}")
+    transport = ReplayTransport.from_recording(args.replay) if args.replay else HttpTransport()
+
+    start = time.perf_counter()
+    results, batch, market = run_batch(profiles, args.token or "replay", transport, args.api_url, args.pages,
+                                       dict(args.limits), args.sets)
+    elapsed = time.perf_counter() - start
+
+    errors = 0
+    os.makedirs(args.output_dir, exist_ok=True)
+    for name, all_results in results.items():
+        path = os.path.join(args.output_dir, f"{name}.{args.format}")
+        with ResultExporter(path, args.format) as exporter:
+            for set_results in all_results.values():
+                for result in set_results:
+                    if result.get('error'):
+                        errors += 1
+                        print(f"{name}: {result['set']} {result['piece']}: {result['message']}", file=sys.stderr)
+                    exporter.write_result(result, market)
+        print(f"{name:<20} {exporter.rows:>5} lot(s) -> {path}")
+
+    queries = profile_queries(profiles)
+    print(f"\n{len(profiles)} profile(s), {len(queries)} distinct queries: {batch.sent} request(s) sent, "
+          f"{batch.reused} answered from an identical query, {batch.derived} filtered from a broader one "
+          f"in {elapsed:.2f}s" + ("" if batch.subsume else " (options not available, no subsumption)"))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
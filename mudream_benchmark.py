@@ -0,0 +1,291 @@
+import argparse
+import json
+import os
+import random
+import platform
+import time
+import tracemalloc
+
+from mudream_market import ARMOR_SETS, PIECE_TYPES, MarketSearcher, piece_exists
+from mudream_render import build_render_model
+from mudream_stats import percentile
+from mudream_transport import HttpTransport, MockGraphQLServer, ReplayTransport
+
+CURRENCY_TITLES = {
+    'bless': 'Jewel of Bless',
+    'soul': 'Jewel of Soul',
+    'life': 'Jewel of Life',
+    'chaos': 'Jewel of Chaos',
+    'creat': 'Jewel of Creation',
+    'zen': 'Zen',
+    'dc': 'Dream Credits'
+}
+
+OPTION_CODES = ['iml', 'imsd', 'dd', 'rd', 'dsr', 'izdr']
+
+
+def make_price(code, value):
+    return {
+        'value': value,
+        'Currency': {
+            'id': code,
+            'code': code,
+            'type': 'jewel' if code not in ('zen', 'dc') else code,
+            'title': CURRENCY_TITLES[code],
+            '__typename': 'Currency'
+        },
+        '__typename': 'Price'
+    }
+
+
+def make_lot(rng, lot_id, piece):
+    """Build one synthetic lot, sometimes with alternative prices"""
+    kind = rng.random()
+    if kind < 0.6:
+        prices = [make_price(rng.choice(['life', 'chaos', 'creat', 'bless', 'soul']), rng.randint(1, 400))]
+        if rng.random() < 0.3:
+            prices.append(make_price('dc', rng.randint(8, 4000)))
+    elif kind < 0.85:
+        prices = [make_price('dc', rng.randint(8, 4000))]
+    else:
+        prices = [make_price('zen', rng.randint(1, 500) * 1000000)]
+
+    return {
+        'id': lot_id,
+        'source': 'Market',
+        'isMine': False,
+        'type': piece,
+        'gearScore': rng.randint(0, 900) or None,
+        'hasPendingCounterOffer': False,
+        'Prices': prices,
+        'Currencies': [],
+        '__typename': 'Lot'
+    }
+
+
+def synthetic_set_names(count):
+    """Real set names first, suffixed copies beyond the 44 known sets"""
+    names = []
+    for i in range(count):
+        base = ARMOR_SETS[i % len(ARMOR_SETS)]
+        names.append(base if i < len(ARMOR_SETS) else f"{base} {i // len(ARMOR_SETS) + 1}")
+    return names
+
+
+def build_synthetic_market(sets, pieces, lots, pages, seed=0):
+    """Return (config, replay) for a market of sets x pieces x lots x pages"""
+    rng = random.Random(seed)
+    replay = ReplayTransport(page_size=lots, seed=seed)
+    config = {'sets': {}}
+    lot_id = 1
+
+    for set_name in synthetic_set_names(sets):
+        requirements = {}
+        for piece in PIECE_TYPES[:pieces]:
+            if not piece_exists(set_name, piece):
+                continue
+            options = sorted(rng.sample(OPTION_CODES, rng.randint(1, 3)))
+            requirements[piece] = {'options': options, 'collected': False}
+
+            piece_lots = []
+            for _ in range(lots * pages):
+                piece_lots.append(make_lot(rng, lot_id, piece))
+                lot_id += 1
+
+            variables_filter = {'name': set_name, 'type': [piece]}
+            variables_filter.update({opt: [0, 1, 2, 3, 4] for opt in options})
+            replay.add_lots(variables_filter, piece_lots)
+        config['sets'][set_name] = requirements
+
+    return config, replay
+
+
+def render_to_tk(model):
+    """Insert a render model into a hidden Tk text widget; None if Tk is unavailable"""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception:
+        return None
+    root.withdraw()
+    text = tk.Text(root)
+    start = time.perf_counter()
+    for segment, tags in model.segments():
+        text.insert(tk.END, segment, tags)
+    root.update_idletasks()
+    elapsed = time.perf_counter() - start
+    root.destroy()
+    return elapsed
+
+
+def run_scan(searcher, config, price_filters):
+    """Scan every configured piece the way search_thread does, timing each one"""
+    all_results = {}
+    piece_times = []
+    for set_name, requirements in config['sets'].items():
+        set_results = []
+        for piece in PIECE_TYPES:
+            start = time.perf_counter()
+            result = searcher.search_piece(set_name, piece, requirements, "benchmark", price_filters)
+            if not result.get('skipped'):
+                piece_times.append(time.perf_counter() - start)
+            set_results.append(result)
+        all_results[set_name] = set_results
+    return all_results, piece_times
+
+
+def run_benchmark(sets=10, pieces=5, lots=50, pages=1, latency=0.0, runs=3,
+                  price_filters=None, in_process=False, tk_render=False, seed=0, cold=True):
+    """Run the scan pipeline against a stub market and return a result dict
+
+    cold (the default) processes every response in full; with cold=False
+    the timed runs measure the unchanged-response path instead.
+    """
+    price_filters = price_filters or {}
+    config, replay = build_synthetic_market(sets, pieces, lots, pages, seed)
+    replay.latency = latency
+
+    server = None
+    if in_process:
+        searcher = MarketSearcher(transport=replay, max_pages=pages)
+    else:
+        server = MockGraphQLServer(replay).start()
+        searcher = MarketSearcher(server.url, HttpTransport(), max_pages=pages)
+    # The stub market never changes, so without cold every timed run after
+    # the memory pass would exercise the unchanged-response path
+    searcher.detect_changes = not cold
+    section_cache = None if cold else {}
+
+    run_stats = []
+    try:
+        # Peak memory is measured in a separate pass; tracemalloc slows everything down
+        tracemalloc.start()
+        all_results, _ = run_scan(searcher, config, price_filters)
+        build_render_model(all_results, price_filters, config['sets'], searcher, section_cache)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del all_results
+
+        for _ in range(runs):
+            requests_before = replay.request_count
+            start = time.perf_counter()
+            all_results, piece_times = run_scan(searcher, config, price_filters)
+            scan_time = time.perf_counter() - start
+
+            render_start = time.perf_counter()
+            model = build_render_model(all_results, price_filters, config['sets'], searcher, section_cache)
+            render_time = time.perf_counter() - render_start
+
+            tk_time = render_to_tk(model) if tk_render else None
+            lots_seen = sum(r.get('total', 0) for results in all_results.values() for r in results)
+            errors = sum(1 for results in all_results.values() for r in results if r.get('error'))
+
+            run_stats.append({
+                'scan_seconds': scan_time,
+                'requests': replay.request_count - requests_before,
+                'pieces': len(piece_times),
+                'lots': lots_seen,
+                'errors': errors,
+                'unchanged': model.unchanged,
+                'pieces_per_second': len(piece_times) / scan_time if scan_time else 0.0,
+                'lots_per_second': lots_seen / scan_time if scan_time else 0.0,
+                'piece_p50_ms': percentile(piece_times, 50) * 1000,
+                'piece_p95_ms': percentile(piece_times, 95) * 1000,
+                'peak_memory_kb': peak / 1024,
+                'render_model_ms': render_time * 1000,
+                'render_tk_ms': tk_time * 1000 if tk_time is not None else None,
+                'rendered_chars': len(model.text())
+            })
+    finally:
+        if server:
+            server.stop()
+
+    best = min(run_stats, key=lambda s: s['scan_seconds'])
+    return {
+        'params': {
+            'sets': sets, 'pieces': pieces, 'lots': lots, 'pages': pages,
+            'latency': latency, 'runs': runs, 'price_filters': price_filters,
+            'transport': 'in-process' if in_process else 'http', 'seed': seed, 'cold': cold
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        'best': best,
+        'runs': run_stats
+    }
+
+
+def compare(current, baseline_path):
+    """Print relative changes of the best run against a saved result file"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    # Results saved before the unchanged-response path existed measured the full pipeline
+    baseline_cold = baseline.get('params', {}).get('cold', True)
+    if baseline_cold != current['params']['cold']:
+        modes = {True: "the full pipeline", False: "unchanged responses (--warm)"}
+        print(f"\nNot comparing with {baseline_path}: it measured {modes[baseline_cold]}, "
+              f"this run measured {modes[current['params']['cold']]}")
+        return
+    print(f"\nCompared with {baseline_path}:")
+    for key, value in current['best'].items():
+        old = baseline.get('best', {}).get(key)
+        if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+            continue
+        change = (value - old) / old * 100
+        print(f"  {key:<20} {old:>12.2f} -> {value:>12.2f} ({change:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the MuDream scan pipeline against a local stub market")
+    parser.add_argument("--sets", type=int, default=10)
+    parser.add_argument("--pieces", type=int, default=5, choices=range(1, 6))
+    parser.add_argument("--lots", type=int, default=50, help="Lots per page")
+    parser.add_argument("--pages", type=int, default=1, help="Pages per piece")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated server latency in seconds")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--life", type=float, help="Optional Life price filter")
+    parser.add_argument("--dc", type=float, help="Optional DC price filter")
+    parser.add_argument("--in-process", action="store_true", help="Skip HTTP and call the stub directly")
+    parser.add_argument("--tk", action="store_true", help="Also time insertion into a real Tk text widget")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warm", action="store_true",
+                        help="Keep change detection on so timed runs measure the unchanged-response path")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "latest.json"))
+    parser.add_argument("--compare", metavar="FILE", help="Baseline result file to compare against")
+    args = parser.parse_args(argv)
+
+    price_filters = {}
+    if args.life is not None:
+        price_filters['Life'] = args.life
+    if args.dc is not None:
+        price_filters['DC'] = args.dc
+
+    result = run_benchmark(args.sets, args.pieces, args.lots, args.pages, args.latency,
+                           args.runs, price_filters, args.in_process, args.tk, args.seed, not args.warm)
+
+    best = result['best']
+    print(f"Scan of {best['pieces']} pieces / {best['lots']} lots ({best['requests']} requests, "
+          f"{best['unchanged']} unchanged)")
+    print(f"  scan time        {best['scan_seconds']:.3f}s")
+    print(f"  throughput       {best['pieces_per_second']:.1f} pieces/s, {best['lots_per_second']:.0f} lots/s")
+    print(f"  piece latency    p50 {best['piece_p50_ms']:.2f}ms, p95 {best['piece_p95_ms']:.2f}ms")
+    print(f"  peak memory      {best['peak_memory_kb']:.0f} KB")
+    print(f"  render model     {best['render_model_ms']:.2f}ms")
+    if best['render_tk_ms'] is not None:
+        print(f"  render (Tk)      {best['render_tk_ms']:.2f}ms")
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nSaved {args.output}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+import time
+
+from mudream_market import result_from_json
+
+
+def piece_status(result):
+    """'done', 'error' or 'timed_out' for a piece result"""
+    if result.get('timed_out'):
+        return 'timed_out'
+    if result.get('error'):
+        return 'error'
+    return 'done'
+
+
+class ScanCheckpoint:
+    """Append-only JSON Lines record of a scan's per-piece progress
+
+    begin() writes a header with the planned (set, piece) keys and price
+    filters; record() appends each finished piece with its status and
+    result as soon as it completes, so a crash or restart loses at most the
+    piece in flight. Retries append again and the latest line per piece
+    wins. load() rebuilds the state, including which pieces are still
+    unfinished (failed, timed out or never searched).
+    """
+
+    def __init__(self, path="scan_checkpoint.jsonl"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.active = False
+
+    def write(self, entry, mode='a'):
+        try:
+            with open(self.path, mode, encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError:
+            pass  # A checkpoint is a convenience; the scan itself must go on
+
+    def begin(self, pieces, price_filters):
+        with self.lock:
+            self.write({
+                'type': 'scan',
+                'ts': time.time(),
+                'pieces': [list(key) for key in pieces],
+                'price_filters': price_filters
+            }, mode='w')
+            self.active = True
+
+    def record(self, result):
+        with self.lock:
+            if not self.active:
+                return
+            self.write({
+                'type': 'piece',
+                'set': result['set'],
+                'piece': result['piece'],
+                'status': piece_status(result),
+                'result': result
+            })
+
+    def load(self):
+        """State of the last scan, or None if there is no readable checkpoint"""
+        if not os.path.exists(self.path):
+            return None
+        header = None
+        results = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # A line cut short by a crash
+                    if entry.get('type') == 'scan':
+                        header = entry
+                        results = {}
+                    elif entry.get('type') == 'piece' and header is not None:
+                        results[(entry['set'], entry['piece'])] = result_from_json(entry['result'])
+        except OSError:
+            return None
+        if header is None:
+            return None
+
+        pieces = [tuple(key) for key in header['pieces']]
+        unfinished = [key for key in pieces if key not in results or piece_status(results[key]) != 'done']
+        with self.lock:
+            self.active = True
+        return {
+            'ts': header['ts'],
+            'pieces': pieces,
+            'price_filters': header.get('price_filters', {}),
+            'results': results,
+            'unfinished': unfinished
+        }
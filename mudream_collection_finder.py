@@ -1,13 +1,39 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
-import requests
+from tkinter import ttk, messagebox, scrolledtext, filedialog
+import argparse
 import json
 import threading
 import os
+import time
 import webbrowser
 
+IMPORTS_STARTED = time.perf_counter()
+
+from mudream_checkpoint import ScanCheckpoint
+from mudream_export import ResultExporter
+from mudream_market import (
+    API_URL, ARMOR_SETS, CURRENCY_MAP, DEFAULT_LIMITS, PIECE_TYPES, SETS_MISSING_GLOVES, SETS_MISSING_HELM,
+    ConfigWatcher, MarketSearcher, build_headers, config_changes, piece_exists, piece_requirements, token_usable
+)
+from mudream_planner import PurchasePlanner, format_plan
+from mudream_render import build_render_model, detail_segments, diff_sections, lot_url
+from mudream_scheduler import ActivityTracker, QueryPlan, plan_scan
+from mudream_snapshots import SnapshotWriter
+from mudream_stats import ScanStats, StartupTimer, process_memory_kb
+from mudream_transport import (
+    DiskCacheTransport, HttpTransport, PrefetchTransport, RecordingTransport, ReplayTransport, ResponseCache
+)
+
+IMPORTS_TIME = time.perf_counter() - IMPORTS_STARTED
+
+CONFIG_POLL_MS = 2000  # How often collection_config.json is checked for outside edits
+
 class MuDreamCollectionFinder:
-    def __init__(self, root):
+    def __init__(self, root, api_url=API_URL, transport=None, record_dir="recordings", daemon_url=None):
+        self.startup = StartupTimer()
+        self.startup.record('imports', IMPORTS_TIME)
+        self.report_startup = False
+        self.started_up = False
         self.root = root
         self.root.title("MuDream Collection Finder")
         self.root.geometry("1150x880")
@@ -22,20 +48,48 @@ class MuDreamCollectionFinder:
         
         # Configuration
         self.config_file = "collection_config.json"
-        self.api_url = "https://mudream.online/api/graphql"
+        self.api_url = api_url
         self.bearer_token = tk.StringVar()
+        self.bearer_token.trace_add("write", self.on_token_changed)
+        self.warm_results = False  # Showing cached startup results that still need a refresh
+        
+        # Network transport (HTTP by default, replay stub for offline runs)
+        self.response_cache = ResponseCache("response_cache")
+        if transport is None:
+            # Live responses are kept on disk so the next start can show them at once
+            transport = DiskCacheTransport(HttpTransport(), self.response_cache)
+        self.base_transport = transport
+        self.prefetcher = PrefetchTransport(self.base_transport)
+        self.prefetch_cancel = None
+        self.market = MarketSearcher(self.api_url, self.prefetcher)
+        self.record_dir = record_dir
+        self.record_traffic = tk.BooleanVar(value=False)
+        self.profile_scans = tk.BooleanVar(value=False)
+        self.live_rates_var = tk.BooleanVar(value=False)
+        self.sort_by_var = tk.StringVar(value="Value")
+        self.save_snapshots = tk.BooleanVar(value=False)
+        self.activity = ActivityTracker("scan_history.json")
+        self.market.activity = self.activity
+        self.priority_var = tk.IntVar(value=0)
+        self.snapshot_writer = SnapshotWriter("snapshots")
+        self.export_results = tk.BooleanVar(value=False)
+        self.export_format = tk.StringVar(value="CSV")
+        self.export_dir = "exports"
+        self.result_exporter = None
+        self.daemon = None
+        if daemon_url:
+            from mudream_daemon import DaemonClient  # Pulls in http.server; only needed with --daemon
+            self.daemon = DaemonClient(daemon_url)
+        self.max_deal_var = tk.StringVar(value="")
+        self.time_limit_var = tk.StringVar(value="")
+        self.unfinished_pieces = []  # Failed, timed-out or never searched (set, piece) keys
+        self.pending_pieces = []  # Pieces an interrupted scan never reached
+        self.checkpoint = ScanCheckpoint("scan_checkpoint.jsonl")
+        self.last_price_filters = {}
+        self.profile_dir = "profiles"
         
         # Armor sets
-        self.armor_sets = [
-            "Leather", "Pad", "Vine", "Bronze", "Silk", "Bone", "Scale", "Wind",
-            "Violent Wind", "Sphinx", "Brass", "Spirit", "Plate", "Legendary",
-            "Red Winged", "Guardian", "Dragon", "Light Plate", "Sacred Fire",
-            "Ancient", "Adamantine", "Storm Crow", "Storm Zahard", "Black Dragon",
-            "Demonic", "Grand Soul", "Holy Spirit", "Dark Steel", "Dark Phoenix",
-            "Thunder Hawk", "Great Dragon", "Dark Soul", "Hurricane", "Red Spirit",
-            "Dark Master", "Storm Blitz", "Piercing Grove", "Dragon Knight",
-            "Vengeance", "Sylphid Ray", "Volcano", "Sunlight", "Succubus", "Phoenix Soul"
-        ]
+        self.armor_sets = ARMOR_SETS
         
         # Excellent options
         self.excellent_options = {
@@ -48,8 +102,8 @@ class MuDreamCollectionFinder:
         }
         
         # Sets with missing pieces
-        self.sets_missing_gloves = ['Sacred Fire', 'Storm Zahard', 'Piercing Grove', 'Phoenix Soul']
-        self.sets_missing_helm = ['Volcano', 'Hurricane', 'Thunder Hawk', 'Storm Crow']
+        self.sets_missing_gloves = SETS_MISSING_GLOVES
+        self.sets_missing_helm = SETS_MISSING_HELM
         
         # Currency options
         self.currencies = {
@@ -62,17 +116,49 @@ class MuDreamCollectionFinder:
             'DC': tk.StringVar(value="")
         }
         
-        self.piece_types = ['helm', 'armor', 'pants', 'gloves', 'boots']
+        self.piece_types = PIECE_TYPES
         self.checkboxes = {}
         self.collected_vars = {}  # Track collected status
         self.piece_frames = {}  # Store references to piece frames
+        self.collected_buttons = {}  # Direct handles to per-piece widgets
+        self.option_buttons = {}
+        self.piece_available = {}
+        self.set_cards = {}  # Configured set cards keyed by set name
+        self.empty_sets_frame = None
         self.config = {'sets': {}}
         self.search_set_selection = tk.StringVar(value="All Sets")
         self.search_set_dropdown = None
+        self.last_results = {}
+        self.section_cache = {}  # Rendered piece sections reused while a response is unchanged
+        self.shown_sections = []  # (key, segments) currently in the results pane, in order
+        self.section_marks = {}  # Section key -> Tk mark at the start of its text
+        self.mark_counter = 0
+        self.limits = dict(DEFAULT_LIMITS)
+        self.query_plan = QueryPlan()  # What the next scan does per piece, updated as the config changes
+        self.tab_builders = {}  # Notebook tab id -> (name, builder) for tabs not built yet
+        self.startup.mark('state')
         
         # Load existing config
         self.load_config()
+        self.config_watcher = ConfigWatcher(self.config_file)
+        self.apply_limits()
+        self.query_plan.update(self.config['sets'])
+        self.startup.mark('config')
         self.create_widgets()
+        self.startup.mark('widgets')
+        self.root.after_idle(self.finish_startup)
+    
+    def finish_startup(self):
+        """Work that can wait until the window is up: checkpoint resume, warm start, config watching"""
+        self.startup.mark('window up')
+        self.started_up = True
+        self.offer_resume()
+        self.warm_start()
+        self.startup.record('resume/warm start', time.perf_counter() - self.startup.last, deferred=True)
+        self.root.after(CONFIG_POLL_MS, self.watch_config)
+        self.update_stats_panel()
+        if self.report_startup:
+            print(self.startup.format_summary())
     
     def load_config(self):
         """Load configuration from JSON file"""
@@ -95,6 +181,52 @@ class MuDreamCollectionFinder:
                 return False
         return False
     
+    def watch_config(self):
+        """Reload collection_config.json when it was edited outside the app"""
+        config = self.config_watcher.poll()
+        if config is not None:
+            changes = config_changes(self.config, config)
+            if any(changes.values()):
+                self.config = config
+                self.apply_limits()
+                rebuilt = self.query_plan.update(self.config['sets'])
+                self.update_configured_sets_display()
+                self.update_search_dropdown()
+                if self.tab_built(self.search_frame):
+                    self.results_text.insert(
+                        tk.END,
+                        f"\n🔄 Config reloaded: {len(changes['added'])} set(s) added, {len(changes['removed'])} removed, "
+                        f"{len(changes['modified'])} changed ({len(rebuilt)} re-planned)\n",
+                        "info"
+                    )
+        self.root.after(CONFIG_POLL_MS, self.watch_config)
+    
+    def dry_run(self):
+        """Show what the next search would request, without sending anything"""
+        selected_set = self.search_set_selection.get()
+        names = list(self.config['sets']) if selected_set == "All Sets" else [selected_set]
+        counts = self.query_plan.dry_run(names, self.market.max_pages, self.market.response_cache)
+        
+        if counts['min_requests'] == counts['max_requests']:
+            requests_text = f"{counts['min_requests']} request(s)"
+        else:
+            requests_text = f"{counts['min_requests']}-{counts['max_requests']} request(s) ({self.market.max_pages} page(s) max)"
+        msg = f"Next search of {selected_set}:\n\n"
+        msg += f"{counts['query']} piece(s) to query → {requests_text}\n"
+        if counts['cached']:
+            msg += f"{counts['cached']} of them were fetched before and are likely unchanged\n"
+        msg += f"\nNo request needed:\n"
+        msg += f"  ✓ {counts['collected']} collected\n"
+        msg += f"  ⊘ {counts['missing']} not in the set, {counts['unconfigured'] + counts['no_options']} not configured"
+        messagebox.showinfo("Dry Run", msg)
+    
+    def apply_limits(self):
+        """Apply the memory caps, with overrides from the config's "limits" section"""
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(self.config.get('limits', {}))
+        self.market.apply_limits(self.limits)
+        self.response_cache.max_bytes = self.limits['max_disk_cache_mb'] * 1024 * 1024
+    
     def save_current_set(self):
         """Save or update current set configuration"""
         set_name = self.selected_set.get()
@@ -136,10 +268,17 @@ class MuDreamCollectionFinder:
         action = "updated" if set_name in self.config['sets'] else "added"
         self.config['sets'][set_name] = requirements
         
+        priorities = self.config.setdefault('priorities', {})
+        if self.priority_var.get():
+            priorities[set_name] = self.priority_var.get()
+        else:
+            priorities.pop(set_name, None)
+        
         try:
             with open(self.config_file, 'w') as f:
                 json.dump(self.config, f, indent=2)
             
+            self.query_plan.update(self.config['sets'])
             self.update_configured_sets_display()
             
             # Count configured pieces and collected pieces
@@ -168,9 +307,11 @@ class MuDreamCollectionFinder:
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {set_name} set?"):
             if set_name in self.config['sets']:
                 del self.config['sets'][set_name]
+                self.config.get('priorities', {}).pop(set_name, None)
                 try:
                     with open(self.config_file, 'w') as f:
                         json.dump(self.config, f, indent=2)
+                    self.query_plan.update(self.config['sets'])
                     self.update_configured_sets_display()
                     messagebox.showinfo("Success", f"{set_name} set deleted!")
                 except Exception as e:
@@ -180,190 +321,194 @@ class MuDreamCollectionFinder:
         """Load a configured set into the form for editing"""
         self.selected_set.set(set_name)
         self.on_set_selection_changed()
+        self.prefetch_selected_set(set_name)
+    
+    def prefetch_selected_set(self, set_name):
+        """Speculatively fetch a set's uncollected pieces so the next search is instant
+        
+        Any prefetch of a previously selected set is cancelled first and the
+        responses it already parked are dropped.
+        """
+        if self.prefetch_cancel is not None:
+            self.prefetch_cancel.set()
+            self.prefetch_cancel = None
+            self.prefetcher.discard()
+        
+        token = self.bearer_token.get().strip()
+        if set_name not in self.config['sets'] or not token_usable(token):
+            return
+        
+        cancel = self.prefetch_cancel = threading.Event()
+        requirements = self.config['sets'][set_name]
+        thread = threading.Thread(
+            target=self.market.prefetch_set,
+            args=(self.prefetcher, set_name, requirements, token, cancel),
+            daemon=True
+        )
+        thread.start()
     
     def on_set_selection_changed(self, *args):
         """Clear all checkboxes and load set config if it exists"""
         set_name = self.selected_set.get()
         
-        # Clear all checkboxes and collected status first
-        for piece in self.piece_types:
-            for opt_code, var in self.checkboxes[piece].items():
-                var.set(False)
-            self.collected_vars[piece].set(False)
-        
-        # Enable/disable piece frames based on set
-        for piece in self.piece_types:
-            if hasattr(self, 'piece_frames') and piece in self.piece_frames:
-                piece_frame = self.piece_frames[piece]
-                
-                # Check if this piece should be disabled for this set
-                should_disable = False
-                if piece == 'gloves' and set_name in self.sets_missing_gloves:
-                    should_disable = True
-                elif piece == 'helm' and set_name in self.sets_missing_helm:
-                    should_disable = True
-                
-                # Update frame and checkbox states
-                if should_disable:
-                    piece_frame.config(bg="#0f172a")  # Darker background
-                    is_first_label = True
-                    for widget in piece_frame.winfo_children():
-                        if isinstance(widget, tk.Label):
-                            # Add "N/A" indicator to the header (first label)
-                            if is_first_label:
-                                current_text = widget.cget('text')
-                                if '(N/A)' not in current_text:
-                                    widget.config(text=f"{current_text} (N/A)", fg="#475569")
-                                else:
-                                    widget.config(fg="#475569")
-                                is_first_label = False
-                        elif isinstance(widget, tk.Frame):
-                            for cb in widget.winfo_children():
-                                if isinstance(cb, tk.Checkbutton):
-                                    cb.config(state='disabled', fg="#475569")
-                else:
-                    piece_frame.config(bg="#1e293b")  # Normal background
-                    is_first_label = True
-                    for widget in piece_frame.winfo_children():
-                        if isinstance(widget, tk.Label):
-                            if is_first_label:
-                                # Remove "N/A" indicator from the header
-                                current_text = widget.cget('text')
-                                if ' (N/A)' in current_text:
-                                    widget.config(text=current_text.replace(' (N/A)', ''), fg="#fbbf24")
-                                else:
-                                    widget.config(fg="#fbbf24")
-                                is_first_label = False
-                        elif isinstance(widget, tk.Frame):
-                            for cb in widget.winfo_children():
-                                if isinstance(cb, tk.Checkbutton):
-                                    cb.config(state='normal', fg="#e2e8f0")
+        # Work out the target state first so each variable is written once
+        selected_options = {piece: set() for piece in self.piece_types}
+        collected = {piece: False for piece in self.piece_types}
         
         # If this set is already configured, load its requirements
         if set_name and set_name in self.config['sets']:
-            requirements = self.config['sets'][set_name]
-            for piece, piece_data in requirements.items():
+            for piece, piece_data in self.config['sets'][set_name].items():
                 if piece in self.checkboxes:
-                    # Handle both old format (list) and new format (dict)
-                    if isinstance(piece_data, list):
-                        # Old format: just a list of options
-                        options = piece_data
-                        collected = False
-                    else:
-                        # New format: dict with options and collected status
-                        options = piece_data.get('options', [])
-                        collected = piece_data.get('collected', False)
-                    
-                    # Set checkbox states for options
-                    for opt_code in options:
-                        if opt_code in self.checkboxes[piece]:
-                            self.checkboxes[piece][opt_code].set(True)
-                    
-                    # Set collected status
-                    self.collected_vars[piece].set(collected)
+                    options, is_collected = piece_requirements(piece_data)
+                    selected_options[piece] = set(options)
+                    collected[piece] = is_collected
+        
+        self.priority_var.set(self.config.get('priorities', {}).get(set_name, 0))
+        
+        for piece in self.piece_types:
+            for opt_code, var in self.checkboxes[piece].items():
+                var.set(opt_code in selected_options[piece])
+            self.collected_vars[piece].set(collected[piece])
+            
+            # Enable/disable piece frames based on set
+            self.set_piece_available(piece, piece_exists(set_name, piece))
+    
+    def set_piece_available(self, piece, available):
+        """Enable or grey out one piece frame, touching widgets only on change"""
+        if self.piece_available.get(piece) == available or piece not in self.piece_frames:
+            return
+        self.piece_available[piece] = available
+        
+        piece_frame = self.piece_frames[piece]
+        if available:
+            piece_frame.config(text=piece.upper(), bg="#1e293b", fg="#fbbf24")
+            self.collected_buttons[piece].config(state='normal', bg="#1e293b", fg="#10b981")
+            for cb in self.option_buttons[piece]:
+                cb.config(state='normal', bg="#1e293b", fg="#cbd5e1")
+        else:
+            piece_frame.config(text=f"{piece.upper()} (N/A)", bg="#0f172a", fg="#475569")
+            self.collected_buttons[piece].config(state='disabled', bg="#0f172a", fg="#475569")
+            for cb in self.option_buttons[piece]:
+                cb.config(state='disabled', bg="#0f172a", fg="#475569")
+    
+    def set_card_details(self, set_name, requirements):
+        """Detail line shown on a configured set card"""
+        # Count pieces with requirements and collected pieces
+        pieces_with_req = 0
+        collected_count = 0
+        for piece_data in requirements.values():
+            options, is_collected = piece_requirements(piece_data)
+            if options:
+                pieces_with_req += 1
+            if is_collected:
+                collected_count += 1
+        
+        # Calculate total pieces for this set
+        total_pieces = sum(1 for piece in self.piece_types if piece_exists(set_name, piece))
+        
+        detail_text = f"{pieces_with_req}/{total_pieces} pieces configured"
+        if collected_count > 0:
+            detail_text += f" • {collected_count} collected ✓"
+        return detail_text
     
     def update_configured_sets_display(self):
-        """Update the display of configured sets"""
+        """Update the display of configured sets, only touching cards that changed"""
+        if not self.tab_built(self.setup_frame):
+            return  # Drawn from the current config when the tab is first shown
+        
         # Update count label
         if hasattr(self, 'sets_count_label'):
-            self.sets_count_label.config(text=f"📚 Configured Sets ({len(self.config['sets'])} total)")
+            self.sets_count_label.config(text=f"Configured Sets ({len(self.config['sets'])} total):")
         
-        for widget in self.configured_sets_frame.winfo_children():
-            widget.destroy()
+        # Remove cards for deleted sets
+        for set_name in list(self.set_cards):
+            if set_name not in self.config['sets']:
+                self.set_cards.pop(set_name)['frame'].destroy()
         
         if not self.config['sets']:
-            empty_frame = tk.Frame(self.configured_sets_frame, bg="#0f172a")
-            empty_frame.pack(pady=20)
-            tk.Label(
-                empty_frame,
-                text="No sets configured yet",
-                font=self.body_font,
-                bg="#0f172a",
-                fg="#64748b"
-            ).pack()
-            tk.Label(
-                empty_frame,
-                text="Select a set below and configure its requirements to get started",
-                font=self.small_font,
-                bg="#0f172a",
-                fg="#475569"
-            ).pack()
-        else:
-            for set_name, requirements in self.config['sets'].items():
-                set_card = tk.Frame(self.configured_sets_frame, bg="#1e293b", padx=12, pady=8)
-                set_card.pack(fill="x", pady=4, padx=5)
-                
-                # Count pieces with requirements and collected pieces
-                pieces_with_req = []
-                collected_count = 0
-                for p, piece_data in requirements.items():
-                    if isinstance(piece_data, list):
-                        # Old format
-                        if piece_data:
-                            pieces_with_req.append(p)
-                    else:
-                        # New format
-                        if piece_data.get('options'):
-                            pieces_with_req.append(p)
-                        if piece_data.get('collected'):
-                            collected_count += 1
-                
-                # Calculate total pieces for this set
-                total_pieces = 5
-                if set_name in self.sets_missing_gloves:
-                    total_pieces -= 1
-                if set_name in self.sets_missing_helm:
-                    total_pieces -= 1
-                
-                info_text = f"✓ {set_name}"
-                detail_text = f"{len(pieces_with_req)}/{total_pieces} pieces configured"
-                if collected_count > 0:
-                    detail_text += f" • {collected_count} collected ✓"
-                
-                left_frame = tk.Frame(set_card, bg="#1e293b")
-                left_frame.pack(side="left", fill="x", expand=True)
-                
+            if self.empty_sets_frame is None:
+                self.empty_sets_frame = tk.Frame(self.configured_sets_frame, bg="#0f172a")
+                self.empty_sets_frame.pack(pady=20)
                 tk.Label(
-                    left_frame,
-                    text=info_text,
-                    font=("Segoe UI", 11, "bold"),
-                    bg="#1e293b",
-                    fg="#10b981",
-                    anchor="w"
-                ).pack(anchor="w")
-                
+                    self.empty_sets_frame,
+                    text="No sets configured yet",
+                    font=self.body_font,
+                    bg="#0f172a",
+                    fg="#64748b"
+                ).pack()
                 tk.Label(
-                    left_frame,
-                    text=detail_text,
+                    self.empty_sets_frame,
+                    text="Select a set below and configure its requirements to get started",
                     font=self.small_font,
-                    bg="#1e293b",
-                    fg="#64748b",
-                    anchor="w"
-                ).pack(anchor="w")
-                
-                btn_frame = tk.Frame(set_card, bg="#1e293b")
-                btn_frame.pack(side="right")
-                
-                edit_btn = self.create_modern_button(
-                    btn_frame,
-                    "✏️ Edit",
-                    lambda s=set_name: self.load_set_to_form(s),
-                    "#8b5cf6",
-                    width=8
-                )
-                edit_btn.pack(side="left", padx=3)
-                
-                del_btn = self.create_modern_button(
-                    btn_frame,
-                    "🗑️",
-                    lambda s=set_name: self.delete_set(s),
-                    "#ef4444",
-                    width=3
-                )
-                del_btn.pack(side="left", padx=3)
+                    bg="#0f172a",
+                    fg="#475569"
+                ).pack()
+        else:
+            if self.empty_sets_frame is not None:
+                self.empty_sets_frame.destroy()
+                self.empty_sets_frame = None
+            
+            for set_name, requirements in self.config['sets'].items():
+                detail_text = self.set_card_details(set_name, requirements)
+                card = self.set_cards.get(set_name)
+                if card is None:
+                    self.set_cards[set_name] = self.create_set_card(set_name, detail_text)
+                elif card['detail'] != detail_text:
+                    card['detail_label'].config(text=detail_text)
+                    card['detail'] = detail_text
         
         self.update_search_dropdown()
     
+    def create_set_card(self, set_name, detail_text):
+        """Build one configured-set card and return handles to its widgets"""
+        set_card = tk.Frame(self.configured_sets_frame, bg="#1e293b", padx=12, pady=8)
+        set_card.pack(fill="x", pady=4, padx=5)
+        
+        left_frame = tk.Frame(set_card, bg="#1e293b")
+        left_frame.pack(side="left", fill="x", expand=True)
+        
+        tk.Label(
+            left_frame,
+            text=f"✓ {set_name}",
+            font=("Segoe UI", 11, "bold"),
+            bg="#1e293b",
+            fg="#10b981",
+            anchor="w"
+        ).pack(anchor="w")
+        
+        detail_label = tk.Label(
+            left_frame,
+            text=detail_text,
+            font=self.small_font,
+            bg="#1e293b",
+            fg="#64748b",
+            anchor="w"
+        )
+        detail_label.pack(anchor="w")
+        
+        btn_frame = tk.Frame(set_card, bg="#1e293b")
+        btn_frame.pack(side="right")
+        
+        edit_btn = self.create_modern_button(
+            btn_frame,
+            "✏️ Edit",
+            lambda s=set_name: self.load_set_to_form(s),
+            "#8b5cf6",
+            width=8
+        )
+        edit_btn.pack(side="left", padx=3)
+        
+        del_btn = self.create_modern_button(
+            btn_frame,
+            "🗑️",
+            lambda s=set_name: self.delete_set(s),
+            "#ef4444",
+            width=3
+        )
+        del_btn.pack(side="left", padx=3)
+        
+        return {'frame': set_card, 'detail_label': detail_label, 'detail': detail_text}
+    
     def create_modern_button(self, parent, text, command, bg_color, fg_color="white", width=None):
         """Create a modern styled button with hover effects"""
         btn = tk.Button(
@@ -438,11 +583,29 @@ class MuDreamCollectionFinder:
         self.search_frame = tk.Frame(self.notebook, bg="#0f172a")
         self.notebook.add(self.search_frame, text="🔍  Search Market")
         
-        self.create_setup_tab()
-        self.create_search_tab()
-        
+        # Only the tab shown first is built now; the other one on its first visit
+        self.tab_builders = {
+            str(self.setup_frame): ('setup tab', self.create_setup_tab),
+            str(self.search_frame): ('search tab', self.create_search_tab)
+        }
         if self.config['sets']:
             self.notebook.select(1)
+        self.build_tab(self.notebook.select())
+        self.notebook.bind("<<NotebookTabChanged>>", lambda e: self.build_tab(self.notebook.select()))
+    
+    def build_tab(self, tab_id):
+        """Build a notebook tab's widgets the first time it is shown"""
+        entry = self.tab_builders.pop(str(tab_id), None)
+        if entry is None:
+            return
+        name, builder = entry
+        started = time.perf_counter()
+        builder()
+        if self.started_up:
+            self.startup.record(name, time.perf_counter() - started, deferred=True)
+    
+    def tab_built(self, frame):
+        return str(frame) not in self.tab_builders
     
     def create_setup_tab(self):
         """Create the setup/configuration tab"""
@@ -467,13 +630,14 @@ class MuDreamCollectionFinder:
         configured_frame = tk.Frame(self.setup_frame, bg="#334155", padx=10, pady=10)
         configured_frame.pack(fill="x", padx=20, pady=10)
         
-        tk.Label(
+        self.sets_count_label = tk.Label(
             configured_frame,
             text=f"Configured Sets ({len(self.config['sets'])} total):",
             font=("Arial", 10, "bold"),
             bg="#334155",
             fg="#c4b5fd"
-        ).pack(anchor="w")
+        )
+        self.sets_count_label.pack(anchor="w")
         
         # Create scrollable frame for configured sets
         sets_container = tk.Frame(configured_frame, bg="#1e293b", height=150)
@@ -523,6 +687,27 @@ class MuDreamCollectionFinder:
         )
         set_dropdown.pack(anchor="w", pady=5)
         
+        priority_frame = tk.Frame(set_frame, bg="#334155")
+        priority_frame.pack(anchor="w")
+        
+        tk.Label(
+            priority_frame,
+            text="Search priority (higher is scanned first):",
+            font=("Arial", 9),
+            bg="#334155",
+            fg="#cbd5e1"
+        ).pack(side="left")
+        
+        tk.Spinbox(
+            priority_frame,
+            from_=0,
+            to=10,
+            textvariable=self.priority_var,
+            width=4,
+            font=("Arial", 9),
+            state="readonly"
+        ).pack(side="left", padx=5)
+        
         options_container = tk.Frame(self.setup_frame, bg="#1e293b")
         options_container.pack(fill="both", expand=True, padx=20, pady=5)
         
@@ -578,6 +763,7 @@ class MuDreamCollectionFinder:
                 activeforeground="#10b981"
             )
             collected_cb.pack(anchor="w", pady=(0, 5))
+            self.collected_buttons[piece] = collected_cb
             
             # Separator
             separator = tk.Frame(piece_frame, bg="#475569", height=1)
@@ -585,6 +771,7 @@ class MuDreamCollectionFinder:
             
             # Excellent options
             self.checkboxes[piece] = {}
+            self.option_buttons[piece] = []
             for opt_code, opt_label in self.excellent_options.items():
                 var = tk.BooleanVar()
                 
@@ -601,6 +788,7 @@ class MuDreamCollectionFinder:
                 )
                 cb.pack(anchor="w")
                 self.checkboxes[piece][opt_code] = var
+                self.option_buttons[piece].append(cb)
         
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
@@ -702,6 +890,10 @@ class MuDreamCollectionFinder:
                 width=45
             )
             self.search_set_dropdown.pack(anchor="w", pady=5)
+            self.search_set_dropdown.bind(
+                "<<ComboboxSelected>>",
+                lambda e: self.prefetch_selected_set(self.search_set_selection.get())
+            )
             
             tk.Label(
                 set_frame,
@@ -710,6 +902,44 @@ class MuDreamCollectionFinder:
                 bg="#1e293b",
                 fg="#64748b"
             ).pack(anchor="w", pady=(5, 0))
+            
+            limit_frame = tk.Frame(set_frame, bg="#1e293b")
+            limit_frame.pack(fill="x", pady=(8, 0))
+            
+            tk.Label(
+                limit_frame,
+                text="⏱ Time limit (seconds, empty = none):",
+                font=self.small_font,
+                bg="#1e293b",
+                fg="#cbd5e1"
+            ).pack(side="left")
+            
+            tk.Entry(
+                limit_frame,
+                textvariable=self.time_limit_var,
+                font=self.small_font,
+                bg="#0f172a",
+                fg="#e2e8f0",
+                insertbackground="white",
+                width=6,
+                relief=tk.FLAT
+            ).pack(side="left", padx=5, ipady=3)
+            
+            self.continue_btn = self.create_modern_button(
+                limit_frame,
+                "🔁 Retry failed / unfinished pieces",
+                self.retry_unfinished,
+                "#334155"
+            )
+            self.continue_btn.pack(side="left", padx=10)
+            self.continue_btn.config(state="disabled")
+            
+            self.create_modern_button(
+                limit_frame,
+                "🧮 Dry run",
+                self.dry_run,
+                "#334155"
+            ).pack(side="left")
         else:
             no_config = tk.Label(
                 self.search_frame,
@@ -778,6 +1008,71 @@ class MuDreamCollectionFinder:
                 col = 0
                 row += 1
         
+        valuation_frame = tk.Frame(price_frame, bg="#1e293b")
+        valuation_frame.pack(fill="x", pady=(8, 0))
+        
+        tk.Checkbutton(
+            valuation_frame,
+            text="📈 Rank with live market rates (derived from lots listed in several currencies)",
+            variable=self.live_rates_var,
+            command=self.on_valuation_mode_changed,
+            font=self.small_font,
+            bg="#1e293b",
+            fg="#cbd5e1",
+            selectcolor="#0f172a",
+            activebackground="#1e293b",
+            activeforeground="#ffffff"
+        ).pack(anchor="w")
+        
+        self.rates_label = tk.Label(
+            valuation_frame,
+            text="",
+            font=self.small_font,
+            bg="#1e293b",
+            fg="#64748b"
+        )
+        self.rates_label.pack(anchor="w")
+        self.update_rates_label()
+        
+        deal_frame = tk.Frame(price_frame, bg="#1e293b")
+        deal_frame.pack(fill="x", pady=(6, 0))
+        
+        tk.Label(
+            deal_frame,
+            text="Sort by:",
+            font=self.small_font,
+            bg="#1e293b",
+            fg="#cbd5e1"
+        ).pack(side="left")
+        
+        ttk.Combobox(
+            deal_frame,
+            textvariable=self.sort_by_var,
+            values=["Value", "Deal score"],
+            state="readonly",
+            font=self.small_font,
+            width=12
+        ).pack(side="left", padx=(5, 20))
+        
+        tk.Label(
+            deal_frame,
+            text="Only deals at or below market percentile:",
+            font=self.small_font,
+            bg="#1e293b",
+            fg="#cbd5e1"
+        ).pack(side="left")
+        
+        tk.Entry(
+            deal_frame,
+            textvariable=self.max_deal_var,
+            font=self.small_font,
+            bg="#0f172a",
+            fg="#e2e8f0",
+            insertbackground="white",
+            width=6,
+            relief=tk.FLAT
+        ).pack(side="left", padx=5, ipady=3)
+        
         if self.config['sets']:
             # Action buttons
             buttons_frame = tk.Frame(self.search_frame, bg="#0f172a")
@@ -800,6 +1095,111 @@ class MuDreamCollectionFinder:
                 width=15
             )
             debug_btn.pack(side="left", padx=5)
+            
+            plan_btn = self.create_modern_button(
+                buttons_frame,
+                "🧮  Plan Purchases",
+                self.open_planner,
+                "#0ea5e9",
+                width=16
+            )
+            plan_btn.pack(side="left", padx=5)
+            
+            record_cb = tk.Checkbutton(
+                buttons_frame,
+                text="⏺ Record traffic",
+                variable=self.record_traffic,
+                font=self.small_font,
+                bg="#0f172a",
+                fg="#94a3b8",
+                selectcolor="#1e293b",
+                activebackground="#0f172a",
+                activeforeground="#e2e8f0"
+            )
+            record_cb.pack(side="left", padx=10)
+            
+            profile_cb = tk.Checkbutton(
+                buttons_frame,
+                text="🧪 Profile scan",
+                variable=self.profile_scans,
+                font=self.small_font,
+                bg="#0f172a",
+                fg="#94a3b8",
+                selectcolor="#1e293b",
+                activebackground="#0f172a",
+                activeforeground="#e2e8f0"
+            )
+            profile_cb.pack(side="left")
+            
+            snapshot_cb = tk.Checkbutton(
+                buttons_frame,
+                text="💾 Save snapshots",
+                variable=self.save_snapshots,
+                font=self.small_font,
+                bg="#0f172a",
+                fg="#94a3b8",
+                selectcolor="#1e293b",
+                activebackground="#0f172a",
+                activeforeground="#e2e8f0"
+            )
+            snapshot_cb.pack(side="left", padx=10)
+            
+            export_cb = tk.Checkbutton(
+                buttons_frame,
+                text="📤 Export results",
+                variable=self.export_results,
+                font=self.small_font,
+                bg="#0f172a",
+                fg="#94a3b8",
+                selectcolor="#1e293b",
+                activebackground="#0f172a",
+                activeforeground="#e2e8f0"
+            )
+            export_cb.pack(side="left")
+            
+            export_format_combo = ttk.Combobox(
+                buttons_frame,
+                textvariable=self.export_format,
+                values=["CSV", "JSONL"],
+                state="readonly",
+                width=6,
+                font=self.small_font
+            )
+            export_format_combo.pack(side="left", padx=(4, 0))
+        
+        # Scan statistics panel
+        stats_frame = tk.Frame(self.search_frame, bg="#1e293b", padx=12, pady=8)
+        stats_frame.pack(fill="x", padx=25, pady=(0, 5))
+        
+        stats_header = tk.Frame(stats_frame, bg="#1e293b")
+        stats_header.pack(fill="x")
+        
+        tk.Label(
+            stats_header,
+            text="⏱ Scan Stats",
+            font=self.button_font,
+            bg="#1e293b",
+            fg="#a78bfa"
+        ).pack(side="left")
+        
+        export_stats_btn = self.create_modern_button(
+            stats_header,
+            "Export JSONL",
+            self.export_stats,
+            "#334155"
+        )
+        export_stats_btn.pack(side="right")
+        
+        self.stats_label = tk.Label(
+            stats_frame,
+            text=self.market.stats.format_summary(),
+            font=("Consolas", 8),
+            bg="#1e293b",
+            fg="#94a3b8",
+            justify="left",
+            anchor="w"
+        )
+        self.stats_label.pack(fill="x", pady=(4, 0))
         
         # Results label
         results_label = tk.Label(
@@ -825,6 +1225,40 @@ class MuDreamCollectionFinder:
         )
         self.results_text.pack(fill="both", expand=True, padx=25, pady=(5, 20))
     
+    def on_valuation_mode_changed(self):
+        """Switch ranking between the fixed weight table and live market rates"""
+        self.market.live_rates = self.live_rates_var.get()
+        self.update_rates_label()
+    
+    def update_rates_label(self):
+        """Show the live rates currently derived from the market"""
+        if not hasattr(self, 'rates_label'):
+            return
+        count = self.market.valuation.observation_count()
+        if count:
+            text = f"Live rates from {count} multi-currency lot(s): {self.market.valuation.describe()}"
+        else:
+            text = "No multi-currency lots seen yet • fixed weights are used until a search finds some"
+        self.rates_label.config(text=text)
+    
+    def apply_deal_settings(self):
+        """Copy the sort and deal-score filter controls onto the searcher"""
+        self.market.sort_by = 'deal' if self.sort_by_var.get() == "Deal score" else 'value'
+        value = self.max_deal_var.get().strip()
+        try:
+            self.market.max_deal_percentile = float(value) if value else None
+        except ValueError:
+            self.market.max_deal_percentile = None
+    
+    def start_deadline(self):
+        """Give the scan its time budget from the time limit field (if any)"""
+        value = self.time_limit_var.get().strip()
+        try:
+            limit = float(value) if value else None
+        except ValueError:
+            limit = None
+        self.market.deadline = time.monotonic() + limit if limit and limit > 0 else None
+    
     def get_price_filters(self):
         """Get active price filters"""
         filters = {}
@@ -839,386 +1273,47 @@ class MuDreamCollectionFinder:
     
     def matches_price_filter(self, lot, price_filters):
         """Check if a lot matches the price filters"""
-        if not price_filters:
-            return True
-        
-        prices = lot.get('Prices', [])
-        if not prices:
-            return False
-        
-        currency_map = {
-            'Bless': 'bless',
-            'Soul': 'soul',
-            'Life': 'life',
-            'Chaos': 'chaos',
-            'Creation': 'creat',
-            'Zen': 'zen',
-            'DC': 'dc'
-        }
-        
-        api_filters = {}
-        for user_name, limit in price_filters.items():
-            api_code = currency_map.get(user_name)
-            if api_code:
-                api_filters[api_code] = limit
-        
-        jewel_codes = ['bless', 'soul', 'life', 'chaos', 'creat']
-        jewel_filters = {k: v for k, v in api_filters.items() if k in jewel_codes}
-        zen_filter = api_filters.get('zen')
-        dc_filter = api_filters.get('dc')
-        
-        lot_prices = {}
-        for price in prices:
-            currency_code = price['Currency']['code'].lower()
-            lot_prices[currency_code] = price['value']
-        
-        has_jewels = any(jewel in lot_prices for jewel in jewel_codes)
-        has_zen = 'zen' in lot_prices
-        has_dc = 'dc' in lot_prices
-        
-        if has_jewels and jewel_filters:
-            for jewel in jewel_codes:
-                if jewel in lot_prices:
-                    if jewel not in jewel_filters:
-                        return False
-                    if lot_prices[jewel] > jewel_filters[jewel]:
-                        return False
-            return True
-        
-        if has_zen and zen_filter is not None:
-            return lot_prices['zen'] <= zen_filter
-        
-        if has_dc and dc_filter is not None:
-            return lot_prices['dc'] <= dc_filter
-        
-        return False
+        return self.market.matches_price_filter(lot, price_filters)
     
     def build_query(self, set_name, piece, options):
         """Build GraphQL query"""
-        return {
-            "operationName": "GET_ALL_LOTS",
-            "query": """query GET_ALL_LOTS($offset: NonNegativeInt, $limit: NonNegativeInt, $sort: LotsSortInput, $filter: LotsFilterInput) {
-                lots(limit: $limit, offset: $offset, sort: $sort, filter: $filter) {
-                    Lots {
-                        id
-                        source
-                        isMine
-                        type
-                        gearScore
-                        hasPendingCounterOffer
-                        Prices {
-                            value
-                            Currency {
-                                id
-                                code
-                                type
-                                title
-                                __typename
-                            }
-                            __typename
-                        }
-                        Currencies {
-                            id
-                            code
-                            type
-                            title
-                            isAvailableForLots
-                            __typename
-                        }
-                        __typename
-                    }
-                    Pagination {
-                        total
-                        currentPage
-                        nextPageExists
-                        __typename
-                    }
-                    __typename
-                }
-            }""",
-            "variables": {
-                "filter": {
-                    "name": set_name,
-                    "type": [piece],
-                    **options
-                },
-                "limit": 50,
-                "offset": 0,
-                "sort": {
-                    "field": "LOT_FIELD_UPDATED_AT",
-                    "type": "SORT_TYPE_DESC"
-                }
-            }
-        }
+        return self.market.build_query(set_name, piece, options)
     
     def calculate_normalized_price(self, lot):
         """Calculate normalized price based on jewel values"""
-        prices = lot.get('Prices', [])
-        if not prices:
-            return float('inf')  # Items without price go to the end
-        
-        # Valuation: Life/Chaos = 1.0, Creation = 0.5, Bless/Soul = 0.25, DC = 0.125 (1/8)
-        price_weights = {
-            'life': 1.0,
-            'chaos': 1.0,
-            'creat': 0.5,
-            'bless': 0.25,
-            'soul': 0.25,
-            'dc': 0.125,
-            'zen': 0.0  # Zen not valued in comparison
-        }
-        
-        total_value = 0.0
-        for price in prices:
-            currency_code = price['Currency']['code'].lower()
-            value = price['value']
-            weight = price_weights.get(currency_code, 0.0)
-            total_value += value * weight
-        
-        return total_value
+        return self.market.calculate_normalized_price(lot)
     
     def format_price(self, prices):
         """Format price display"""
-        if not prices:
-            return "No price listed"
-        return " or ".join([f"{p['value']:,} {p['Currency']['code']}" for p in prices])
+        return self.market.format_price(prices)
     
     def search_piece(self, set_name, piece, requirements, bearer_token, price_filters):
         """Search for a single piece"""
-        # Skip pieces that don't exist for this set
-        if piece == 'gloves' and set_name in self.sets_missing_gloves:
-            return {
-                'piece': piece,
-                'set': set_name,
-                'skipped': True,
-                'message': 'This set has no gloves'
-            }
-        
-        if piece == 'helm' and set_name in self.sets_missing_helm:
-            return {
-                'piece': piece,
-                'set': set_name,
-                'skipped': True,
-                'message': 'This set has no helmet'
-            }
-        
-        if not requirements or piece not in requirements:
-            return {
-                'piece': piece,
-                'set': set_name,
-                'skipped': True,
-                'message': 'No requirements configured'
-            }
-        
-        piece_data = requirements[piece]
-        
-        # Handle both old format (list) and new format (dict)
-        if isinstance(piece_data, list):
-            required_options = piece_data
-            is_collected = False
-        else:
-            required_options = piece_data.get('options', [])
-            is_collected = piece_data.get('collected', False)
-        
-        # Skip if already collected
-        if is_collected:
-            return {
-                'piece': piece,
-                'set': set_name,
-                'skipped': True,
-                'collected': True,
-                'message': '✓ Already collected'
-            }
-        
-        if not required_options:
-            return {
-                'piece': piece,
-                'set': set_name,
-                'skipped': True,
-                'message': 'No excellent options required'
-            }
-        
-        options = {opt: [0, 1, 2, 3, 4] for opt in required_options}
-        query = self.build_query(set_name, piece, options)
-        
-        try:
-            token = bearer_token.replace('Bearer ', '').strip()
-            
-            headers = {
-                'Content-Type': 'application/json',
-                'Authorization': f'Bearer {token}',
-                'Accept': 'application/graphql-response+json, application/json'
-            }
-            
-            response = requests.post(
-                self.api_url,
-                json=query,
-                headers=headers,
-                timeout=10
-            )
-            
-            data = response.json()
-            
-            if 'data' in data and 'lots' in data['data']:
-                all_lots = data['data']['lots']['Lots']
-                filtered_lots = [lot for lot in all_lots if self.matches_price_filter(lot, price_filters)]
-                
-                # Sort by normalized price (cheapest first)
-                filtered_lots.sort(key=self.calculate_normalized_price)
-                
-                return {
-                    'piece': piece,
-                    'set': set_name,
-                    'total': len(all_lots),
-                    'filtered_total': len(filtered_lots),
-                    'lots': filtered_lots
-                }
-            else:
-                return {
-                    'piece': piece,
-                    'set': set_name,
-                    'error': True,
-                    'message': 'Failed to fetch data or no data returned'
-                }
-        except Exception as e:
-            return {
-                'piece': piece,
-                'set': set_name,
-                'error': True,
-                'message': str(e)
-            }
+        return self.market.search_piece(set_name, piece, requirements, bearer_token, price_filters)
     
     def display_results(self, all_results, price_filters):
-        """Display results in text widget"""
-        self.results_text.config(state='normal')
-        self.results_text.delete(1.0, tk.END)
-        
-        self.results_text.insert(tk.END, f"{'='*80}\n", "header")
-        self.results_text.insert(tk.END, f"Search Results for All Configured Collections\n", "header")
-        
-        if price_filters:
-            filter_text = ", ".join([f"{k} ≤ {v:,.0f}" for k, v in price_filters.items()])
-            self.results_text.insert(tk.END, f"Price Filters: {filter_text}\n", "header")
-        
-        self.results_text.insert(tk.END, f"Sorted by price (cheapest first)\n", "header")
-        self.results_text.insert(tk.END, f"Value calc: Life/Chaos=1.0, Creation=0.5, Bless/Soul=0.25, DC=0.125\n", "header")
-        self.results_text.insert(tk.END, f"{'='*80}\n\n", "header")
-        
-        total_items_found = 0
-        total_collected = 0
-        
-        for set_name, results in all_results.items():
-            self.results_text.insert(tk.END, f"\n{'█'*80}\n", "set_header")
-            self.results_text.insert(tk.END, f"  {set_name} SET\n", "set_header")
-            self.results_text.insert(tk.END, f"{'█'*80}\n\n", "set_header")
+        """Display results in text widget, updating the previous results in place"""
+        with self.market.stats.timer('render', sets=len(all_results)) as event:
+            model = build_render_model(all_results, price_filters, self.config['sets'], self.market,
+                                       self.section_cache, self.limits['max_rendered_lines'])
+            event['unchanged'] = model.unchanged
             
-            for result in results:
-                piece_name = result['piece'].upper()
-                piece_type = result['piece']
-                
-                self.results_text.insert(tk.END, f"[{piece_name}]\n", "piece_header")
-                self.results_text.insert(tk.END, "-" * 80 + "\n")
-                
-                if result.get('skipped'):
-                    if result.get('collected'):
-                        self.results_text.insert(tk.END, f"✓ {result['message']}\n\n", "collected")
-                        total_collected += 1
-                    else:
-                        self.results_text.insert(tk.END, f"⊘ {result['message']}\n\n", "skipped")
-                elif result.get('error'):
-                    self.results_text.insert(tk.END, f"✗ ERROR: {result['message']}\n\n", "error")
-                else:
-                    total = result['total']
-                    filtered = result['filtered_total']
-                    total_items_found += filtered
-                    
-                    if price_filters:
-                        self.results_text.insert(tk.END, f"Found {total} total, {filtered} match price filters\n\n", "info")
-                    else:
-                        self.results_text.insert(tk.END, f"Found {total} listing(s)\n\n", "info")
-                    
-                    # Get the required excellent options for this piece
-                    required_opts = []
-                    if set_name in self.config['sets'] and piece_type in self.config['sets'][set_name]:
-                        piece_data = self.config['sets'][set_name][piece_type]
-                        if isinstance(piece_data, list):
-                            opt_codes = piece_data
-                        else:
-                            opt_codes = piece_data.get('options', [])
-                        
-                        opt_labels = {
-                            'iml': 'MH', 'imsd': 'SD', 'dd': 'DD',
-                            'rd': 'REF', 'dsr': 'DSR', 'izdr': 'ZEN'
-                        }
-                        required_opts = [opt_labels.get(code, code) for code in opt_codes]
-                    
-                    # Show search criteria
-                    if required_opts and filtered > 0:
-                        search_criteria = f"Set: {set_name} | Type: {piece_type} | Options: {'+'.join(required_opts)}"
-                        self.results_text.insert(tk.END, f"🔍 To find in market: ", "search_label")
-                        
-                        # Make criteria copyable
-                        criteria_tag = f"criteria_{set_name}_{piece_type}"
-                        self.results_text.insert(tk.END, search_criteria, (criteria_tag, "criteria"))
-                        
-                        def make_copy_criteria_handler(criteria_text):
-                            def handler(event):
-                                self.root.clipboard_clear()
-                                self.root.clipboard_append(criteria_text)
-                                self.root.update()
-                                messagebox.showinfo("Copied!", f"Search criteria copied!\n\n{criteria_text}", parent=self.root)
-                            return handler
-                        
-                        self.results_text.tag_bind(criteria_tag, "<Button-1>", make_copy_criteria_handler(search_criteria))
-                        self.results_text.tag_bind(criteria_tag, "<Enter>",
-                            lambda e: self.results_text.config(cursor="hand2"))
-                        self.results_text.tag_bind(criteria_tag, "<Leave>",
-                            lambda e: self.results_text.config(cursor=""))
-                        
-                        # Add open market button
-                        self.results_text.insert(tk.END, " ", "detail")
-                        market_tag = f"market_{set_name}_{piece_type}"
-                        self.results_text.insert(tk.END, "[Open Market]", (market_tag, "market_link"))
-                        
-                        def make_market_handler():
-                            def handler(event):
-                                webbrowser.open("https://mudream.online/market")
-                            return handler
-                        
-                        self.results_text.tag_bind(market_tag, "<Button-1>", make_market_handler())
-                        self.results_text.tag_bind(market_tag, "<Enter>",
-                            lambda e: self.results_text.config(cursor="hand2"))
-                        self.results_text.tag_bind(market_tag, "<Leave>",
-                            lambda e: self.results_text.config(cursor=""))
-                        
-                        self.results_text.insert(tk.END, "\n", "detail")
-                        self.results_text.insert(tk.END, f"💡 Click criteria to copy, then apply filters manually in market\n\n", "hint")
-                    
-                    if result['lots']:
-                        for idx, lot in enumerate(result['lots'], 1):
-                            price = self.format_price(lot['Prices'])
-                            gs = f" (GS: {lot['gearScore']})" if lot.get('gearScore') else ""
-                            mine = " ⭐ YOUR ITEM" if lot.get('isMine') else ""
-                            
-                            # Calculate normalized price for display
-                            norm_price = self.calculate_normalized_price(lot)
-                            norm_display = f" [Value: {norm_price:.2f}]" if norm_price != float('inf') else ""
-                            
-                            friendly_name = f"{set_name} {piece_name.title()} #{idx}"
-                            
-                            self.results_text.insert(tk.END, f"  {idx}. {friendly_name}{gs}{mine}{norm_display}\n", "item_name")
-                            self.results_text.insert(tk.END, f"     💰 {price}\n", "price")
-                            self.results_text.insert(tk.END, f"     📦 {lot.get('source', 'Market')}\n\n", "detail")
-                    else:
-                        self.results_text.insert(tk.END, "  No items match your price filters\n\n", "no_results")
-        
-        # Summary
-        self.results_text.insert(tk.END, f"\n{'='*80}\n", "header")
-        self.results_text.insert(tk.END, f"📊 SUMMARY: Found {total_items_found} item(s)", "header")
-        if total_collected > 0:
-            self.results_text.insert(tk.END, f" • Skipped {total_collected} collected piece(s)", "collected")
-        self.results_text.insert(tk.END, "\n", "header")
-        self.results_text.insert(tk.END, f"{'='*80}\n", "header")
+            self.results_text.config(state='normal')
+            if self.shown_sections:
+                event['sections_written'] = self.apply_section_diff(model.sections)
+            else:
+                self.draw_sections(model.sections)
+                event['sections_written'] = len(model.sections)
+            self.shown_sections = model.sections
+            shown = {(name, r['piece']) for name, results in all_results.items() for r in results}
+            self.unfinished_pieces = [
+                (name, r['piece']) for name, results in all_results.items() for r in results
+                if r.get('error') or r.get('timed_out')
+            ] + [key for key in self.pending_pieces if key not in shown]
+            event['chars'] = int(self.results_text.count(1.0, tk.END, 'chars')[0])
+        
+        for tag, (action, value) in model.links.items():
+            self.bind_result_link(tag, action, value)
         
         self.results_text.tag_config("header", foreground="#a78bfa", font=("Consolas", 10, "bold"))
         self.results_text.tag_config("set_header", foreground="#fbbf24", font=("Consolas", 11, "bold"))
@@ -1235,18 +1330,288 @@ class MuDreamCollectionFinder:
         self.results_text.tag_config("collected", foreground="#10b981", font=("Consolas", 9, "bold", "italic"))
         self.results_text.tag_config("error", foreground="#ef4444")
         self.results_text.tag_config("no_results", foreground="#94a3b8", font=("Consolas", 9, "italic"))
+        self.results_text.tag_config("timed_out", foreground="#f59e0b", font=("Consolas", 9, "italic"))
+        self.results_text.tag_config("lot_new", background="#14532d")
+        self.results_text.tag_config("lot_changed", background="#713f12")
+        self.results_text.tag_config("details_link", foreground="#60a5fa", font=("Consolas", 8, "underline"))
+        self.results_text.tag_config("lot_details", foreground="#cbd5e1", font=("Consolas", 8))
+        
+        self.update_stats_panel()
+        self.update_rates_label()
+        if hasattr(self, 'continue_btn'):
+            self.continue_btn.config(state="normal" if self.unfinished_pieces else "disabled")
+    
+    def clear_results(self):
+        """Empty the results pane and forget the sections drawn in it"""
+        self.results_text.delete(1.0, tk.END)
+        for mark in self.section_marks.values():
+            self.results_text.mark_unset(mark)
+        self.section_marks = {}
+        self.shown_sections = []
+    
+    def draw_sections(self, sections):
+        """Redraw the results pane from scratch, marking where each section starts"""
+        self.clear_results()
+        for key, segments in sections:
+            self.section_marks[key] = self.new_section_mark(tk.END)
+            self.insert_segments(tk.END, segments)
+        self.results_text.mark_set("results_end", "end-1c")
+        self.results_text.mark_gravity("results_end", "left")
+    
+    def new_section_mark(self, index):
+        """Create a left-gravity mark so text inserted at it lands after it"""
+        self.mark_counter += 1
+        mark = f"section_{self.mark_counter}"
+        self.results_text.mark_set(mark, self.results_text.index(index) if index != tk.END else "end-1c")
+        self.results_text.mark_gravity(mark, "left")
+        return mark
+    
+    def insert_segments(self, index, segments):
+        """Insert (text, tags) segments with a single widget call"""
+        args = []
+        for text, tags in segments:
+            args.extend((text, tags))
+        if args:
+            self.results_text.insert(index, *args)
+    
+    def section_end(self, mark):
+        """Mark where the section starting at mark ends (next section or results_end)"""
+        name = self.results_text.mark_next(mark)
+        while name and not (name.startswith("section_") or name == "results_end"):
+            name = self.results_text.mark_next(name)
+        return name or "results_end"
+    
+    def write_section(self, start, end, segments):
+        """Insert segments between two marks sitting at the same position"""
+        # Right gravity pushes the end mark past the new text
+        self.results_text.mark_gravity(end, "right")
+        self.insert_segments(start, segments)
+        self.results_text.mark_gravity(end, "left")
+    
+    def apply_section_diff(self, sections):
+        """Update the results pane to sections, touching only what changed
+        
+        Lots that appeared are highlighted green and re-priced lots amber
+        until the next refresh. The scroll position is kept.
+        """
+        text = self.results_text
+        deleted, replaced, inserted = diff_sections(self.shown_sections, sections)
+        
+        # Drop the progress lines written during the scan and old highlights
+        text.delete("results_end", tk.END)
+        text.tag_remove("lot_new", 1.0, tk.END)
+        text.tag_remove("lot_changed", 1.0, tk.END)
+        text.mark_set("view_top", "@0,0")
+        
+        for key in deleted:
+            mark = self.section_marks.pop(key)
+            text.delete(mark, self.section_end(mark))
+            text.mark_unset(mark)
+        
+        for key, segments, highlight in replaced:
+            mark = self.section_marks[key]
+            end = self.section_end(mark)
+            text.delete(mark, end)
+            self.write_section(mark, end, segments)
+            if highlight:
+                text.tag_add(f"lot_{highlight}", mark, end)
+        
+        for key, segments, anchor, highlight in inserted:
+            end = self.section_marks[anchor] if anchor is not None else "results_end"
+            mark = self.section_marks[key] = self.new_section_mark(end)
+            self.write_section(mark, end, segments)
+            if highlight:
+                text.tag_add(f"lot_{highlight}", mark, end)
+        
+        text.yview("view_top")
+        return len(replaced) + len(inserted)
+    
+    def update_stats_panel(self):
+        """Refresh the scan statistics panel"""
+        if hasattr(self, 'stats_label'):
+            self.stats_label.config(text="\n".join((
+                self.market.stats.format_summary(), self.memory_readout(), self.startup.format_summary()
+            )))
+    
+    def memory_readout(self):
+        """One line on process memory and the size of the session's caches"""
+        usage = self.market.memory_usage()
+        rss = process_memory_kb()
+        parts = [f"memory {rss / 1024:,.0f} MB" if rss is not None else "memory n/a"]
+        parts.append(f"cache {usage['cached_pieces']} piece(s) / {usage['cached_lots']} lot(s)")
+        parts.append(f"results {len(self.shown_sections)} section(s)")
+        parts.append(f"events {usage['stats_events']}/{self.limits['max_stats_events']}")
+        parts.append(f"rate lots {usage['rate_lots']}")
+        parts.append(f"prefetch {self.prefetcher.hits}/{self.prefetcher.prefetched} used")
+        return " • ".join(parts)
+    
+    def export_stats(self):
+        """Export the last scan's timing events as JSON lines"""
+        if not self.market.stats.events:
+            messagebox.showinfo("Scan Stats", "Run a search first to collect statistics.")
+            return
+        
+        path = filedialog.asksaveasfilename(
+            title="Export scan statistics",
+            defaultextension=".jsonl",
+            initialfile=time.strftime("scan_stats_%Y%m%d_%H%M%S.jsonl"),
+            filetypes=[("JSON Lines", "*.jsonl"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        
+        try:
+            self.market.stats.export_jsonl(path)
+            messagebox.showinfo("Success", f"Statistics exported to:\n{path}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export statistics: {e}")
+    
+    def open_planner(self):
+        """Open the budget purchase planner for the last search results"""
+        if not self.last_results:
+            messagebox.showinfo("Purchase Planner", "Run a search first - the planner works on its results.")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Purchase Planner")
+        window.geometry("760x560")
+        window.configure(bg="#0f172a")
+        
+        budget_frame = tk.Frame(window, bg="#1e293b", padx=12, pady=12)
+        budget_frame.pack(fill="x", padx=15, pady=10)
+        
+        tk.Label(
+            budget_frame,
+            text="💰 Budget",
+            font=self.heading_font,
+            bg="#1e293b",
+            fg="#a78bfa"
+        ).grid(row=0, column=0, columnspan=6, sticky="w", pady=(0, 8))
+        
+        budget_vars = {}
+        for idx, currency_name in enumerate(self.currencies):
+            var = tk.StringVar()
+            budget_vars[currency_name] = var
+            tk.Label(
+                budget_frame,
+                text=f"{currency_name}:",
+                font=self.body_font,
+                bg="#1e293b",
+                fg="#cbd5e1"
+            ).grid(row=1 + idx // 3, column=(idx % 3) * 2, sticky="w", padx=(0, 5), pady=3)
+            tk.Entry(
+                budget_frame,
+                textvariable=var,
+                font=self.body_font,
+                bg="#0f172a",
+                fg="#e2e8f0",
+                insertbackground="white",
+                width=12,
+                relief=tk.FLAT
+            ).grid(row=1 + idx // 3, column=(idx % 3) * 2 + 1, sticky="w", padx=(0, 15), pady=3)
+        
+        output = scrolledtext.ScrolledText(
+            window,
+            font=("Consolas", 9),
+            bg="#0f172a",
+            fg="#e2e8f0",
+            wrap=tk.WORD,
+            relief=tk.FLAT
+        )
+        
+        def run_planner():
+            budget = {}
+            for currency_name, var in budget_vars.items():
+                value = var.get().strip()
+                if value:
+                    try:
+                        budget[CURRENCY_MAP[currency_name]] = float(value)
+                    except ValueError:
+                        pass
+            if not budget:
+                messagebox.showerror("Error", "Please enter a budget for at least one currency!", parent=window)
+                return
+            
+            output.delete(1.0, tk.END)
+            output.insert(tk.END, "Planning...\n")
+            
+            def worker():
+                plan = PurchasePlanner(budget, self.market.current_weights()).solve(self.last_results)
+                output.delete(1.0, tk.END)
+                output.insert(tk.END, format_plan(plan))
+            
+            threading.Thread(target=worker, daemon=True).start()
+        
+        self.create_modern_button(
+            budget_frame,
+            "🧮 Plan",
+            run_planner,
+            "#8b5cf6",
+            width=10
+        ).grid(row=3, column=0, columnspan=2, sticky="w", pady=(8, 0))
+        
+        output.pack(fill="both", expand=True, padx=15, pady=(0, 15))
+    
+    def bind_result_link(self, tag, action, value):
+        """Make a tagged range in the results pane clickable"""
+        def handler(event):
+            if action == 'copy':
+                self.root.clipboard_clear()
+                self.root.clipboard_append(value)
+                self.root.update()
+                messagebox.showinfo("Copied!", f"Search criteria copied!\n\n{value}", parent=self.root)
+            elif action == 'details':
+                self.toggle_lot_details(tag, *value)
+            else:
+                webbrowser.open(value)
+        
+        self.results_text.tag_bind(tag, "<Button-1>", handler)
+        self.results_text.tag_bind(tag, "<Enter>",
+            lambda e: self.results_text.config(cursor="hand2"))
+        self.results_text.tag_bind(tag, "<Leave>",
+            lambda e: self.results_text.config(cursor=""))
+    
+    def toggle_lot_details(self, tag, lot_id, section_key):
+        """Expand a lot's full details below it, or collapse them again"""
+        text = self.results_text
+        body_tag = f"body_{tag}"
+        ranges = text.tag_ranges(body_tag)
+        if ranges:
+            text.delete(ranges[0], ranges[-1])
+            return
+        if section_key not in self.section_marks:
+            return
+        
+        bearer_token = self.bearer_token.get().strip()
+        
+        def worker():
+            try:
+                detail = self.market.fetch_lot_detail(lot_id, bearer_token)
+                segments = detail_segments(detail, self.market, f"open_{tag}")
+            except Exception as e:
+                segments = [(f"       Details unavailable: {e}\n", ("error",))]
+            
+            mark = self.section_marks.get(section_key)
+            if mark is None or text.tag_ranges(body_tag):
+                return  # Redrawn or already expanded while fetching
+            # Before the blank line that closes the lot section
+            index = text.index(f"{self.section_end(mark)} -1c")
+            self.insert_segments(index, [(t, tags + (body_tag,)) for t, tags in segments])
+            self.bind_result_link(f"open_{tag}", 'open', lot_url(lot_id))
+        
+        threading.Thread(target=worker, daemon=True).start()
     
     def search_thread(self):
-        """Run search in separate thread"""
+        """Run search in separate thread; returns whether the market was scanned here (not by the daemon)"""
         if not self.config['sets']:
             messagebox.showerror("Error", "No collections configured! Go to Setup tab first.")
-            return
+            return False
         
         bearer_token = self.bearer_token.get().strip()
         
         if not bearer_token:
             messagebox.showerror("Error", "Please enter your Bearer token!")
-            return
+            return False
         
         selected_set = self.search_set_selection.get()
         
@@ -1256,33 +1621,266 @@ class MuDreamCollectionFinder:
         else:
             if selected_set not in self.config['sets']:
                 messagebox.showerror("Error", f"Set '{selected_set}' not found in configuration!")
-                return
+                return False
             sets_to_search = {selected_set: self.config['sets'][selected_set]}
             search_count = 1
         
         price_filters = self.get_price_filters()
+        self.apply_deal_settings()
+        self.market.stats = ScanStats(self.limits['max_stats_events'])
+        self.warm_results = False
         
-        self.results_text.delete(1.0, tk.END)
-        self.results_text.insert(tk.END, f"🔍 Searching {search_count} set(s)...\n\n")
+        if self.shown_sections:
+            # Keep the previous results on screen; they are updated in place
+            self.results_text.insert(tk.END, f"\n🔍 Refreshing {search_count} set(s)...\n\n")
+        else:
+            self.clear_results()
+            self.results_text.insert(tk.END, f"🔍 Searching {search_count} set(s)...\n\n")
         
         all_results = {}
         
-        for set_name, requirements in sets_to_search.items():
-            self.results_text.insert(tk.END, f"Searching {set_name}...\n")
-            set_results = []
-            
-            for piece in self.piece_types:
-                result = self.search_piece(set_name, piece, requirements, bearer_token, price_filters)
-                set_results.append(result)
-                self.results_text.insert(tk.END, f"  - {piece}...\n")
-            
-            all_results[set_name] = set_results
+        if self.save_snapshots.get():
+            self.snapshot_writer.begin_scan()
+            self.market.add_lot_listener(self.snapshot_writer)
         
+        if self.export_results.get():
+            extension = self.export_format.get().lower()
+            path = os.path.join(self.export_dir, time.strftime(f"results_%Y%m%d_%H%M%S.{extension}"))
+            self.result_exporter = ResultExporter(path).open()
+        
+        self.last_price_filters = price_filters
+        self.start_deadline()
+        scanned = False
+        try:
+            if not self.load_daemon_results(sets_to_search, price_filters, all_results):
+                self.pending_pieces = []
+                self.checkpoint.begin([(s, p) for s in sets_to_search for p in self.piece_types], price_filters)
+                self.scan_sets(sets_to_search, bearer_token, price_filters, all_results)
+                scanned = True
+        finally:
+            self.market.deadline = None
+            if self.snapshot_writer.file is not None:
+                self.market.remove_lot_listener(self.snapshot_writer)
+                self.snapshot_writer.end_scan()
+            exporter, self.result_exporter = self.result_exporter, None
+            if exporter is not None:
+                exporter.close()
+        
+        self.last_results = all_results
         self.display_results(all_results, price_filters)
+        if exporter is not None:
+            self.results_text.insert(tk.END, f"\n📤 Exported {exporter.rows} lot(s) to {exporter.path}\n", "info")
+        return scanned
+    
+    def load_daemon_results(self, sets_to_search, price_filters, all_results):
+        """Fill all_results from the background daemon; False means scan locally"""
+        if self.daemon is None:
+            return False
+        try:
+            results = self.daemon.results(list(sets_to_search), price_filters, self.market.sort_by,
+                                          self.market.max_deal_percentile)
+        except (OSError, ValueError, KeyError) as e:
+            self.results_text.insert(tk.END, f"  Daemon unavailable ({e}), searching directly...\n", "error")
+            return False
+        
+        for set_name in sets_to_search:
+            all_results[set_name] = results.get(set_name, [])
+            for result in all_results[set_name]:
+                self.show_piece_progress(result)
+                if self.result_exporter is not None:
+                    self.result_exporter.write_result(result, self.market)
+        return True
+    
+    def scan_sets(self, sets_to_search, bearer_token, price_filters, all_results, only=None):
+        """Search every piece of the given sets in priority order, filling all_results
+        
+        With only (a set of (set, piece) keys) just those pieces are searched
+        and the other entries already in all_results are kept.
+        """
+        plan = plan_scan(sets_to_search, self.config.get('priorities', {}), self.activity, self.query_plan)
+        piece_results = {}
+        
+        for set_name, piece in plan:
+            if only is not None and (set_name, piece) not in only:
+                continue
+            result = self.search_piece(set_name, piece, sets_to_search[set_name], bearer_token, price_filters)
+            piece_results[(set_name, piece)] = result
+            self.show_piece_progress(result)
+            self.checkpoint.record(result)
+            if self.result_exporter is not None:
+                self.result_exporter.write_result(result, self.market)
+        
+        # Keep the configured set/piece order for the final display
+        for set_name in sets_to_search:
+            previous = {r['piece']: r for r in all_results.get(set_name, [])}
+            all_results[set_name] = [
+                piece_results.get((set_name, piece)) or previous[piece]
+                for piece in self.piece_types
+                if (set_name, piece) in piece_results or piece in previous
+            ]
+        
+        self.activity.save()
+    
+    def show_piece_progress(self, result):
+        """Report a finished piece, including its best lot, while the scan runs"""
+        label = f"{result['set']} {result['piece']}"
+        if result.get('skipped'):
+            return
+        if result.get('timed_out'):
+            self.results_text.insert(tk.END, f"  ⏱ {label}: timed out\n", "timed_out")
+        elif result.get('error'):
+            self.results_text.insert(tk.END, f"  ✗ {label}: {result['message']}\n", "error")
+        elif result['lots']:
+            best = result['lots'][0]
+            value = self.calculate_normalized_price(best)
+            value_text = f" [Value: {value:.2f}]" if value != float('inf') else ""
+            self.results_text.insert(
+                tk.END,
+                f"  ✓ {label}: {result['filtered_total']} match • best {self.format_price(best['Prices'])}{value_text}\n"
+            )
+        else:
+            self.results_text.insert(tk.END, f"  - {label}: no matches\n")
+        if not self.shown_sections:
+            self.results_text.see(tk.END)
+    
+    def rescan_thread(self, keys):
+        """Search only the given (set, piece) keys again and merge them into the shown results"""
+        bearer_token = self.bearer_token.get().strip()
+        if not bearer_token:
+            messagebox.showerror("Error", "Please enter your Bearer token!")
+            return
+        
+        sets_to_search = {s: self.config['sets'][s] for s, _ in keys if s in self.config['sets']}
+        all_results = {name: list(results) for name, results in self.last_results.items()}
+        self.apply_deal_settings()
+        self.results_text.insert(tk.END, f"\n🔁 Searching {len(keys)} piece(s) again...\n\n")
+        
+        self.start_deadline()
+        try:
+            self.scan_sets(sets_to_search, bearer_token, self.last_price_filters, all_results, only=set(keys))
+        finally:
+            self.market.deadline = None
+        
+        self.pending_pieces = [key for key in self.pending_pieces if key not in set(keys)]
+        self.last_results = all_results
+        self.display_results(all_results, self.last_price_filters)
+    
+    def retry_unfinished(self):
+        """Search again only the pieces that failed, timed out or were never reached"""
+        if not self.unfinished_pieces:
+            return
+        keys = list(self.unfinished_pieces)
+        thread = threading.Thread(target=self.rescan_thread, args=(keys,), daemon=True)
+        thread.start()
+    
+    def offer_resume(self):
+        """Show an interrupted or partly failed scan from the checkpoint so it can be finished"""
+        state = self.checkpoint.load()
+        if not state or not state['unfinished']:
+            return
+        
+        sets = [name for name in dict.fromkeys(s for s, _ in state['pieces']) if name in self.config['sets']]
+        if not sets:
+            return
+        all_results = {
+            name: [state['results'][(name, piece)] for piece in self.piece_types if (name, piece) in state['results']]
+            for name in sets
+        }
+        self.pending_pieces = [key for key in state['unfinished'] if key not in state['results'] and key[0] in sets]
+        self.last_results = all_results
+        self.last_price_filters = state['price_filters']
+        self.display_results(all_results, self.last_price_filters)
+        
+        started = time.strftime("%Y-%m-%d %H:%M", time.localtime(state['ts']))
+        done = len(state['pieces']) - len(state['unfinished'])
+        self.results_text.insert(
+            tk.END,
+            f"\n⏸ Scan from {started}: {done} of {len(state['pieces'])} piece(s) finished • "
+            f"click 'Retry failed / unfinished pieces' to complete it\n",
+            "timed_out"
+        )
+    
+    def warm_start(self):
+        """Show the last known results from the on-disk response cache right away
+        
+        Pieces are ranked from cached responses only - no token or network
+        needed. Once a valid token is entered a normal search refreshes them
+        in place.
+        """
+        if self.daemon is not None or self.shown_sections or not self.config['sets']:
+            return
+        if not isinstance(self.base_transport, DiskCacheTransport):
+            return  # Replaying or a custom transport: the cache holds live responses from other runs
+        if not self.response_cache.usage()[0]:
+            return
+        threading.Thread(target=self.warm_start_thread, daemon=True).start()
+    
+    def warm_start_thread(self):
+        """Rank every configured piece from cached responses and display them"""
+        searcher = MarketSearcher(self.api_url, self.response_cache, max_pages=self.market.max_pages)
+        searcher.apply_limits(self.limits)
+        self.response_cache.oldest_served = None
+        all_results = {}
+        for set_name, requirements in self.config['sets'].items():
+            results = []
+            for piece in self.piece_types:
+                result = searcher.search_piece(set_name, piece, requirements, "", {})
+                if result.get('error'):
+                    result = {'piece': piece, 'set': set_name, 'skipped': True, 'message': 'Not in the response cache yet'}
+                results.append(result)
+            all_results[set_name] = results
+        
+        if self.response_cache.oldest_served is None or self.shown_sections:
+            return  # Nothing cached for these sets, or a search got there first
+        self.last_results = all_results
+        self.display_results(all_results, {})
+        self.warm_results = True
+        fetched = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.response_cache.oldest_served))
+        self.results_text.insert(
+            tk.END,
+            f"\n💾 Last known results (cached since {fetched}) • they refresh as soon as a valid token is entered\n",
+            "timed_out"
+        )
+        self.on_token_changed()
+    
+    def on_token_changed(self, *args):
+        """Refresh cached startup results in the background once a usable token is entered"""
+        if self.warm_results and token_usable(self.bearer_token.get().strip()):
+            self.warm_results = False
+            self.search_market()
+    
+    def apply_recording(self):
+        """Route traffic through a recorder while 'Record traffic' is enabled"""
+        if self.record_traffic.get():
+            if not isinstance(self.market.transport, RecordingTransport):
+                path = os.path.join(self.record_dir, time.strftime("session_%Y%m%d_%H%M%S.jsonl"))
+                self.market.transport = RecordingTransport(self.prefetcher, path)
+        else:
+            self.market.transport = self.prefetcher
+    
+    def profiled_search_thread(self):
+        """Run search_thread under the profiler and append the report"""
+        from mudream_profiling import ScanProfiler  # cProfile/pstats only load when profiling
+        
+        profiler = ScanProfiler(self.profile_dir)
+        with profiler:
+            scanned = self.search_thread()
+        if not scanned:
+            return  # Nothing was searched, so there is nothing worth reporting
+        
+        try:
+            path = profiler.save()
+        except Exception as e:
+            path = None
+            self.results_text.insert(tk.END, f"\nFailed to save profile: {e}\n", "error")
+        self.results_text.insert(tk.END, profiler.format_report(path), "profile")
+        self.results_text.tag_config("profile", foreground="#94a3b8", font=("Consolas", 8))
     
     def search_market(self):
         """Start search in thread"""
-        thread = threading.Thread(target=self.search_thread, daemon=True)
+        self.apply_recording()
+        target = self.profiled_search_thread if self.profile_scans.get() else self.search_thread
+        thread = threading.Thread(target=target, daemon=True)
         thread.start()
     
     def debug_search_thread(self):
@@ -1296,7 +1894,7 @@ class MuDreamCollectionFinder:
             messagebox.showerror("Error", "Please enter your Bearer token!")
             return
         
-        self.results_text.delete(1.0, tk.END)
+        self.clear_results()
         self.results_text.insert(tk.END, "🐛 DEBUG MODE - Showing first 5 items with raw price data\n")
         self.results_text.insert(tk.END, "="*80 + "\n\n")
         
@@ -1319,15 +1917,9 @@ class MuDreamCollectionFinder:
                 query = self.build_query(set_name, piece, options)
                 
                 try:
-                    token = bearer_token.replace('Bearer ', '').strip()
-                    headers = {
-                        'Content-Type': 'application/json',
-                        'Authorization': f'Bearer {token}',
-                        'Accept': 'application/graphql-response+json, application/json'
-                    }
-                    
-                    response = requests.post(self.api_url, json=query, headers=headers, timeout=10)
-                    data = response.json()
+                    headers = build_headers(bearer_token)
+                    body = self.market.transport.post(self.api_url, query, headers, self.market.timeout)
+                    data = json.loads(body)
                     
                     if 'data' in data and 'lots' in data['data']:
                         lots = data['data']['lots']['Lots'][:5]
@@ -1356,10 +1948,36 @@ class MuDreamCollectionFinder:
     
     def debug_search(self):
         """Start debug search in thread"""
+        self.apply_recording()
         thread = threading.Thread(target=self.debug_search_thread, daemon=True)
         thread.start()
 
-if __name__ == "__main__":
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="MuDream Collection Finder")
+    parser.add_argument("--api-url", default=API_URL, help="GraphQL endpoint (e.g. a local mock server)")
+    parser.add_argument("--replay", metavar="FILE", help="Serve searches offline from a recorded session")
+    parser.add_argument("--replay-latency", type=float, default=0.0, help="Seconds of simulated latency per replayed request")
+    parser.add_argument("--record", action="store_true", help="Start with traffic recording enabled")
+    parser.add_argument("--profile", action="store_true", help="Profile every scan (CPU and memory)")
+    parser.add_argument("--daemon", metavar="URL", help="Read results from a running mudream_daemon.py (e.g. http://127.0.0.1:8765)")
+    parser.add_argument("--startup-timing", action="store_true", help="Print how long each startup phase took")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    transport = None
+    if args.replay:
+        transport = ReplayTransport.from_recording(args.replay, latency=args.replay_latency)
+    
     root = tk.Tk()
-    app = MuDreamCollectionFinder(root)
-    root.mainloop()
\ No newline at end of file
+    app = MuDreamCollectionFinder(root, api_url=args.api_url, transport=transport, daemon_url=args.daemon)
+    app.record_traffic.set(args.record)
+    app.profile_scans.set(args.profile)
+    app.report_startup = args.startup_timing
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
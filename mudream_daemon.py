@@ -0,0 +1,340 @@
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from mudream_market import API_URL, CURRENCY_MAP, DEFAULT_LIMITS, PIECE_TYPES, ConfigWatcher, MarketSearcher, result_from_json
+from mudream_scheduler import ActivityTracker, QueryPlan, RefreshScheduler, plan_scan
+from mudream_transport import DiskCacheTransport, HttpTransport, ReplayTransport, ResponseCache
+
+DEFAULT_PORT = 8765
+
+
+class MarketDaemon:
+    """Keep market state warm and serve the latest results on localhost
+
+    One MarketSearcher - pooled connections, unchanged-response detection,
+    deal sketches and live rates - is reused for every refresh. Each
+    configured piece is polled without price filters on its own adaptive
+    interval (see RefreshScheduler), or right away on POST /refresh; it is
+    published as soon as it is fetched and requests are answered from
+    memory, filtering and sorting the kept lots per request. With a
+    ResponseCache, responses are kept on disk and the last known results are
+    served right after a restart, while the first polls refresh them.
+
+    Endpoints:
+      GET  /status                       poll counters and refresh intervals
+      GET  /results?set=..&max=Life=2&sort=deal&max_deal=20
+      POST /refresh                      poll every piece now (budget permitting)
+    """
+
+    def __init__(self, config_path, bearer_token, api_url=API_URL, transport=None, scheduler=None,
+                 host='127.0.0.1', port=DEFAULT_PORT, pages=1, live_rates=False, response_cache=None):
+        self.config_path = config_path
+        self.bearer_token = bearer_token
+        self.scheduler = scheduler or RefreshScheduler()
+        self.response_cache = response_cache
+        if response_cache is not None:
+            transport = DiskCacheTransport(transport or HttpTransport(), response_cache)
+        self.market = MarketSearcher(api_url, transport, max_pages=pages)
+        self.market.live_rates = live_rates
+        self.market.activity = ActivityTracker()
+        # Results are stored uncapped, so request-time price filters see every
+        # fetched lot; the cap is applied per request in filtered_result
+        self.max_lots_per_piece = self.market.max_lots_per_piece
+        self.market.max_lots_per_piece = None
+        self.config = {'sets': {}}
+        self.config_watcher = ConfigWatcher(config_path)
+        self.query_plan = QueryPlan()
+        self.lock = threading.Lock()
+        self.results = {}  # (set, piece) -> latest result
+        self.updated = {}  # (set, piece) -> time the result was fetched
+        self.polls = 0
+        self.last_poll = None
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.server = ThreadingHTTPServer((host, port), self.make_handler())
+        self.server.daemon_threads = True
+        self.server_thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reload_config(self):
+        """Re-read the config file when it changed so edits made in the app are picked up"""
+        config = self.config_watcher.poll()
+        if config is None:
+            return self.config
+        self.config = config
+        limits = dict(DEFAULT_LIMITS, **config.get('limits', {}))
+        self.market.apply_limits(limits)
+        self.max_lots_per_piece, self.market.max_lots_per_piece = self.market.max_lots_per_piece, None
+        if self.response_cache is not None:
+            self.response_cache.max_bytes = limits['max_disk_cache_mb'] * 1024 * 1024
+        self.query_plan.update(config['sets'])
+        return config
+
+    def poll_due(self):
+        """Fetch the pieces the refresh scheduler says are due"""
+        config = self.reload_config()
+        sets = config['sets']
+        plan = plan_scan(sets, config.get('priorities', {}), self.market.activity, self.query_plan)
+        polled = [(s, p) for s, p in plan if self.query_plan.needs_request(s, p)]
+        self.scheduler.sync(polled, time.time())
+
+        with self.lock:
+            # Forget sets that were removed from the config
+            for key in [k for k in self.results if k[0] not in sets]:
+                del self.results[key]
+                self.updated.pop(key, None)
+
+        # Collected or unconfigured pieces cost no request; resolve them every round
+        for set_name, piece in set(plan) - set(polled):
+            result = self.market.search_piece(set_name, piece, sets[set_name], self.bearer_token, {})
+            with self.lock:
+                self.results[(set_name, piece)] = result
+
+        for set_name, piece in self.scheduler.next_batch(time.time()):
+            if self.stopping.is_set():
+                break
+            result = self.market.search_piece(set_name, piece, sets[set_name], self.bearer_token, {})
+            changed = not result.get('unchanged') and not result.get('error')
+            now = time.time()
+            self.scheduler.record((set_name, piece), changed, now)
+            with self.lock:
+                self.results[(set_name, piece)] = result
+                self.updated[(set_name, piece)] = now
+                self.polls += 1
+                self.last_poll = now
+
+    def warm_start(self):
+        """Fill the results from the on-disk response cache before the first poll"""
+        if self.response_cache is None:
+            return
+        sets = self.reload_config()['sets']
+        searcher = MarketSearcher(self.market.api_url, self.response_cache, max_pages=self.market.max_pages)
+        searcher.apply_limits(self.config.get('limits', {}))
+        searcher.max_lots_per_piece = None
+        for set_name, requirements in sets.items():
+            for piece in PIECE_TYPES:
+                if not self.query_plan.needs_request(set_name, piece):
+                    continue
+                result = searcher.search_piece(set_name, piece, requirements, self.bearer_token, {})
+                if not result.get('error'):
+                    with self.lock:
+                        self.results.setdefault((set_name, piece), result)
+
+    def run(self):
+        """Poll due pieces, then sleep until the next one is due or a refresh is requested"""
+        self.warm_start()
+        while not self.stopping.is_set():
+            self.poll_due()
+            self.wake.wait(min(self.scheduler.wait_time(time.time()), 60))
+            if self.wake.is_set():
+                self.wake.clear()
+                self.scheduler.expedite(time.time())
+
+    def refresh(self):
+        self.wake.set()
+
+    def filtered_result(self, result, price_filters, sort_by, max_deal):
+        """Apply request-time filters, ordering and the lot cap to a stored (uncapped) result"""
+        if 'lots' not in result:
+            return result
+        deal_scores = result.get('deal_scores', {})
+        weights = self.market.current_weights()
+        values = {id(lot): self.market.calculate_normalized_price(lot, weights) for lot in result['lots']}
+        lots = [lot for lot in result['lots'] if self.market.matches_price_filter(lot, price_filters)]
+        if max_deal is not None:
+            lots = [lot for lot in lots
+                    if deal_scores.get(lot.get('id')) is not None and deal_scores[lot.get('id')] <= max_deal]
+        if sort_by == 'deal':
+            lots.sort(key=lambda lot: (deal_scores.get(lot.get('id'), 100.0), values[id(lot)]))
+        else:
+            lots.sort(key=lambda lot: values[id(lot)])
+        filtered_total = len(lots)
+        if self.max_lots_per_piece is not None:
+            lots = lots[:self.max_lots_per_piece]
+        return dict(result, lots=lots, filtered_total=filtered_total)
+
+    def snapshot(self, sets=None, price_filters=None, sort_by='value', max_deal=None):
+        """Latest results as {set: [result per piece]}, the shape the app displays"""
+        with self.lock:
+            names = sets or list(self.config['sets'])
+            stored = {name: [self.results.get((name, piece)) for piece in PIECE_TYPES] for name in names}
+            updated = {f"{s}|{p}": ts for (s, p), ts in self.updated.items() if s in stored}
+
+        all_results = {}
+        for name, results in stored.items():
+            all_results[name] = [
+                self.filtered_result(result, price_filters or {}, sort_by, max_deal) if result else {
+                    'piece': piece,
+                    'set': name,
+                    'skipped': True,
+                    'message': 'Not scanned by the daemon yet'
+                }
+                for piece, result in zip(PIECE_TYPES, results)
+            ]
+        return {'results': all_results, 'updated': updated}
+
+    def status(self):
+        with self.lock:
+            return {
+                'polls': self.polls,
+                'last_poll': self.last_poll,
+                'refresh': self.scheduler.summary(),
+                'sets': len(self.config['sets']),
+                'pieces': len(self.results),
+                'memory': self.market.memory_usage(),
+                'counters': dict(self.market.stats.counters)
+            }
+
+    def make_handler(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def send_json(self, status, data):
+                body = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == '/status':
+                    self.send_json(200, daemon.status())
+                elif url.path == '/results':
+                    try:
+                        price_filters = {}
+                        for item in query.get('max', []):
+                            name, _, value = item.partition('=')
+                            if name in CURRENCY_MAP:
+                                price_filters[name] = float(value)
+                        max_deal = float(query['max_deal'][0]) if 'max_deal' in query else None
+                    except ValueError:
+                        self.send_json(400, {'error': 'bad filter value'})
+                        return
+                    sort_by = query.get('sort', ['value'])[0]
+                    self.send_json(200, daemon.snapshot(query.get('set'), price_filters, sort_by, max_deal))
+                else:
+                    self.send_json(404, {'error': 'not found'})
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if urlparse(self.path).path == '/refresh':
+                    daemon.refresh()
+                    self.send_json(202, {'refreshing': True})
+                else:
+                    self.send_json(404, {'error': 'not found'})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        """Start the refresh loop and the API server in background threads"""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread:
+            self.thread.join()
+
+
+class DaemonClient:
+    """Read results from a running MarketDaemon (standard library only)"""
+
+    def __init__(self, url=f"http://127.0.0.1:{DEFAULT_PORT}", timeout=2):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, path, method='GET'):
+        data = b'' if method == 'POST' else None
+        request = urllib.request.Request(self.url + path, data=data, method=method)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def status(self):
+        return self.request('/status')
+
+    def refresh(self):
+        return self.request('/refresh', 'POST')
+
+    def results(self, sets=None, price_filters=None, sort_by='value', max_deal=None):
+        """Latest {set: [results]} from the daemon, filtered like a local search"""
+        params = [('set', name) for name in sets or []]
+        params += [('max', f"{name}={value}") for name, value in (price_filters or {}).items()]
+        params.append(('sort', sort_by))
+        if max_deal is not None:
+            params.append(('max_deal', max_deal))
+        all_results = self.request('/results?' + urlencode(params))['results']
+        for results in all_results.values():
+            for result in results:
+                result_from_json(result)
+        return all_results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep MuDream market results warm and serve them on localhost")
+    parser.add_argument("--config", default="collection_config.json")
+    parser.add_argument("--token", default=os.environ.get("MUDREAM_TOKEN", ""),
+                        help="Bearer token (default: $MUDREAM_TOKEN)")
+    parser.add_argument("--min-interval", type=float, default=60, help="Fastest poll interval per piece (seconds)")
+    parser.add_argument("--max-interval", type=float, default=3600, help="Slowest poll interval per piece (seconds)")
+    parser.add_argument("--budget", type=float, default=30, help="Maximum requests per minute across all pieces")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--pages", type=int, default=1, help="Pages per piece")
+    parser.add_argument("--live-rates", action="store_true", help="Rank with live market currency rates")
+    parser.add_argument("--api-url", default=API_URL)
+    parser.add_argument("--replay", metavar="FILE", help="Serve from a recorded session instead of the network")
+    parser.add_argument("--cache-dir", default="response_cache",
+                        help="On-disk response cache for warm restarts (ignored with --replay)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the response cache")
+    args = parser.parse_args(argv)
+
+    if not args.token and not args.replay:
+        parser.error("a bearer token is required (--token or $MUDREAM_TOKEN)")
+    if args.budget <= 0:
+        parser.error("--budget must be a positive number of requests per minute")
+    transport = ReplayTransport.from_recording(args.replay) if args.replay else None
+    response_cache = None if args.replay or args.no_cache else ResponseCache(args.cache_dir)
+
+    scheduler = RefreshScheduler(args.min_interval, args.max_interval, args.budget)
+    daemon = MarketDaemon(args.config, args.token or "replay", args.api_url, transport, scheduler,
+                          port=args.port, pages=args.pages, live_rates=args.live_rates,
+                          response_cache=response_cache)
+    daemon.start()
+    print(f"Serving {daemon.url} (polls every {args.min_interval:g}-{args.max_interval:g}s per piece, "
+          f"at most {args.budget:g} requests/min) - Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
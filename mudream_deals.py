@@ -0,0 +1,180 @@
+import bisect
+import math
+import threading
+from collections import OrderedDict
+
+
+class TDigest:
+    """Merging t-digest: a bounded-memory sketch of a value distribution
+
+    Values are buffered and periodically merged into at most ~2 * compression
+    centroids using the k1 (arcsine) scale function, which keeps the tails
+    accurate - exactly where "is this a good deal" questions live. A decay
+    factor below 1.0 down-weights older centroids at every merge so the
+    sketch follows the recent market.
+    """
+
+    def __init__(self, compression=100, decay=1.0):
+        self.compression = compression
+        self.decay = decay
+        self.means = []
+        self.counts = []
+        self.total = 0.0
+        self.cumulative = []  # Weight of all centroids before each one
+        self.buffer = []
+        self.buffer_limit = compression * 5
+
+    def add(self, value, weight=1.0):
+        if value != value or value in (float('inf'), float('-inf')):
+            return
+        self.buffer.append((value, weight))
+        if len(self.buffer) >= self.buffer_limit:
+            self.compress()
+
+    def compress(self):
+        """Merge buffered values into the centroid list"""
+        if not self.buffer:
+            return
+        points = [(m, c * self.decay) for m, c in zip(self.means, self.counts)]
+        points.extend(self.buffer)
+        self.buffer = []
+        if not points:
+            return
+        points.sort(key=lambda p: p[0])
+
+        total = sum(c for _, c in points)
+        means = []
+        counts = []
+        cumulative = 0.0
+        current_mean, current_count = points[0]
+        limit = self.k_to_q(self.q_to_k(0.0) + 1.0) * total
+
+        for mean, count in points[1:]:
+            if cumulative + current_count + count <= limit:
+                current_mean += (mean - current_mean) * count / (current_count + count)
+                current_count += count
+            else:
+                means.append(current_mean)
+                counts.append(current_count)
+                cumulative += current_count
+                limit = self.k_to_q(self.q_to_k(cumulative / total) + 1.0) * total
+                current_mean, current_count = mean, count
+        means.append(current_mean)
+        counts.append(current_count)
+
+        self.means = means
+        self.counts = counts
+        self.total = total
+        self.cumulative = []
+        running = 0.0
+        for count in counts:
+            self.cumulative.append(running)
+            running += count
+
+    def q_to_k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def k_to_q(self, k):
+        return (math.sin(min(max(k * 2 * math.pi / self.compression, -math.pi / 2), math.pi / 2)) + 1) / 2
+
+    def __len__(self):
+        return int(round(self.total + sum(c for _, c in self.buffer)))
+
+    def cdf(self, value):
+        """Fraction of (weighted) observations at or below value"""
+        self.compress()
+        if not self.means:
+            return None
+        if value < self.means[0]:
+            return 0.0
+        if value >= self.means[-1]:
+            return 1.0
+
+        # Interpolate between centroid midpoints
+        index = bisect.bisect_right(self.means, value) - 1
+        cumulative = self.cumulative[index] + self.counts[index] / 2
+        left_mean, right_mean = self.means[index], self.means[index + 1]
+        step = (self.counts[index] + self.counts[index + 1]) / 2
+        if right_mean > left_mean:
+            cumulative += step * (value - left_mean) / (right_mean - left_mean)
+        return min(1.0, max(0.0, cumulative / self.total))
+
+    def quantile(self, q):
+        """Approximate value at quantile q (inverse of cdf)"""
+        self.compress()
+        if not self.means:
+            return None
+        target = min(max(q, 0.0), 1.0) * self.total
+        cumulative = self.counts[0] / 2
+        if target <= cumulative:
+            return self.means[0]
+        for i in range(len(self.means) - 1):
+            step = (self.counts[i] + self.counts[i + 1]) / 2
+            if cumulative + step >= target:
+                fraction = (target - cumulative) / step
+                return self.means[i] + (self.means[i + 1] - self.means[i]) * fraction
+            cumulative += step
+        return self.means[-1]
+
+
+def price_key(lot):
+    """Hashable form of a lot's asking prices, independent of exchange rates"""
+    return tuple(sorted(
+        (((price.get('Currency') or {}).get('code'), price.get('value')) for price in lot.get('Prices') or []),
+        key=repr
+    ))
+
+
+class DealTracker:
+    """Per-(set, piece) price sketches giving each lot a market percentile
+
+    A listing is only counted once per (lot id, asking prices) - tracked in
+    a bounded LRU - so repeated scans do not inflate the sketch with the same
+    lots, while a re-priced lot counts as new evidence. The raw prices are
+    used rather than the computed value, which moves with the exchange rates.
+    """
+
+    def __init__(self, compression=100, decay=0.98, remember_lots=5000):
+        self.compression = compression
+        self.decay = decay
+        self.remember_lots = remember_lots
+        self.lock = threading.Lock()
+        self.digests = {}
+        self.seen = {}
+
+    def observe(self, set_name, piece, lots, value_of):
+        """Add fetched lots to the (set, piece) sketch; returns how many were new"""
+        key = (set_name, piece)
+        with self.lock:
+            digest = self.digests.get(key)
+            if digest is None:
+                digest = self.digests[key] = TDigest(self.compression, self.decay)
+                self.seen[key] = OrderedDict()
+            seen = self.seen[key]
+            new = 0
+            for lot in lots:
+                value = value_of(lot)
+                lot_key = (lot.get('id'), price_key(lot))
+                if lot_key in seen:
+                    seen.move_to_end(lot_key)
+                    continue
+                seen[lot_key] = True
+                new += 1
+                if len(seen) > self.remember_lots:
+                    seen.popitem(last=False)
+                digest.add(value)
+        return new
+
+    def percentile(self, set_name, piece, value):
+        """Percentile (0-100) of value within the recent market, or None"""
+        with self.lock:
+            digest = self.digests.get((set_name, piece))
+            if digest is None:
+                return None
+            fraction = digest.cdf(value)
+        return None if fraction is None else fraction * 100
+
+    def sample_size(self, set_name, piece):
+        with self.lock:
+            digest = self.digests.get((set_name, piece))
+            return len(digest) if digest else 0
@@ -0,0 +1,152 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+
+from mudream_market import API_URL, CURRENCY_MAP, PIECE_TYPES, MarketSearcher, read_config
+from mudream_snapshots import open_text
+from mudream_transport import ReplayTransport
+
+PRICE_COLUMNS = list(CURRENCY_MAP.values())
+FIELDS = ['set', 'piece', 'rank', 'id'] + PRICE_COLUMNS + ['value', 'deal', 'gs', 'mine', 'source']
+
+
+def result_rows(result, market):
+    """Yield one flat row per lot of a piece result, in result order"""
+    deal_scores = result.get('deal_scores', {})
+    weights = market.current_weights()
+    for rank, lot in enumerate(result.get('lots', []), 1):
+        prices = {p['Currency']['code'].lower(): p['value'] for p in lot.get('Prices', [])}
+        value = market.calculate_normalized_price(lot, weights)
+        deal = deal_scores.get(lot.get('id'))
+        row = {
+            'set': result['set'],
+            'piece': result['piece'],
+            'rank': rank,
+            'id': lot.get('id')
+        }
+        for code in PRICE_COLUMNS:
+            row[code] = prices.get(code)
+        row.update({
+            'value': round(value, 4) if value != float('inf') else None,
+            'deal': round(deal, 1) if deal is not None else None,
+            'gs': lot.get('gearScore'),
+            'mine': bool(lot.get('isMine')),
+            'source': lot.get('source')
+        })
+        yield row
+
+
+class ResultExporter:
+    """Stream piece results to CSV or JSON Lines as each piece completes
+
+    The format follows the file name (.csv or .jsonl, optionally .gz)
+    unless given. Rows are written and flushed per piece, so an export of
+    any size is never held in memory and a cut-off scan still leaves every
+    finished piece on disk.
+    """
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.format = fmt or ('csv' if path.endswith('.csv') or path.endswith('.csv.gz') else 'jsonl')
+        self.lock = threading.Lock()
+        self.file = None
+        self.writer = None
+        self.rows = 0
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open_text(self.path, 'w')
+        if self.format == 'csv':
+            self.writer = csv.DictWriter(self.file, fieldnames=FIELDS, lineterminator="\n")
+            self.writer.writeheader()
+        return self
+
+    def write_result(self, result, market):
+        """Append the lots of one finished piece (skipped/error results have none)"""
+        with self.lock:
+            if self.file is None:
+                return
+            for row in result_rows(result, market):
+                if self.writer is not None:
+                    self.writer.writerow(row)
+                else:
+                    self.file.write(json.dumps(row) + "\n")
+                self.rows += 1
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+        return self.path
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def parse_limit(text):
+    """Parse a CURRENCY=VALUE price filter, e.g. Life=2"""
+    name, _, value = text.partition('=')
+    if name not in CURRENCY_MAP:
+        raise argparse.ArgumentTypeError(f"unknown currency {name!r} (use one of {', '.join(CURRENCY_MAP)})")
+    try:
+        return name, float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad price limit {text!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search the MuDream market headlessly and stream results to CSV/JSONL")
+    parser.add_argument("--config", default="collection_config.json")
+    parser.add_argument("--output", default=time.strftime("results_%Y%m%d_%H%M%S.csv"),
+                        help="Output file (.csv or .jsonl, optionally .gz)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Override the format implied by --output")
+    parser.add_argument("--set", dest="sets", action="append", help="Only search this set (repeatable)")
+    parser.add_argument("--max", dest="limits", action="append", type=parse_limit, default=[],
+                        metavar="CURRENCY=VALUE", help="Price filter, e.g. --max Life=2 (repeatable)")
+    parser.add_argument("--token", default=os.environ.get("MUDREAM_TOKEN", ""),
+                        help="Bearer token (default: $MUDREAM_TOKEN)")
+    parser.add_argument("--api-url", default=API_URL)
+    parser.add_argument("--replay", metavar="FILE", help="Serve the scan from a recorded session")
+    parser.add_argument("--pages", type=int, default=1, help="Pages per piece")
+    args = parser.parse_args(argv)
+
+    config = read_config(args.config)
+    sets = {name: reqs for name, reqs in config['sets'].items() if not args.sets or name in args.sets}
+    if not sets:
+        parser.error("no matching sets configured")
+    transport = ReplayTransport.from_recording(args.replay) if args.replay else None
+    if not args.token and not args.replay:
+        parser.error("a bearer token is required (--token or $MUDREAM_TOKEN)")
+
+    market = MarketSearcher(args.api_url, transport, max_pages=args.pages)
+    market.apply_limits(config.get('limits', {}))
+    price_filters = dict(args.limits)
+    errors = 0
+
+    with ResultExporter(args.output, args.format) as exporter:
+        for set_name, requirements in sets.items():
+            for piece in PIECE_TYPES:
+                result = market.search_piece(set_name, piece, requirements, args.token or "replay", price_filters)
+                if result.get('error'):
+                    errors += 1
+                    print(f"{set_name} {piece}: {result['message']}", file=sys.stderr)
+                exporter.write_result(result, market)
+
+    print(f"{exporter.rows} lot(s) from {len(sets)} set(s) -> {args.output}" + (f" ({errors} error(s))" if errors else ""))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,666 @@
+import base64
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+from mudream_deals import DealTracker
+from mudream_stats import ScanStats
+from mudream_transport import HttpTransport
+from mudream_valuation import ValuationEngine
+
+API_URL = "https://mudream.online/api/graphql"
+
+ARMOR_SETS = [
+    "Leather", "Pad", "Vine", "Bronze", "Silk", "Bone", "Scale", "Wind",
+    "Violent Wind", "Sphinx", "Brass", "Spirit", "Plate", "Legendary",
+    "Red Winged", "Guardian", "Dragon", "Light Plate", "Sacred Fire",
+    "Ancient", "Adamantine", "Storm Crow", "Storm Zahard", "Black Dragon",
+    "Demonic", "Grand Soul", "Holy Spirit", "Dark Steel", "Dark Phoenix",
+    "Thunder Hawk", "Great Dragon", "Dark Soul", "Hurricane", "Red Spirit",
+    "Dark Master", "Storm Blitz", "Piercing Grove", "Dragon Knight",
+    "Vengeance", "Sylphid Ray", "Volcano", "Sunlight", "Succubus", "Phoenix Soul"
+]
+
+PIECE_TYPES = ['helm', 'armor', 'pants', 'gloves', 'boots']
+
+SETS_MISSING_GLOVES = ['Sacred Fire', 'Storm Zahard', 'Piercing Grove', 'Phoenix Soul']
+SETS_MISSING_HELM = ['Volcano', 'Hurricane', 'Thunder Hawk', 'Storm Crow']
+
+CURRENCY_MAP = {
+    'Bless': 'bless',
+    'Soul': 'soul',
+    'Life': 'life',
+    'Chaos': 'chaos',
+    'Creation': 'creat',
+    'Zen': 'zen',
+    'DC': 'dc'
+}
+
+JEWEL_CODES = ['bless', 'soul', 'life', 'chaos', 'creat']
+
+# Valuation: Life/Chaos = 1.0, Creation = 0.5, Bless/Soul = 0.25, DC = 0.125 (1/8)
+PRICE_WEIGHTS = {
+    'life': 1.0,
+    'chaos': 1.0,
+    'creat': 0.5,
+    'bless': 0.25,
+    'soul': 0.25,
+    'dc': 0.125,
+    'zen': 0.0  # Zen not valued in comparison
+}
+
+OPTION_LABELS = {
+    'iml': 'MH', 'imsd': 'SD', 'dd': 'DD',
+    'rd': 'REF', 'dsr': 'DSR', 'izdr': 'ZEN'
+}
+
+PAGE_SIZE = 50
+
+LOTS_QUERY = """query GET_ALL_LOTS($offset: NonNegativeInt, $limit: NonNegativeInt, $sort: LotsSortInput, $filter: LotsFilterInput) {
+                lots(limit: $limit, offset: $offset, sort: $sort, filter: $filter) {
+                    Lots {
+                        id
+                        source
+                        isMine
+                        type
+                        gearScore
+                        hasPendingCounterOffer
+                        Prices {
+                            value
+                            Currency {
+                                id
+                                code
+                                type
+                                title
+                                __typename
+                            }
+                            __typename
+                        }
+                        Currencies {
+                            id
+                            code
+                            type
+                            title
+                            isAvailableForLots
+                            __typename
+                        }
+                        __typename
+                    }
+                    Pagination {
+                        total
+                        currentPage
+                        nextPageExists
+                        __typename
+                    }
+                    __typename
+                }
+            }"""
+
+
+# Full details of one lot, fetched only when a result is expanded. Fields the
+# list query leaves out to keep scan payloads small.
+LOT_DETAIL_QUERY = """query GET_LOT($id: ID!) {
+                lot(id: $id) {
+                    id
+                    source
+                    isMine
+                    type
+                    gearScore
+                    createdAt
+                    Item {
+                        name
+                        level
+                        options
+                        __typename
+                    }
+                    Seller {
+                        name
+                        __typename
+                    }
+                    Prices {
+                        value
+                        Currency {
+                            code
+                            __typename
+                        }
+                        __typename
+                    }
+                    __typename
+                }
+            }"""
+
+LOT_DETAIL_TTL = 600  # Seconds a fetched detail is reused
+
+
+def piece_requirements(piece_data):
+    """Return (options, collected) for a piece in either config format"""
+    if isinstance(piece_data, list):
+        # Old format: just a list of options
+        return piece_data, False
+    # New format: dict with options and collected status
+    return piece_data.get('options', []), piece_data.get('collected', False)
+
+
+def piece_exists(set_name, piece):
+    """Check if a set has the given piece at all"""
+    if piece == 'gloves' and set_name in SETS_MISSING_GLOVES:
+        return False
+    if piece == 'helm' and set_name in SETS_MISSING_HELM:
+        return False
+    return True
+
+
+def build_headers(bearer_token):
+    """Build request headers for the GraphQL API"""
+    token = bearer_token.replace('Bearer ', '').strip()
+    return {
+        'Content-Type': 'application/json',
+        'Authorization': f'Bearer {token}',
+        'Accept': 'application/graphql-response+json, application/json'
+    }
+
+
+def token_usable(bearer_token):
+    """True if the token looks like an unexpired JWT (checked locally, no request)"""
+    parts = bearer_token.replace('Bearer ', '').strip().split('.')
+    if len(parts) != 3:
+        return False
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(parts[1] + '=' * (-len(parts[1]) % 4)))
+    except (ValueError, TypeError):
+        return False
+    expires = claims.get('exp') if isinstance(claims, dict) else None
+    return not isinstance(expires, (int, float)) or expires > time.time()
+
+
+def result_from_json(result):
+    """Undo what a JSON round trip does to a piece result (lot id keys become strings)"""
+    if 'deal_scores' in result:
+        scores = result['deal_scores']
+        result['deal_scores'] = {lot.get('id'): scores.get(str(lot.get('id'))) for lot in result.get('lots', [])}
+    return result
+
+
+def read_config(path):
+    """Load collection_config.json for headless tools (same formats as the app)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        loaded = json.load(f)
+    if 'sets' in loaded:
+        return loaded
+    if 'armor_set' in loaded and 'requirements' in loaded:
+        return {'sets': {loaded['armor_set']: loaded['requirements']}}
+    return {'sets': {}}
+
+
+def config_changes(old, new):
+    """What differs between two configs: {'added', 'removed', 'modified'} set names and 'settings' keys"""
+    old_sets, new_sets = old.get('sets', {}), new.get('sets', {})
+    return {
+        'added': [name for name in new_sets if name not in old_sets],
+        'removed': [name for name in old_sets if name not in new_sets],
+        'modified': [name for name in new_sets if name in old_sets and old_sets[name] != new_sets[name]],
+        'settings': sorted(key for key in set(old) | set(new) if key != 'sets' and old.get(key) != new.get(key))
+    }
+
+
+class ConfigWatcher:
+    """Notice edits made to the config file outside the app
+
+    poll() stats the file (mtime and size) and only reads it when that
+    changed; the first poll always reads it. A file that does not parse -
+    e.g. caught mid-save - is retried on the next poll.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.stamp = None
+
+    def file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def poll(self):
+        """The re-read config if the file changed since the last poll, else None"""
+        stamp = self.file_stamp()
+        if stamp is None or stamp == self.stamp:
+            return None
+        try:
+            config = read_config(self.path)
+        except (OSError, ValueError):
+            return None
+        self.stamp = stamp
+        return config
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a scan's time budget runs out before a request is sent"""
+
+
+# Caps that keep a long-running session from growing without bound; any of
+# them can be overridden under "limits" in collection_config.json
+DEFAULT_LIMITS = {
+    'max_lots_per_piece': 100,   # Cheapest lots kept in a piece result
+    'max_cached_pieces': 500,    # Responses kept for change detection (LRU)
+    'max_rendered_lines': 20000, # Lines of lot rows in the results pane
+    'max_stats_events': 20000,   # Timing events kept per scan (ring buffer)
+    'max_lot_details': 200,      # Expanded lot details cached by lot id (LRU)
+    'max_disk_cache_mb': 50      # On-disk response cache for warm starts (LRU)
+}
+
+
+class MarketSearcher:
+    """Search pipeline shared by the GUI and headless tools (no Tk dependency)"""
+
+    def __init__(self, api_url=API_URL, transport=None, max_pages=1, timeout=10):
+        self.api_url = api_url
+        self.transport = transport or HttpTransport()
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.stats = ScanStats()
+        self.valuation = ValuationEngine(PRICE_WEIGHTS)
+        self.live_rates = False
+        self.deals = DealTracker()
+        self.sort_by = 'value'  # or 'deal'
+        self.max_deal_percentile = None
+        self.lot_listeners = []
+        self.activity = None  # Optional ActivityTracker fed with new listings per piece
+        self.detect_changes = True
+        self.response_cache = OrderedDict()  # (set, piece) -> last pages, result and lots, see search_piece
+        self.max_cached_pieces = DEFAULT_LIMITS['max_cached_pieces']
+        self.max_lots_per_piece = DEFAULT_LIMITS['max_lots_per_piece']
+        self.deadline = None  # time.monotonic() by which the current scan must finish
+        self.detail_cache = OrderedDict()  # lot id -> (fetched at, detail)
+        self.max_lot_details = DEFAULT_LIMITS['max_lot_details']
+
+    def build_query(self, set_name, piece, options, offset=0):
+        """Build GraphQL query"""
+        return {
+            "operationName": "GET_ALL_LOTS",
+            "query": LOTS_QUERY,
+            "variables": {
+                "filter": {
+                    "name": set_name,
+                    "type": [piece],
+                    **options
+                },
+                "limit": PAGE_SIZE,
+                "offset": offset,
+                "sort": {
+                    "field": "LOT_FIELD_UPDATED_AT",
+                    "type": "SORT_TYPE_DESC"
+                }
+            }
+        }
+
+    def matches_price_filter(self, lot, price_filters):
+        """Check if a lot matches the price filters"""
+        if not price_filters:
+            return True
+
+        prices = lot.get('Prices', [])
+        if not prices:
+            return False
+
+        api_filters = {}
+        for user_name, limit in price_filters.items():
+            api_code = CURRENCY_MAP.get(user_name)
+            if api_code:
+                api_filters[api_code] = limit
+
+        jewel_filters = {k: v for k, v in api_filters.items() if k in JEWEL_CODES}
+        zen_filter = api_filters.get('zen')
+        dc_filter = api_filters.get('dc')
+
+        lot_prices = {}
+        for price in prices:
+            currency_code = price['Currency']['code'].lower()
+            lot_prices[currency_code] = price['value']
+
+        has_jewels = any(jewel in lot_prices for jewel in JEWEL_CODES)
+        has_zen = 'zen' in lot_prices
+        has_dc = 'dc' in lot_prices
+
+        if has_jewels and jewel_filters:
+            for jewel in JEWEL_CODES:
+                if jewel in lot_prices:
+                    if jewel not in jewel_filters:
+                        return False
+                    if lot_prices[jewel] > jewel_filters[jewel]:
+                        return False
+            return True
+
+        if has_zen and zen_filter is not None:
+            return lot_prices['zen'] <= zen_filter
+
+        if has_dc and dc_filter is not None:
+            return lot_prices['dc'] <= dc_filter
+
+        return False
+
+    def current_weights(self):
+        """Currency weights used for ranking: fixed table or live market rates"""
+        if self.live_rates:
+            return self.valuation.weights()
+        return PRICE_WEIGHTS
+
+    def calculate_normalized_price(self, lot, weights=None):
+        """Calculate normalized price based on jewel values"""
+        prices = lot.get('Prices', [])
+        if not prices:
+            return float('inf')  # Items without price go to the end
+
+        weights = weights or self.current_weights()
+        total_value = 0.0
+        for price in prices:
+            currency_code = price['Currency']['code'].lower()
+            weight = weights.get(currency_code, 0.0)
+            total_value += price['value'] * weight
+
+        return total_value
+
+    def format_price(self, prices):
+        """Format price display"""
+        if not prices:
+            return "No price listed"
+        return " or ".join([f"{p['value']:,} {p['Currency']['code']}" for p in prices])
+
+    def add_lot_listener(self, listener):
+        """Call listener(set_name, piece, lots, value_of) with every piece's fetched lots"""
+        if listener not in self.lot_listeners:
+            self.lot_listeners.append(listener)
+
+    def remove_lot_listener(self, listener):
+        if listener in self.lot_listeners:
+            self.lot_listeners.remove(listener)
+
+    def request_timeout(self):
+        """Per-request timeout, shortened so no request outlives the scan deadline"""
+        if self.deadline is None:
+            return self.timeout
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("Scan time limit reached")
+        return min(self.timeout, remaining)
+
+    def deadline_passed(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def fetch_pages(self, set_name, piece, options, bearer_token, previous=None):
+        """Fetch a query page by page as a list of (digest, lots)
+
+        Each raw body is hashed before it is decoded; when a page is
+        byte-identical to the same page of the previous fetch its already
+        parsed lots are reused and json.loads is skipped. Returns None on a
+        malformed response.
+        """
+        headers = build_headers(bearer_token)
+        previous = previous or []
+        pages = []
+        offset = 0
+
+        for index in range(max(1, self.max_pages)):
+            query = self.build_query(set_name, piece, options, offset)
+            with self.stats.timer('request', set=set_name, piece=piece, offset=offset) as event:
+                body = self.transport.post(self.api_url, query, headers, self.request_timeout())
+                event['bytes'] = len(body)
+            digest = hashlib.blake2b(body, digest_size=16).digest()
+
+            if index < len(previous) and previous[index][0] == digest:
+                lots, next_page = previous[index][1], previous[index][2]
+            else:
+                with self.stats.timer('parse', set=set_name, piece=piece):
+                    data = json.loads(body)
+
+                if not ('data' in data and data['data'] and 'lots' in data['data']):
+                    return None
+
+                page = data['data']['lots']
+                lots = page['Lots']
+                next_page = bool((page.get('Pagination') or {}).get('nextPageExists'))
+
+            pages.append((digest, lots, next_page))
+            if not next_page or not lots:
+                break
+            offset += len(lots)
+
+        return pages
+
+    def apply_limits(self, limits):
+        """Apply memory caps (see DEFAULT_LIMITS) to this searcher"""
+        self.max_lots_per_piece = limits.get('max_lots_per_piece', self.max_lots_per_piece)
+        self.max_cached_pieces = limits.get('max_cached_pieces', self.max_cached_pieces)
+        self.max_lot_details = limits.get('max_lot_details', self.max_lot_details)
+        while len(self.response_cache) > self.max_cached_pieces:
+            self.response_cache.popitem(last=False)
+
+    def memory_usage(self):
+        """Sizes of the structures that grow with a session"""
+        return {
+            'cached_pieces': len(self.response_cache),
+            'cached_lots': sum(len(entry['lots']) for entry in list(self.response_cache.values())),
+            'price_sketches': len(self.deals.digests),
+            'lot_details': len(self.detail_cache),
+            'rate_lots': len(self.valuation.seen_lots),
+            'stats_events': len(self.stats.events)
+        }
+
+    def result_context(self, required_options, price_filters):
+        """Everything besides the response that shapes a piece result"""
+        return (
+            tuple(required_options),
+            tuple(sorted((price_filters or {}).items())),
+            self.sort_by,
+            self.max_deal_percentile,
+            self.max_lots_per_piece,
+            tuple(sorted(self.current_weights().items()))
+        )
+
+    def fetch_lot_detail(self, lot_id, bearer_token):
+        """Full details of one lot, from the detail cache when fresh
+
+        Raises TransportError-style exceptions from the transport and
+        ValueError when the API returns errors or no lot.
+        """
+        cached = self.detail_cache.get(lot_id)
+        if cached is not None and time.monotonic() - cached[0] <= LOT_DETAIL_TTL:
+            self.detail_cache.move_to_end(lot_id)
+            self.stats.count('detail_cache_hits')
+            return cached[1]
+
+        payload = {"operationName": "GET_LOT", "query": LOT_DETAIL_QUERY, "variables": {"id": lot_id}}
+        with self.stats.timer('detail', lot=lot_id) as event:
+            body = self.transport.post(self.api_url, payload, build_headers(bearer_token), self.timeout)
+            event['bytes'] = len(body)
+        data = json.loads(body)
+        if data.get('errors'):
+            raise ValueError("; ".join(e.get('message', 'error') for e in data['errors']))
+        detail = (data.get('data') or {}).get('lot')
+        if not detail:
+            raise ValueError("Lot not found (it may have been sold)")
+
+        self.detail_cache[lot_id] = (time.monotonic(), detail)
+        self.detail_cache.move_to_end(lot_id)
+        while len(self.detail_cache) > self.max_lot_details:
+            self.detail_cache.popitem(last=False)
+        return detail
+
+    def prefetch_set(self, prefetcher, set_name, requirements, bearer_token, cancelled=None):
+        """Warm a PrefetchTransport with the first page of each uncollected piece
+
+        Stops early once the cancelled event is set; returns how many
+        requests were prefetched.
+        """
+        headers = build_headers(bearer_token)
+        fetched = 0
+        for piece in PIECE_TYPES:
+            if cancelled is not None and cancelled.is_set():
+                break
+            if not piece_exists(set_name, piece) or piece not in requirements:
+                continue
+            required_options, is_collected = piece_requirements(requirements[piece])
+            if is_collected or not required_options:
+                continue
+            options = {opt: [0, 1, 2, 3, 4] for opt in required_options}
+            query = self.build_query(set_name, piece, options)
+            if prefetcher.prefetch(self.api_url, query, headers, self.timeout, cancelled):
+                fetched += 1
+        return fetched
+
+    def notify_listeners(self, set_name, piece, lots, values):
+        """Hand every fetched lot to the registered lot listeners"""
+        for listener in list(self.lot_listeners):
+            try:
+                listener(set_name, piece, lots, lambda lot: values[id(lot)])
+            except Exception:
+                # A failing sink (e.g. disk full) must not fail the search
+                self.stats.count('listener_errors')
+
+    def search_piece(self, set_name, piece, requirements, bearer_token, price_filters):
+        """Search for a single piece"""
+        # Skip pieces that don't exist for this set
+        if not piece_exists(set_name, piece):
+            return {
+                'piece': piece,
+                'set': set_name,
+                'skipped': True,
+                'message': 'This set has no gloves' if piece == 'gloves' else 'This set has no helmet'
+            }
+
+        if not requirements or piece not in requirements:
+            return {
+                'piece': piece,
+                'set': set_name,
+                'skipped': True,
+                'message': 'No requirements configured'
+            }
+
+        required_options, is_collected = piece_requirements(requirements[piece])
+
+        # Skip if already collected
+        if is_collected:
+            return {
+                'piece': piece,
+                'set': set_name,
+                'skipped': True,
+                'collected': True,
+                'message': '✓ Already collected'
+            }
+
+        if not required_options:
+            return {
+                'piece': piece,
+                'set': set_name,
+                'skipped': True,
+                'message': 'No excellent options required'
+            }
+
+        options = {opt: [0, 1, 2, 3, 4] for opt in required_options}
+
+        try:
+            key = (set_name, piece)
+            cached = self.response_cache.get(key) if self.detect_changes else None
+            pages = self.fetch_pages(set_name, piece, options, bearer_token, cached and cached['pages'])
+
+            if pages is not None:
+                fingerprint = b"".join(digest for digest, _, _ in pages)
+                context = self.result_context(required_options, price_filters)
+                if cached and cached['fingerprint'] == fingerprint and cached['context'] == context:
+                    # Byte-identical response under the same settings: reuse the
+                    # previous result instead of re-filtering and re-sorting
+                    self.stats.count('unchanged')
+                    self.response_cache.move_to_end(key)
+                    values = cached['values']
+                    if self.activity is not None:
+                        self.activity.update(set_name, piece, 0)
+                    self.notify_listeners(set_name, piece, cached['lots'], values)
+                    return dict(cached['result'], new_listings=0, unchanged=True)
+                self.stats.count('changed')
+
+                all_lots = [lot for _, lots, _ in pages for lot in lots]
+                self.valuation.observe_lots(all_lots)
+                # Context again: observing may have moved the live rates
+                context = self.result_context(required_options, price_filters)
+                weights = self.current_weights()
+                values = {id(lot): self.calculate_normalized_price(lot, weights) for lot in all_lots}
+                new_listings = self.deals.observe(set_name, piece, all_lots, lambda lot: values[id(lot)])
+                if self.activity is not None:
+                    self.activity.update(set_name, piece, new_listings)
+                self.notify_listeners(set_name, piece, all_lots, values)
+
+                with self.stats.timer('filter', set=set_name, piece=piece, lots=len(all_lots)):
+                    filtered_lots = [lot for lot in all_lots if self.matches_price_filter(lot, price_filters)]
+                    deal_scores = {
+                        lot.get('id'): self.deals.percentile(set_name, piece, values[id(lot)])
+                        for lot in filtered_lots
+                    }
+                    if self.max_deal_percentile is not None:
+                        filtered_lots = [
+                            lot for lot in filtered_lots
+                            if deal_scores[lot.get('id')] is not None
+                            and deal_scores[lot.get('id')] <= self.max_deal_percentile
+                        ]
+
+                # Sort by normalized price (cheapest first) or by deal score
+                with self.stats.timer('sort', set=set_name, piece=piece, lots=len(filtered_lots)):
+                    if self.sort_by == 'deal':
+                        filtered_lots.sort(key=lambda lot: (deal_scores[lot.get('id')], values[id(lot)]))
+                    else:
+                        filtered_lots.sort(key=lambda lot: values[id(lot)])
+
+                filtered_total = len(filtered_lots)
+                if self.max_lots_per_piece is not None and filtered_total > self.max_lots_per_piece:
+                    filtered_lots = filtered_lots[:self.max_lots_per_piece]
+                    deal_scores = {lot.get('id'): deal_scores[lot.get('id')] for lot in filtered_lots}
+
+                result = {
+                    'piece': piece,
+                    'set': set_name,
+                    'total': len(all_lots),
+                    'filtered_total': filtered_total,
+                    'lots': filtered_lots,
+                    'deal_scores': deal_scores,
+                    'new_listings': new_listings,
+                    'fingerprint': fingerprint.hex()
+                }
+                if self.detect_changes:
+                    self.response_cache[key] = {
+                        'pages': pages,
+                        'fingerprint': fingerprint,
+                        'context': context,
+                        'lots': all_lots,
+                        'values': values,
+                        'result': result
+                    }
+                    self.response_cache.move_to_end(key)
+                    while len(self.response_cache) > self.max_cached_pieces:
+                        self.response_cache.popitem(last=False)
+                return result
+            else:
+                return {
+                    'piece': piece,
+                    'set': set_name,
+                    'error': True,
+                    'message': 'Failed to fetch data or no data returned'
+                }
+        except Exception as e:
+            if isinstance(e, DeadlineExceeded) or self.deadline_passed():
+                # Not a failure of this piece: the scan ran out of time
+                self.stats.count('timed_out')
+                return {
+                    'piece': piece,
+                    'set': set_name,
+                    'timed_out': True,
+                    'message': 'Timed out (scan time limit reached)'
+                }
+            self.stats.count('errors')
+            return {
+                'piece': piece,
+                'set': set_name,
+                'error': True,
+                'message': str(e)
+            }
@@ -0,0 +1,268 @@
+import time
+
+from mudream_market import PRICE_WEIGHTS
+
+
+def piece_offers(lots):
+    """Cheapest (value, lot) per currency for one piece
+
+    Each entry in a lot's Prices is an alternative ("or"), so a lot can be
+    paid in any one of its currencies. For a given currency only the
+    cheapest lot matters; every other offer in that currency is dominated.
+    """
+    offers = {}
+    for lot in lots:
+        for price in lot.get('Prices', []):
+            code = price['Currency']['code'].lower()
+            value = price['value']
+            if code not in offers or value < offers[code][0]:
+                offers[code] = (value, lot)
+    return offers
+
+
+class PurchasePlanner:
+    """Pick at most one lot per piece to finish as many pieces as a budget allows
+
+    Ties on the number of pieces are broken by the lowest normalized cost,
+    folded into one objective: count - eps * cost. A Lagrangian relaxation of
+    the per-currency budgets gives both an upper bound and, after repairing
+    its choices to fit the budget, a strong starting plan. A depth-first
+    branch and bound then closes the gap; a node/time limit keeps it
+    interactive, in which case the best plan found so far is returned along
+    with the bound.
+    """
+
+    def __init__(self, budget, weights=None, time_limit=2.0, node_limit=500000, iterations=300):
+        self.budget = {code: value for code, value in budget.items() if value > 0}
+        self.weights = weights or PRICE_WEIGHTS
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.iterations = iterations
+
+    def collect_pieces(self, all_results):
+        """Build (set, piece, options) for every searched piece with affordable offers"""
+        pieces = []
+        for set_name, results in all_results.items():
+            for result in results:
+                if result.get('skipped') or result.get('error') or not result.get('lots'):
+                    continue
+                options = []
+                for code, (value, lot) in piece_offers(result['lots']).items():
+                    if code in self.budget and value <= self.budget[code]:
+                        cost = value * self.weights.get(code, 0.0)
+                        fraction = value / self.budget[code]
+                        options.append((fraction, cost, code, value, lot))
+                options.sort(key=lambda o: (o[0], o[1]))
+                pieces.append((set_name, result['piece'], options))
+        return pieces
+
+    def plan_value(self, choice, eps):
+        count = sum(1 for option in choice if option is not None)
+        cost = sum(option[1] for option in choice if option is not None)
+        return count - eps * cost
+
+    def repair(self, candidates, choice):
+        """Make a relaxed choice fit the budget, then greedily add what still fits"""
+        choice = list(choice)
+        remaining = dict(self.budget)
+        for option in choice:
+            if option is not None:
+                remaining[option[2]] -= option[3]
+
+        # Drop the most budget-hungry picks from overspent currencies
+        for code in remaining:
+            if remaining[code] >= 0:
+                continue
+            picked = [i for i, option in enumerate(choice) if option is not None and option[2] == code]
+            picked.sort(key=lambda i: choice[i][0], reverse=True)
+            for i in picked:
+                if remaining[code] >= 0:
+                    break
+                remaining[code] += choice[i][3]
+                choice[i] = None
+
+        # Fill with the cheapest options that still fit
+        for i, (_, _, options) in enumerate(candidates):
+            if choice[i] is not None:
+                continue
+            for option in options:
+                if option[3] <= remaining[option[2]]:
+                    remaining[option[2]] -= option[3]
+                    choice[i] = option
+                    break
+        return choice
+
+    def lagrangian(self, candidates, eps, incumbent_value):
+        """Subgradient search over budget multipliers
+
+        Works in budget fractions so every currency has capacity 1. Returns
+        (upper_bound, best_feasible_choice).
+        """
+        codes = list(self.budget)
+        lam = {code: 0.0 for code in codes}
+        best_bound = float('inf')
+        best_choice = None
+        best_value = incumbent_value
+        step_scale = 2.0
+
+        for _ in range(self.iterations):
+            used = {code: 0.0 for code in codes}
+            choice = []
+            bound = sum(lam.values())
+            for _, _, options in candidates:
+                best_gain, best_option = 0.0, None
+                for option in options:
+                    gain = 1.0 - eps * option[1] - lam[option[2]] * option[0]
+                    if gain > best_gain:
+                        best_gain, best_option = gain, option
+                choice.append(best_option)
+                bound += best_gain
+                if best_option is not None:
+                    used[best_option[2]] += best_option[0]
+
+            best_bound = min(best_bound, bound)
+
+            feasible = self.repair(candidates, choice)
+            value = self.plan_value(feasible, eps)
+            if value > best_value:
+                best_value, best_choice = value, feasible
+
+            if best_bound - best_value < 1e-9:
+                break
+
+            subgradient = {code: 1.0 - used[code] for code in codes}
+            norm = sum(g * g for g in subgradient.values())
+            if norm == 0:
+                break
+            step = step_scale * (bound - best_value) / norm
+            for code in codes:
+                lam[code] = max(0.0, lam[code] - step * subgradient[code])
+            step_scale *= 0.98
+
+        return best_bound, best_choice
+
+    def solve(self, all_results):
+        """Return the best plan for the given search results"""
+        pieces = self.collect_pieces(all_results)
+        candidates = [p for p in pieces if p[2]]
+        # Cheapest pieces first: good plans are found early, which tightens the bound
+        candidates.sort(key=lambda p: p[2][0][0])
+
+        # Small enough that the cost tie-break can never outweigh one more piece
+        eps = 1.0 / (sum(max(o[1] for o in options) for _, _, options in candidates) + 1.0)
+
+        greedy = self.repair(candidates, [None] * len(candidates))
+        best = {'value': self.plan_value(greedy, eps), 'choice': greedy}
+
+        upper_bound, relaxed = self.lagrangian(candidates, eps, best['value'])
+        if relaxed is not None:
+            best.update(value=self.plan_value(relaxed, eps), choice=relaxed)
+
+        min_fractions = [p[2][0][0] for p in candidates]
+        total_fraction = float(len(self.budget))
+        choice = [None] * len(candidates)
+        remaining = dict(self.budget)
+        state = {'nodes': 0, 'aborted': False}
+        deadline = time.perf_counter() + self.time_limit
+
+        def count_bound(index, used_fraction):
+            # Each remaining piece uses at least its cheapest budget fraction
+            # (candidates are sorted by that fraction, so take them in order)
+            available = total_fraction - used_fraction
+            extra = 0
+            for fraction in min_fractions[index:]:
+                if fraction > available + 1e-12:
+                    break
+                available -= fraction
+                extra += 1
+            return extra
+
+        def search(index, count, cost, used_fraction):
+            state['nodes'] += 1
+            if state['nodes'] > self.node_limit or (state['nodes'] & 1023 == 0 and time.perf_counter() > deadline):
+                state['aborted'] = True
+                return
+
+            value = count - eps * cost
+            if value > best['value'] + 1e-12:
+                best.update(value=value, choice=list(choice))
+
+            if index == len(candidates):
+                return
+
+            # Remaining pieces add at most one each and costs only lower the value
+            if count + count_bound(index, used_fraction) - eps * cost <= best['value'] + 1e-12:
+                return
+
+            for option in candidates[index][2]:
+                fraction, option_cost, code, option_value, lot = option
+                if option_value <= remaining[code]:
+                    remaining[code] -= option_value
+                    choice[index] = option
+                    search(index + 1, count + 1, cost + option_cost, used_fraction + fraction)
+                    choice[index] = None
+                    remaining[code] += option_value
+                    if state['aborted']:
+                        return
+
+            # Leave this piece out
+            search(index + 1, count, cost, used_fraction)
+
+        proven = upper_bound - best['value'] < 1e-9
+        if not proven:
+            search(0, 0, 0.0, 0.0)
+            proven = not state['aborted']
+
+        picks = []
+        spent = {}
+        covered = set()
+        for (set_name, piece, _), option in zip(candidates, best['choice']):
+            if option is None:
+                continue
+            _, cost, code, value, lot = option
+            picks.append({
+                'set': set_name,
+                'piece': piece,
+                'lot_id': lot.get('id'),
+                'currency': code,
+                'value': value,
+                'normalized': cost,
+                'lot': lot
+            })
+            spent[code] = spent.get(code, 0) + value
+            covered.add((set_name, piece))
+
+        return {
+            'picks': picks,
+            'spent': spent,
+            'remaining': {code: self.budget[code] - spent.get(code, 0) for code in self.budget},
+            'uncovered': [(s, p) for s, p, _ in pieces if (s, p) not in covered],
+            'normalized_total': sum(p['normalized'] for p in picks),
+            'max_pieces': len(picks) if proven else min(len(candidates), int(upper_bound + 1 - 1e-9)),
+            'optimal': proven,
+            'nodes': state['nodes']
+        }
+
+
+def format_plan(plan):
+    """Human readable text for a purchase plan"""
+    lines = []
+    if plan['optimal']:
+        status = "optimal"
+    else:
+        status = f"best found within time limit, at most {plan['max_pieces']} possible"
+    lines.append(f"🧮 {len(plan['picks'])} piece(s) can be bought ({status}, {plan['nodes']:,} nodes)")
+    lines.append(f"   Normalized cost: {plan['normalized_total']:.2f}")
+    lines.append("")
+    for pick in sorted(plan['picks'], key=lambda p: (p['set'], p['piece'])):
+        lines.append(f"  ✓ {pick['set']} {pick['piece'].title():<7} Lot #{pick['lot_id']}: "
+                     f"{pick['value']:,} {pick['currency']} [Value: {pick['normalized']:.2f}]")
+    if plan['uncovered']:
+        lines.append("")
+        lines.append("  Not affordable within budget:")
+        for set_name, piece in plan['uncovered']:
+            lines.append(f"  ✗ {set_name} {piece.title()}")
+    lines.append("")
+    lines.append("  Spent: " + (", ".join(f"{v:,} {c}" for c, v in plan['spent'].items()) or "nothing"))
+    lines.append("  Left:  " + ", ".join(f"{v:,} {c}" for c, v in plan['remaining'].items()))
+    return "\n".join(lines)
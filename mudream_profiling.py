@@ -0,0 +1,90 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+import tracemalloc
+
+
+class ScanProfiler:
+    """Run a block under cProfile and tracemalloc and summarize the hot spots
+
+    cProfile only sees the thread it was enabled in, so use it inside the
+    worker thread that runs the scan.
+    """
+
+    def __init__(self, output_dir="profiles", top_n=15):
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.profile = cProfile.Profile()
+        self.snapshot = None
+        self.peak_memory = 0
+        self.elapsed = 0.0
+        self._start = 0.0
+        self._was_tracing = False
+
+    def __enter__(self):
+        self._was_tracing = tracemalloc.is_tracing()
+        if not self._was_tracing:
+            tracemalloc.start(10)
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.profile.disable()
+        self.elapsed = time.perf_counter() - self._start
+        self.snapshot = tracemalloc.take_snapshot()
+        _, self.peak_memory = tracemalloc.get_traced_memory()
+        if not self._was_tracing:
+            tracemalloc.stop()
+        return False
+
+    def save(self):
+        """Write the cProfile data to a .prof file and return its path"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, time.strftime("scan_%Y%m%d_%H%M%S.prof"))
+        self.profile.dump_stats(path)
+        return path
+
+    def hot_functions(self):
+        """Top functions by cumulative time as printed by pstats"""
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.strip_dirs().sort_stats('cumulative').print_stats(self.top_n)
+        lines = stream.getvalue().splitlines()
+        # Drop the pstats preamble, keep the table
+        for idx, line in enumerate(lines):
+            if line.strip().startswith('ncalls'):
+                return "\n".join(lines[idx:]).rstrip()
+        return "\n".join(lines).rstrip()
+
+    def top_allocations(self):
+        """Top allocation sites still alive at the end of the run"""
+        if self.snapshot is None:
+            return []
+        snapshot = self.snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        return snapshot.statistics('lineno')[:self.top_n]
+
+    def format_report(self, path=None):
+        """Text summary for the results pane"""
+        lines = [f"\n{'='*80}", "🧪 PROFILE", f"{'='*80}"]
+        lines.append(f"Elapsed: {self.elapsed:.2f}s • Peak traced memory: {self.peak_memory / 1024:,.0f} KB")
+        if path:
+            lines.append(f"Profile saved to: {os.path.abspath(path)}  (open with snakeviz or python -m pstats)")
+        lines.append("")
+        lines.append(f"Top {self.top_n} functions by cumulative time:")
+        lines.append(self.hot_functions())
+        lines.append("")
+        lines.append(f"Top {self.top_n} allocation sites:")
+        for stat in self.top_allocations():
+            frame = stat.traceback[0]
+            lines.append(f"  {stat.size / 1024:>9,.1f} KB  {stat.count:>7,} blocks  "
+                         f"{os.path.basename(frame.filename)}:{frame.lineno}")
+        lines.append("")
+        return "\n".join(lines)
@@ -0,0 +1,358 @@
+import difflib
+
+from mudream_market import OPTION_LABELS, piece_requirements
+
+MARKET_URL = "https://mudream.online/market"
+
+
+class RenderModel:
+    """Tk-free description of the results pane
+
+    Each section is a key plus a list of (text, tags) segments, so the
+    formatting can be built, measured or diffed without a widget. Links map
+    clickable tags to ('copy', text), ('open', url) or ('details', (lot id,
+    lot section key)) actions.
+    """
+
+    def __init__(self):
+        self.sections = []
+        self.links = {}
+        self.total_items_found = 0
+        self.total_collected = 0
+        self.unchanged = 0
+        self.lot_lines = 0
+        self.hidden_lots = 0
+        self.timed_out = []  # (set, piece) of pieces the scan deadline cut off
+
+    def add_section(self, key, segments):
+        self.sections.append((key, segments))
+
+    def segments(self):
+        """Iterate every (text, tags) segment in display order"""
+        for _, segments in self.sections:
+            yield from segments
+
+    def text(self):
+        """Plain text of the whole model"""
+        return "".join(text for text, _ in self.segments())
+
+
+def header_segments(price_filters, live_rates=None, sort_by='value'):
+    """Build the header block shown above all results"""
+    segments = [
+        (f"{'='*80}\n", ("header",)),
+        ("Search Results for All Configured Collections\n", ("header",)),
+    ]
+    if price_filters:
+        filter_text = ", ".join([f"{k} ≤ {v:,.0f}" for k, v in price_filters.items()])
+        segments.append((f"Price Filters: {filter_text}\n", ("header",)))
+    if sort_by == 'deal':
+        segments.append(("Sorted by deal score (lowest market percentile first)\n", ("header",)))
+    else:
+        segments.append(("Sorted by price (cheapest first)\n", ("header",)))
+    if live_rates:
+        segments.append((f"Value calc (live market rates): {live_rates}\n", ("header",)))
+    else:
+        segments.append(("Value calc: Life/Chaos=1.0, Creation=0.5, Bless/Soul=0.25, DC=0.125\n", ("header",)))
+    segments.append((f"{'='*80}\n\n", ("header",)))
+    return segments
+
+
+def set_header_segments(set_name):
+    """Build the banner for one set"""
+    return [
+        (f"\n{'█'*80}\n", ("set_header",)),
+        (f"  {set_name} SET\n", ("set_header",)),
+        (f"{'█'*80}\n\n", ("set_header",)),
+    ]
+
+
+def piece_sections(set_name, result, price_filters, sets_config, market, links):
+    """Build the sections for one piece result; returns (sections, found, collected)
+
+    The piece header is one section and every lot gets its own
+    ('lot', set, piece, lot id) section, so a refresh can update single lots.
+    """
+    piece_name = result['piece'].upper()
+    piece_type = result['piece']
+    found = 0
+    collected = 0
+    key = ('piece', set_name, piece_type)
+
+    segments = [
+        (f"[{piece_name}]\n", ("piece_header",)),
+        ("-" * 80 + "\n", ()),
+    ]
+
+    if result.get('skipped'):
+        if result.get('collected'):
+            segments.append((f"✓ {result['message']}\n\n", ("collected",)))
+            collected = 1
+        else:
+            segments.append((f"⊘ {result['message']}\n\n", ("skipped",)))
+        return [(key, segments)], found, collected
+
+    if result.get('timed_out'):
+        segments.append((f"⏱ {result['message']}\n\n", ("timed_out",)))
+        return [(key, segments)], found, collected
+
+    if result.get('error'):
+        segments.append((f"✗ ERROR: {result['message']}\n\n", ("error",)))
+        return [(key, segments)], found, collected
+
+    total = result['total']
+    filtered = result['filtered_total']
+    found = filtered
+
+    if price_filters:
+        segments.append((f"Found {total} total, {filtered} match price filters\n\n", ("info",)))
+    else:
+        segments.append((f"Found {total} listing(s)\n\n", ("info",)))
+
+    # Get the required excellent options for this piece
+    required_opts = []
+    if set_name in sets_config and piece_type in sets_config[set_name]:
+        opt_codes, _ = piece_requirements(sets_config[set_name][piece_type])
+        required_opts = [OPTION_LABELS.get(code, code) for code in opt_codes]
+
+    # Show search criteria
+    if required_opts and filtered > 0:
+        search_criteria = f"Set: {set_name} | Type: {piece_type} | Options: {'+'.join(required_opts)}"
+        segments.append(("🔍 To find in market: ", ("search_label",)))
+
+        criteria_tag = f"criteria_{set_name}_{piece_type}"
+        segments.append((search_criteria, (criteria_tag, "criteria")))
+        links[criteria_tag] = ('copy', search_criteria)
+
+        segments.append((" ", ("detail",)))
+        market_tag = f"market_{set_name}_{piece_type}"
+        segments.append(("[Open Market]", (market_tag, "market_link")))
+        links[market_tag] = ('open', MARKET_URL)
+
+        segments.append(("\n", ("detail",)))
+        segments.append(("💡 Click criteria to copy, then apply filters manually in market\n\n", ("hint",)))
+
+    sections = [(key, segments)]
+    lot_keys = set()
+    if result['lots']:
+        for idx, lot in enumerate(result['lots'], 1):
+            deal = result.get('deal_scores', {}).get(lot.get('id'))
+            lot_key = ('lot', set_name, piece_type, lot.get('id', idx))
+            if lot_key in lot_keys:
+                lot_key += (idx,)  # A lot repeated across pages
+            lot_keys.add(lot_key)
+            details_tag = None
+            if lot.get('id') is not None:
+                details_tag = f"details_{set_name}_{piece_type}_{idx}"
+                links[details_tag] = ('details', (lot['id'], lot_key))
+            sections.append((lot_key, lot_segments(set_name, piece_name, idx, lot, market, deal, details_tag)))
+    else:
+        segments.append(("  No items match your price filters\n\n", ("no_results",)))
+
+    return sections, found, collected
+
+
+def lot_segments(set_name, piece_name, idx, lot, market, deal=None, details_tag=None):
+    """Build the three lines describing one lot
+
+    With details_tag, the last line ends in a clickable [Details] link that
+    expands the lot's full details below it.
+    """
+    price = market.format_price(lot['Prices'])
+    gs = f" (GS: {lot['gearScore']})" if lot.get('gearScore') else ""
+    mine = " ⭐ YOUR ITEM" if lot.get('isMine') else ""
+
+    # Calculate normalized price for display
+    norm_price = market.calculate_normalized_price(lot)
+    norm_display = f" [Value: {norm_price:.2f}]" if norm_price != float('inf') else ""
+    if deal is not None and norm_price != float('inf'):
+        # Percentile vs recent market for this set/piece: lower is a better deal
+        norm_display += f" [Deal: P{deal:.0f}]"
+
+    friendly_name = f"{set_name} {piece_name.title()} #{idx}"
+
+    segments = [
+        (f"  {idx}. {friendly_name}{gs}{mine}{norm_display}\n", ("item_name",)),
+        (f"     💰 {price}\n", ("price",)),
+        (f"     📦 {lot.get('source', 'Market')}", ("detail",)),
+    ]
+    if details_tag:
+        segments.append((" ", ("detail",)))
+        segments.append(("[Details]", (details_tag, "details_link")))
+    segments.append(("\n\n", ("detail",)))
+    return segments
+
+
+def lot_url(lot_id):
+    """Market link for one lot (the plain market page if the site ignores the parameter)"""
+    return f"{MARKET_URL}?lot={lot_id}"
+
+
+def detail_value(value):
+    """Flatten a detail field (options, nested objects) into one readable string"""
+    if isinstance(value, dict):
+        return ", ".join(f"{k}: {detail_value(v)}" for k, v in value.items() if k != '__typename')
+    if isinstance(value, list):
+        return ", ".join(OPTION_LABELS.get(v, v) if isinstance(v, str) else detail_value(v) for v in value)
+    return str(value)
+
+
+def detail_segments(detail, market, link_tag):
+    """Build the expanded detail lines for one lot, ending with a tagged market link"""
+    segments = []
+    for field, value in detail.items():
+        if field in ('__typename', 'id') or value in (None, '', [], {}):
+            continue
+        if field == 'Prices':
+            value = market.format_price(value)
+        segments.append((f"       {field}: {detail_value(value)}\n", ("lot_details",)))
+    segments.append(("       ", ("lot_details",)))
+    segments.append(("[Open Lot]", (link_tag, "market_link")))
+    segments.append(("\n", ("lot_details",)))
+    return segments
+
+
+def summary_segments(total_items_found, total_collected, unchanged=0, timed_out=0):
+    """Build the closing summary block"""
+    segments = [
+        (f"\n{'='*80}\n", ("header",)),
+        (f"📊 SUMMARY: Found {total_items_found} item(s)", ("header",)),
+    ]
+    if total_collected > 0:
+        segments.append((f" • Skipped {total_collected} collected piece(s)", ("collected",)))
+    if unchanged > 0:
+        segments.append((f" • {unchanged} piece(s) unchanged since last scan", ("info",)))
+    if timed_out > 0:
+        segments.append((f" • ⏱ {timed_out} piece(s) timed out", ("timed_out",)))
+    segments.append(("\n", ("header",)))
+    segments.append((f"{'='*80}\n", ("header",)))
+    return segments
+
+
+def section_token(set_name, result, price_filters, sets_config, market):
+    """Cache key for a rendered piece section, or None if it cannot be reused
+
+    Only fetched results carry a response fingerprint; the market context
+    covers the filters, sort order and currency weights baked into the text.
+    """
+    if 'fingerprint' not in result:
+        return None
+    opt_codes, _ = piece_requirements(sets_config.get(set_name, {}).get(result['piece'], []))
+    return (result['fingerprint'], market.result_context(opt_codes, price_filters))
+
+
+def build_render_model(all_results, price_filters, sets_config, market, section_cache=None, max_lines=None):
+    """Turn search results into a RenderModel
+
+    With a section_cache dict, pieces whose response and settings are
+    unchanged since the previous call reuse their sections instead of being
+    formatted again. max_lines caps the lines spent on lot rows; lots past
+    it (and lots the searcher did not keep) are summarised per piece.
+    """
+    model = RenderModel()
+    live_rates = market.valuation.describe(market.current_weights()) if market.live_rates else None
+    model.add_section(('header',), header_segments(price_filters, live_rates, market.sort_by))
+    unchanged = 0
+    rendered = {}
+
+    for set_name, results in all_results.items():
+        model.add_section(('set', set_name), set_header_segments(set_name))
+
+        for result in results:
+            key = ('piece', set_name, result['piece'])
+            unchanged += 1 if result.get('unchanged') else 0
+            if result.get('timed_out'):
+                model.timed_out.append((set_name, result['piece']))
+            token = section_token(set_name, result, price_filters, sets_config, market) if section_cache is not None else None
+            cached = section_cache.get(key) if token is not None else None
+
+            if cached and cached[0] == token:
+                _, sections, found, collected, links = cached
+            else:
+                links = {}
+                sections, found, collected = piece_sections(
+                    set_name, result, price_filters, sets_config, market, links
+                )
+            if token is not None:
+                rendered[key] = (token, sections, found, collected, links)
+
+            model.links.update(links)
+            model.total_items_found += found
+            model.total_collected += collected
+
+            shown = 0
+            for section in sections:
+                if section[0][0] == 'lot':
+                    lines = sum(text.count("\n") for text, _ in section[1])
+                    if max_lines is not None and model.lot_lines + lines > max_lines:
+                        continue
+                    model.lot_lines += lines
+                    shown += 1
+                model.sections.append(section)
+
+            hidden = result.get('filtered_total', 0) - shown if 'lots' in result else 0
+            if hidden > 0:
+                model.hidden_lots += hidden
+                model.add_section(('more', set_name, result['piece']), [
+                    (f"  … {hidden} more matching lot(s) not shown\n\n", ("no_results",))
+                ])
+
+    if section_cache is not None:
+        # Keep only what this render produced so removed pieces do not linger
+        section_cache.clear()
+        section_cache.update(rendered)
+
+    model.unchanged = unchanged
+    model.add_section(('summary',), summary_segments(model.total_items_found, model.total_collected, unchanged,
+                                                     len(model.timed_out)))
+    return model
+
+
+def price_text(segments):
+    """The price line(s) of a lot section, used to tell re-priced lots apart"""
+    return [text for text, tags in segments if "price" in tags]
+
+
+def diff_sections(old_sections, new_sections):
+    """Plan an in-place update from one list of (key, segments) to another
+
+    Returns (deleted, replaced, inserted):
+      deleted  - keys of sections to remove
+      replaced - (key, segments, highlight) rewritten where they are
+      inserted - (key, segments, anchor, highlight) to insert before the
+                 retained section anchor (None means at the end), in order
+
+    highlight is 'new' for a lot that was not shown before, 'changed' for
+    a lot whose price changed and None otherwise (e.g. only renumbered).
+    """
+    old_keys = [key for key, _ in old_sections]
+    new_keys = [key for key, _ in new_sections]
+    old_segments = dict(old_sections)
+
+    retained = set()
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for tag, _, _, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            retained.update(new_keys[j1:j2])
+
+    def highlight(key, segments):
+        if key[0] != 'lot':
+            return None
+        if key not in old_segments:
+            return 'new'
+        return 'changed' if price_text(old_segments[key]) != price_text(segments) else None
+
+    deleted = [key for key in old_keys if key not in retained]
+    replaced = []
+    inserted = []
+    anchor = None
+    for key, segments in reversed(new_sections):
+        if key in retained:
+            if segments != old_segments[key]:
+                replaced.append((key, segments, highlight(key, segments)))
+            anchor = key
+        else:
+            inserted.append((key, segments, anchor, highlight(key, segments)))
+    replaced.reverse()
+    inserted.reverse()
+    return deleted, replaced, inserted
@@ -0,0 +1,277 @@
+import json
+import os
+import threading
+
+from mudream_market import PIECE_TYPES, piece_exists, piece_requirements
+
+
+def uncollected_remaining(set_name, requirements):
+    """Pieces of a set not yet collected (what the Setup cards count down)"""
+    remaining = 0
+    for piece in PIECE_TYPES:
+        if not piece_exists(set_name, piece):
+            continue
+        _, collected = piece_requirements(requirements.get(piece, []))
+        if not collected:
+            remaining += 1
+    return remaining
+
+
+def needs_request(set_name, piece, requirements):
+    """True when search_piece would actually hit the network for this piece"""
+    if not piece_exists(set_name, piece) or piece not in requirements:
+        return False
+    options, collected = piece_requirements(requirements[piece])
+    return bool(options) and not collected
+
+
+class ActivityTracker:
+    """Exponentially weighted count of new listings per (set, piece)
+
+    Persisted to a small JSON file so 'hot' pieces are known at the start
+    of the next session too.
+    """
+
+    def __init__(self, path=None, alpha=0.3):
+        self.path = path
+        self.alpha = alpha
+        self.lock = threading.Lock()
+        self.scores = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for key, value in json.load(f).items():
+                        set_name, _, piece = key.rpartition('|')
+                        self.scores[(set_name, piece)] = float(value)
+            except (ValueError, OSError):
+                self.scores = {}
+
+    def update(self, set_name, piece, new_listings):
+        with self.lock:
+            old = self.scores.get((set_name, piece), float(new_listings))
+            self.scores[(set_name, piece)] = old + self.alpha * (new_listings - old)
+
+    def score(self, set_name, piece):
+        with self.lock:
+            return self.scores.get((set_name, piece), 0.0)
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            data = {f"{s}|{p}": round(v, 3) for (s, p), v in self.scores.items()}
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+        except OSError:
+            pass  # History is only a scheduling hint
+
+
+def piece_action(set_name, piece, requirements):
+    """What a scan does for one piece: 'missing', 'unconfigured', 'collected', 'no_options' or 'query'"""
+    if not piece_exists(set_name, piece):
+        return 'missing'
+    if piece not in requirements:
+        return 'unconfigured'
+    options, collected = piece_requirements(requirements[piece])
+    if collected:
+        return 'collected'
+    return 'query' if options else 'no_options'
+
+
+class QueryPlan:
+    """Per-(set, piece) scan decisions, kept up to date as the config changes
+
+    update() compares each set's requirements with the ones the plan was
+    built from and recomputes only the sets that were added or edited, so a
+    config reload does not redo the whole plan.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requirements = {}  # set -> requirements the entries were built from
+        self.entries = {}  # (set, piece) -> {'action', 'options'}
+        self.remaining = {}  # set -> uncollected pieces
+
+    def update(self, sets):
+        """Sync with the configured sets; returns the names that were recomputed"""
+        with self.lock:
+            for name in [n for n in self.requirements if n not in sets]:
+                del self.requirements[name]
+                del self.remaining[name]
+                for piece in PIECE_TYPES:
+                    self.entries.pop((name, piece), None)
+
+            rebuilt = []
+            for name, requirements in sets.items():
+                if self.requirements.get(name) == requirements:
+                    continue
+                for piece in PIECE_TYPES:
+                    action = piece_action(name, piece, requirements)
+                    options = piece_requirements(requirements[piece])[0] if action == 'query' else []
+                    self.entries[(name, piece)] = {'action': action, 'options': tuple(options)}
+                self.remaining[name] = uncollected_remaining(name, requirements)
+                self.requirements[name] = json.loads(json.dumps(requirements))  # Private copy
+                rebuilt.append(name)
+            return rebuilt
+
+    def needs_request(self, set_name, piece):
+        with self.lock:
+            entry = self.entries.get((set_name, piece))
+            return entry is not None and entry['action'] == 'query'
+
+    def dry_run(self, set_names, max_pages=1, cached=()):
+        """Count what a scan of set_names would do, without sending anything
+
+        cached holds (set, piece) keys with a remembered response; those are
+        still requested but usually come back unchanged.
+        """
+        counts = {'query': 0, 'collected': 0, 'missing': 0, 'unconfigured': 0, 'no_options': 0, 'cached': 0}
+        with self.lock:
+            for name in set_names:
+                for piece in PIECE_TYPES:
+                    entry = self.entries.get((name, piece))
+                    if entry is None:
+                        continue
+                    counts[entry['action']] += 1
+                    if entry['action'] == 'query' and (name, piece) in cached:
+                        counts['cached'] += 1
+        counts['min_requests'] = counts['query']
+        counts['max_requests'] = counts['query'] * max(1, max_pages)
+        return counts
+
+
+def plan_scan(sets_to_search, priorities=None, activity=None, query_plan=None):
+    """Order (set_name, piece) work so the most valuable results come first
+
+    Sort keys, in order: user priority (higher first), sets closest to
+    completion (fewest uncollected pieces), historically active pieces,
+    then configuration order. Pieces that need no request go last since
+    they cost nothing and show nothing new. With a QueryPlan (kept in sync
+    via update()) which pieces need a request is looked up, not re-derived.
+    """
+    priorities = priorities or {}
+    work = []
+    for set_index, (set_name, requirements) in enumerate(sets_to_search.items()):
+        planned = query_plan is not None and set_name in query_plan.remaining
+        remaining = query_plan.remaining[set_name] if planned else uncollected_remaining(set_name, requirements)
+        for piece_index, piece in enumerate(PIECE_TYPES):
+            hot = activity.score(set_name, piece) if activity else 0.0
+            if planned:
+                request = query_plan.needs_request(set_name, piece)
+            else:
+                request = needs_request(set_name, piece, requirements)
+            key = (
+                0 if request else 1,
+                -priorities.get(set_name, 0),
+                remaining,
+                -hot,
+                set_index,
+                piece_index
+            )
+            work.append((key, set_name, piece))
+    work.sort(key=lambda item: item[0])
+    return [(set_name, piece) for _, set_name, piece in work]
+
+
+class RefreshScheduler:
+    """Per-(set, piece) poll intervals that follow listing churn
+
+    A piece whose response changed (new lots, removed lots or new prices)
+    is polled twice as often next time, an unchanged one 1.5x less often,
+    always within [min_interval, max_interval]. If the intervals together
+    would exceed budget_per_minute requests, all of them are stretched
+    proportionally, and a token bucket enforces the budget regardless.
+    """
+
+    def __init__(self, min_interval=60, max_interval=3600, budget_per_minute=30, alpha=0.3):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget_per_minute = budget_per_minute
+        self.alpha = alpha
+        self.lock = threading.Lock()
+        self.state = {}  # (set, piece) -> {'interval', 'due', 'churn', 'polls', 'changes'}
+        self.tokens = float(budget_per_minute)
+        self.tokens_at = None
+
+    def sync(self, keys, now):
+        """Track exactly these pieces, in plan_scan order; new ones are due immediately"""
+        with self.lock:
+            for rank, key in enumerate(keys):
+                entry = self.state.get(key)
+                if entry is None:
+                    entry = self.state[key] = {'interval': self.min_interval, 'due': now, 'churn': 1.0,
+                                               'polls': 0, 'changes': 0}
+                entry['rank'] = rank
+            tracked = set(keys)
+            for key in [k for k in self.state if k not in tracked]:
+                del self.state[key]
+
+    def stretch(self):
+        """Factor applied to every interval to keep the expected rate within budget"""
+        rate = sum(60.0 / entry['interval'] for entry in self.state.values())
+        return max(1.0, rate / self.budget_per_minute) if self.budget_per_minute else 1.0
+
+    def record(self, key, changed, now):
+        """Adapt a piece's interval after a poll and schedule the next one"""
+        with self.lock:
+            entry = self.state.get(key)
+            if entry is None:
+                return
+            entry['polls'] += 1
+            entry['changes'] += 1 if changed else 0
+            entry['churn'] += self.alpha * ((1.0 if changed else 0.0) - entry['churn'])
+            factor = 0.5 if changed else 1.5
+            entry['interval'] = min(self.max_interval, max(self.min_interval, entry['interval'] * factor))
+            entry['due'] = now + entry['interval'] * self.stretch()
+
+    def expedite(self, now):
+        """Make every piece due now (an explicit refresh request)"""
+        with self.lock:
+            for entry in self.state.values():
+                entry['due'] = min(entry['due'], now)
+
+    def refill(self, now):
+        if self.tokens_at is not None:
+            self.tokens = min(float(self.budget_per_minute),
+                              self.tokens + (now - self.tokens_at) * self.budget_per_minute / 60.0)
+        self.tokens_at = now
+
+    def next_batch(self, now):
+        """Pieces to poll now: most overdue, then most churning, then plan order - within the budget"""
+        with self.lock:
+            self.refill(now)
+            due = [(entry['due'], -entry['churn'], entry['rank'], key)
+                   for key, entry in self.state.items() if entry['due'] <= now]
+            due.sort()
+            batch = [key for _, _, _, key in due[:int(self.tokens)]]
+            self.tokens -= len(batch)
+            return batch
+
+    def wait_time(self, now):
+        """Seconds until the next piece is due and a request token is available"""
+        with self.lock:
+            if not self.state:
+                return self.max_interval
+            self.refill(now)
+            until_due = max(0.0, min(entry['due'] for entry in self.state.values()) - now)
+            if self.tokens >= 1:
+                until_token = 0.0
+            elif self.budget_per_minute > 0:
+                until_token = (1 - self.tokens) * 60.0 / self.budget_per_minute
+            else:
+                until_token = self.max_interval  # No budget: tokens never refill
+            return max(until_due, until_token)
+
+    def summary(self):
+        with self.lock:
+            intervals = sorted(entry['interval'] for entry in self.state.values())
+            return {
+                'pieces': len(intervals),
+                'min_interval': intervals[0] if intervals else None,
+                'median_interval': intervals[len(intervals) // 2] if intervals else None,
+                'max_interval': intervals[-1] if intervals else None,
+                'stretch': self.stretch(),
+                'expected_per_minute': sum(60.0 / i for i in intervals) / self.stretch() if intervals else 0.0,
+                'budget_per_minute': self.budget_per_minute
+            }
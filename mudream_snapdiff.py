@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import time
+
+from mudream_snapshots import iter_snapshot, list_snapshots, open_text
+
+
+def price_vector(row):
+    """Hashable per-currency price vector of a snapshot row"""
+    return tuple(sorted((row.get('prices') or {}).items()))
+
+
+def index_snapshot(path):
+    """(set, piece, lot id) -> (price vector, value) for every lot of the older snapshot"""
+    index = {}
+    for row in iter_snapshot(path):
+        if 'id' in row:
+            index[(row['set'], row['piece'], row['id'])] = (price_vector(row), row.get('value'))
+    return index
+
+
+def diff_snapshots(old_path, new_path):
+    """Yield the changes between two snapshots, one dict per lot
+
+    Only the older snapshot is indexed (by lot id, with its price vector);
+    the newer one is streamed past it, so the diff is one pass over each
+    file. 'new' and 'repriced' changes come out while the newer snapshot is
+    read, 'removed' (sold or delisted) lots at the end.
+
+    A lot only counts as removed if the newer scan covered its (set, piece):
+    a coverage row, or - for snapshots written before coverage rows - at
+    least one lot of that piece. Pieces the newer scan did not reach (a
+    --set limited, partial or timed-out scan) yield one 'not_compared'
+    change each instead.
+    """
+    old = index_snapshot(old_path)
+    matched = set()
+    added = set()
+    covered = set()
+    listed = set()
+
+    for row in iter_snapshot(new_path):
+        if 'id' not in row:
+            covered.add((row['set'], row['piece']))
+            continue
+        key = (row['set'], row['piece'], row['id'])
+        listed.add(key[:2])
+        if key in matched or key in added:
+            continue  # Listed twice in one scan
+        previous = old.get(key)
+        if previous is None:
+            added.add(key)
+            yield {'change': 'new', 'set': key[0], 'piece': key[1], 'id': key[2],
+                   'prices': row.get('prices'), 'value': row.get('value')}
+            continue
+        matched.add(key)
+        vector = price_vector(row)
+        if vector != previous[0]:
+            yield {'change': 'repriced', 'set': key[0], 'piece': key[1], 'id': key[2],
+                   'old_prices': dict(previous[0]), 'prices': row.get('prices'),
+                   'old_value': previous[1], 'value': row.get('value')}
+
+    covered = covered or listed
+    not_compared = {}
+    for key, (vector, value) in old.items():
+        if key in matched:
+            continue
+        if key[:2] not in covered:
+            not_compared[key[:2]] = not_compared.get(key[:2], 0) + 1
+            continue
+        yield {'change': 'removed', 'set': key[0], 'piece': key[1], 'id': key[2],
+               'prices': dict(vector), 'value': value}
+    for (set_name, piece), lots in not_compared.items():
+        yield {'change': 'not_compared', 'set': set_name, 'piece': piece, 'lots': lots}
+
+
+def latest_pair(directory):
+    """The two most recent snapshot files in a directory"""
+    files = list_snapshots(directory)
+    return files[-2:] if len(files) >= 2 else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="New, removed and re-priced lots between two MuDream market snapshots")
+    parser.add_argument("snapshots", nargs="*", metavar="SNAPSHOT",
+                        help="Older and newer snapshot file (default: the latest two in --dir)")
+    parser.add_argument("--dir", default="snapshots", help="Snapshot directory used when no files are given")
+    parser.add_argument("--output", help="Write every change as a JSON line (.gz to compress)")
+    parser.add_argument("--set", action="append", dest="sets", help="Only report this set (repeatable)")
+    args = parser.parse_args(argv)
+
+    if args.snapshots:
+        if len(args.snapshots) != 2:
+            parser.error("give exactly two snapshot files (older, newer)")
+        old_path, new_path = args.snapshots
+    else:
+        pair = latest_pair(args.dir)
+        if not pair:
+            parser.error(f"need at least two snapshots in {args.dir}")
+        old_path, new_path = pair
+    for path in (old_path, new_path):
+        if not os.path.exists(path):
+            parser.error(f"no such snapshot: {path}")
+
+    start = time.perf_counter()
+    counts = {}
+    not_compared = []
+    output = open_text(args.output, 'w') if args.output else None
+    try:
+        for change in diff_snapshots(old_path, new_path):
+            if args.sets and change['set'] not in args.sets:
+                continue
+            if change['change'] == 'not_compared':
+                not_compared.append(change)
+                continue
+            piece_counts = counts.setdefault((change['set'], change['piece']), {'new': 0, 'removed': 0, 'repriced': 0})
+            piece_counts[change['change']] += 1
+            if output is not None:
+                output.write(json.dumps(change) + "\n")
+    finally:
+        if output is not None:
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"{os.path.basename(old_path)} -> {os.path.basename(new_path)}\n")
+    for (set_name, piece), piece_counts in sorted(counts.items()):
+        print(f"{set_name:<16} {piece:<7} +{piece_counts['new']:<5} new  -{piece_counts['removed']:<5} gone  "
+              f"~{piece_counts['repriced']:<5} re-priced")
+    for change in sorted(not_compared, key=lambda c: (c['set'], c['piece'])):
+        print(f"{change['set']:<16} {change['piece']:<7} not compared ({change['lots']} lot(s), not rescanned)")
+    totals = {change: sum(c[change] for c in counts.values()) for change in ('new', 'removed', 'repriced')}
+    print(f"\n{totals['new']} new, {totals['removed']} gone, {totals['repriced']} re-priced "
+          f"in {elapsed:.2f}s" + (f" -> {args.output}" if args.output else ""))
+
+
+if __name__ == "__main__":
+    main()
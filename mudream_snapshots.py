@@ -0,0 +1,97 @@
+import gzip
+import json
+import os
+import threading
+import time
+
+
+def open_text(path, mode='r'):
+    """Open a snapshot file, transparently handling .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def lot_row(ts, set_name, piece, lot, value):
+    """One snapshot line for a fetched lot"""
+    return {
+        'ts': ts,
+        'set': set_name,
+        'piece': piece,
+        'id': lot.get('id'),
+        'prices': {p['Currency']['code'].lower(): p['value'] for p in lot.get('Prices', [])},
+        'value': value if value != float('inf') else None,
+        'gs': lot.get('gearScore'),
+        'mine': bool(lot.get('isMine')),
+        'source': lot.get('source')
+    }
+
+
+def coverage_row(ts, set_name, piece, lots):
+    """Snapshot line recording that a (set, piece) was scanned and how many lots it had
+
+    Coverage rows have no 'id'; they let readers tell a piece that was
+    scanned empty from one the scan never reached.
+    """
+    return {'ts': ts, 'set': set_name, 'piece': piece, 'scanned': lots}
+
+
+def iter_snapshot(path):
+    """Yield rows of a snapshot file one at a time"""
+    with open_text(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def list_snapshots(directory):
+    """Snapshot files in a directory, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    names = [n for n in os.listdir(directory) if n.endswith('.jsonl') or n.endswith('.jsonl.gz')]
+    return [os.path.join(directory, n) for n in sorted(names)]
+
+
+class SnapshotWriter:
+    """Stream every fetched lot of a scan to snapshots/snapshot_<time>.jsonl
+
+    Register it on a MarketSearcher with add_lot_listener(); one file is
+    written per scan (begin_scan / end_scan), one JSON line per lot, so a
+    snapshot never has to be held in memory. Each fetched piece is preceded
+    by a coverage row (see coverage_row).
+    """
+
+    def __init__(self, directory="snapshots"):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.file = None
+        self.path = None
+        self.ts = None
+        self.rows = 0
+
+    def begin_scan(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with self.lock:
+            self.ts = time.time()
+            self.path = os.path.join(self.directory, time.strftime("snapshot_%Y%m%d_%H%M%S.jsonl",
+                                                                   time.localtime(self.ts)))
+            self.file = open(self.path, 'a', encoding='utf-8')
+            self.rows = 0
+        return self.path
+
+    def __call__(self, set_name, piece, lots, value_of):
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(json.dumps(coverage_row(self.ts, set_name, piece, len(lots))) + "\n")
+            for lot in lots:
+                self.file.write(json.dumps(lot_row(self.ts, set_name, piece, lot, value_of(lot))) + "\n")
+                self.rows += 1
+
+    def end_scan(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+        return self.path
@@ -0,0 +1,183 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+STAGE_ORDER = ['request', 'parse', 'filter', 'sort', 'render']
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def process_memory_kb():
+    """Resident memory of this process in KB, or None if it cannot be read
+
+    Uses /proc on Linux and GetProcessMemoryInfo on Windows; elsewhere
+    falls back to the peak reported by getrusage.
+    """
+    try:
+        if sys.platform.startswith('linux'):
+            with open('/proc/self/statm', 'r') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                    (name, ctypes.c_size_t) for name in (
+                        'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                        'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage',
+                        'PagefileUsage', 'PeakPagefileUsage'
+                    )
+                ]
+
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize // 1024
+            return None
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak
+    except (OSError, ValueError, ImportError, AttributeError):
+        return None
+
+
+class ScanStats:
+    """Collect per-request and per-stage timings for one scan
+
+    Every timed stage is kept as an event so it can be exported as JSON
+    lines; counters hold simple tallies such as cache hits. Events live in
+    a ring buffer of max_events, so a very long scan keeps only the latest.
+    """
+
+    def __init__(self, max_events=20000):
+        self.lock = threading.Lock()
+        self.events = deque(maxlen=max_events)
+        self.counters = {}
+        self.started = time.time()
+
+    def record(self, stage, seconds, **fields):
+        """Store one timed event"""
+        event = {'stage': stage, 'ms': seconds * 1000, 'at': time.time()}
+        event.update(fields)
+        with self.lock:
+            if len(self.events) == self.events.maxlen:
+                self.counters['events_dropped'] = self.counters.get('events_dropped', 0) + 1
+            self.events.append(event)
+
+    @contextmanager
+    def timer(self, stage, **fields):
+        """Time the enclosed block as one event; yields a dict for extra fields"""
+        extra = {}
+        start = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            fields.update(extra)
+            self.record(stage, time.perf_counter() - start, **fields)
+
+    def count(self, name, amount=1):
+        """Increment a named counter"""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self):
+        """Aggregate events per stage"""
+        with self.lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+
+        by_stage = {}
+        for event in events:
+            by_stage.setdefault(event['stage'], []).append(event)
+
+        stages = {}
+        for stage, stage_events in by_stage.items():
+            times = [e['ms'] for e in stage_events]
+            stages[stage] = {
+                'count': len(times),
+                'total_ms': sum(times),
+                'mean_ms': sum(times) / len(times),
+                'p50_ms': percentile(times, 50),
+                'p95_ms': percentile(times, 95),
+                'max_ms': max(times),
+                'bytes': sum(e.get('bytes', 0) for e in stage_events)
+            }
+        return {'stages': stages, 'counters': counters, 'wall_seconds': time.time() - self.started}
+
+    def format_summary(self):
+        """Human readable summary for the stats panel"""
+        summary = self.summary()
+        stages = summary['stages']
+        if not stages:
+            return "No scan statistics yet"
+
+        ordered = [s for s in STAGE_ORDER if s in stages] + sorted(s for s in stages if s not in STAGE_ORDER)
+        total_ms = sum(stages[s]['total_ms'] for s in ordered) or 1.0
+        lines = []
+        for stage in ordered:
+            data = stages[stage]
+            line = (f"{stage:<8} {data['count']:>4}×  total {data['total_ms']:>8.1f}ms "
+                    f"({data['total_ms'] / total_ms:>4.0%})  p50 {data['p50_ms']:>7.2f}ms  p95 {data['p95_ms']:>7.2f}ms")
+            if data['bytes']:
+                line += f"  {data['bytes'] / 1024:,.0f} KB"
+            lines.append(line)
+
+        if summary['counters']:
+            lines.append("  ".join(f"{name}: {value}" for name, value in sorted(summary['counters'].items())))
+        return "\n".join(lines)
+
+    def export_jsonl(self, path):
+        """Append every event plus a summary record to a JSON Lines file"""
+        with self.lock:
+            events = list(self.events)
+        with open(path, 'a', encoding='utf-8') as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+            f.write(json.dumps({'stage': 'summary', **self.summary()}) + "\n")
+
+
+class StartupTimer:
+    """Wall-clock phases of application startup, to keep regressions visible
+
+    mark(name) closes the phase running since the previous mark; record()
+    adds work done later on demand (e.g. a tab built on its first visit).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.phases = []  # (name, seconds)
+        self.deferred = []  # (name, seconds), outside the startup total
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def record(self, name, seconds, deferred=False):
+        (self.deferred if deferred else self.phases).append((name, seconds))
+
+    def total(self):
+        return sum(seconds for _, seconds in self.phases)
+
+    def format_summary(self):
+        """One line: total startup time and each phase in milliseconds"""
+        line = f"startup {self.total() * 1000:.0f} ms: " + " • ".join(
+            f"{name} {seconds * 1000:.0f}" for name, seconds in self.phases
+        )
+        if self.deferred:
+            line += " | later: " + " • ".join(f"{name} {seconds * 1000:.0f}" for name, seconds in self.deferred)
+        return line
@@ -0,0 +1,481 @@
+import hashlib
+import json
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+
+class TransportError(Exception):
+    """Raised when a transport cannot deliver a response"""
+
+
+def query_key(variables):
+    """Canonical key for a lots query, ignoring paging variables"""
+    return json.dumps(variables.get('filter', {}), sort_keys=True)
+
+
+class HttpTransport:
+    """Send GraphQL requests over HTTP, reusing one pooled session
+
+    requests is imported and the session created on the first request, so
+    building a transport costs nothing at startup.
+    """
+
+    def __init__(self):
+        self.session = None
+        self.lock = threading.Lock()
+
+    def get_session(self):
+        with self.lock:
+            if self.session is None:
+                import requests
+                self.session = requests.Session()
+            return self.session
+
+    def post(self, url, payload, headers, timeout):
+        """POST a JSON payload and return the raw response body"""
+        return self.post_status(url, payload, headers, timeout)[1]
+
+    def post_status(self, url, payload, headers, timeout):
+        """POST a JSON payload and return (HTTP status, raw response body)"""
+        response = self.get_session().post(url, json=payload, headers=headers, timeout=timeout)
+        if response.status_code >= 500:
+            raise TransportError(f"HTTP {response.status_code}")
+        return response.status_code, response.content
+
+
+class RecordingTransport:
+    """Wrap another transport and append every exchange to a JSON Lines file"""
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def post(self, url, payload, headers, timeout):
+        """Forward the request and record variables and response (never the token)"""
+        body = self.inner.post(url, payload, headers, timeout)
+        try:
+            response = json.loads(body)
+        except ValueError:
+            response = {'raw': body.decode('utf-8', errors='replace')}
+
+        entry = {
+            'operationName': payload.get('operationName'),
+            'variables': payload.get('variables', {}),
+            'response': response,
+            'recorded_at': time.time()
+        }
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+        return body
+
+
+class ResponseCache:
+    """Compressed on-disk store of raw API responses, kept across app starts
+
+    One file per request (URL and payload - never the token) holding the
+    time it was fetched and the zlib-compressed body. Per-account fields
+    (ACCOUNT_FIELDS) are stripped before storing, since a warm start may run
+    under another token - or none. Entries are written to
+    a temporary file and renamed into place, so several writers sharing the
+    directory (the app and the daemon) never leave a torn entry; the last
+    rename wins. A file's mtime is its last use: once the directory grows
+    past max_bytes the least recently used entries are deleted.
+
+    The cache is itself a transport that answers only from disk (entries
+    up to max_age seconds old), which is what a warm start scans with.
+    """
+
+    HEADER = struct.Struct('<d')
+    ACCOUNT_FIELDS = ('isMine',)
+
+    def __init__(self, directory="response_cache", max_bytes=50 * 1024 * 1024, max_age=7 * 86400):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.size = None  # Bytes on disk, scanned on first write
+        self.oldest_served = None  # Fetch time of the oldest entry post() returned
+
+    def path_for(self, url, payload):
+        key = hashlib.sha256((url + "\n" + json.dumps(payload, sort_keys=True)).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + ".z")
+
+    def get(self, url, payload, max_age=None):
+        """(fetched_at, body) for a request, or None if missing, expired or unreadable"""
+        path = self.path_for(url, payload)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            fetched_at, = self.HEADER.unpack_from(data)
+            body = zlib.decompress(data[self.HEADER.size:])
+        except (OSError, struct.error, zlib.error):
+            return None
+        if time.time() - fetched_at > (self.max_age if max_age is None else max_age):
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        return fetched_at, body
+
+    def strip_account_fields(self, body):
+        """body without per-account fields, or None if it is not JSON"""
+        def strip(value):
+            if isinstance(value, dict):
+                return {k: strip(v) for k, v in value.items() if k not in self.ACCOUNT_FIELDS}
+            if isinstance(value, list):
+                return [strip(v) for v in value]
+            return value
+
+        try:
+            return json.dumps(strip(json.loads(body))).encode('utf-8')
+        except ValueError:
+            return None
+
+    def put(self, url, payload, body):
+        """Store a response, evicting least recently used entries past max_bytes"""
+        body = self.strip_account_fields(body)
+        if body is None:
+            return
+        data = self.HEADER.pack(time.time()) + zlib.compress(body, 6)
+        path = self.path_for(url, payload)
+        temp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            try:
+                replaced = os.path.getsize(path)  # Refreshing an entry only grows the cache by the difference
+            except OSError:
+                replaced = 0
+            os.replace(temp_path, path)
+            temp_path = None
+        except OSError:
+            return  # The cache is only an optimisation
+        finally:
+            if temp_path is not None:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+        with self.lock:
+            if self.size is None:
+                self.size = self.usage()[1]
+            else:
+                self.size += len(data) - replaced
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def entries(self):
+        """(mtime, size, path) of every entry"""
+        found = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".z"):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        found.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return found
+
+    def usage(self):
+        """(entries, bytes) currently on disk"""
+        found = self.entries()
+        return len(found), sum(size for _, size, _ in found)
+
+    def evict(self):
+        """Delete least recently used entries until the cache is below 90% of max_bytes"""
+        found = sorted(self.entries())
+        size = sum(size for _, size, _ in found)
+        for _, entry_size, path in found:
+            if size <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # Already evicted by another writer
+            size -= entry_size
+        self.size = size
+
+    def post(self, url, payload, headers, timeout):
+        """Answer a request from disk only (raises TransportError when not cached)"""
+        cached = self.get(url, payload)
+        if cached is None:
+            raise TransportError("Not in the response cache")
+        with self.lock:
+            if self.oldest_served is None or cached[0] < self.oldest_served:
+                self.oldest_served = cached[0]
+        return cached[1]
+
+
+class DiskCacheTransport:
+    """Wrap another transport and keep every successful response in a ResponseCache
+
+    Only HTTP 200 responses without GraphQL errors are stored. Transports
+    without post_status (replay, mock) raise on failures, so their bodies
+    count as 200.
+    """
+
+    def __init__(self, inner, cache):
+        self.inner = inner
+        self.cache = cache
+
+    def post(self, url, payload, headers, timeout):
+        if hasattr(self.inner, 'post_status'):
+            status, body = self.inner.post_status(url, payload, headers, timeout)
+        else:
+            status, body = 200, self.inner.post(url, payload, headers, timeout)
+        if status == 200 and b'"errors"' not in body:
+            self.cache.put(url, payload, body)
+        return body
+
+
+class PrefetchTransport:
+    """Serve requests from responses fetched ahead of time
+
+    prefetch() sends a request early and parks the body for up to ttl
+    seconds; the first post() of the same request (URL, payload and token)
+    takes it instead of going to the network. If that request is still in
+    flight, post() waits for it rather than sending a duplicate. Parked
+    bodies are used once, so an explicit search is never older than the
+    prefetch that warmed it.
+    """
+
+    def __init__(self, inner, ttl=120, max_entries=200):
+        self.inner = inner
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.ready = OrderedDict()  # request key -> (fetched at, body)
+        self.pending = {}  # request key -> Event set when the prefetch finishes
+        self.prefetched = 0
+        self.hits = 0
+
+    @staticmethod
+    def request_key(url, payload, headers):
+        return (url, json.dumps(payload, sort_keys=True), headers.get('Authorization'))
+
+    def prefetch(self, url, payload, headers, timeout, cancelled=None):
+        """Fetch a request now for a later post(); returns True if a body was parked
+
+        A body that arrives after the cancelled event was set is not parked.
+        """
+        key = self.request_key(url, payload, headers)
+        with self.lock:
+            if key in self.pending or key in self.ready:
+                return False
+            event = self.pending[key] = threading.Event()
+        try:
+            body = self.inner.post(url, payload, headers, timeout)
+        except Exception:
+            return False  # A failed prefetch just means a normal request later
+        else:
+            if cancelled is not None and cancelled.is_set():
+                return False
+            with self.lock:
+                self.ready[key] = (time.monotonic(), body)
+                while len(self.ready) > self.max_entries:
+                    self.ready.popitem(last=False)
+                self.prefetched += 1
+            return True
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+            event.set()
+
+    def post(self, url, payload, headers, timeout):
+        """Use a parked prefetch of this request if there is one, else forward it"""
+        key = self.request_key(url, payload, headers)
+        with self.lock:
+            event = self.pending.get(key)
+        if event is not None:
+            event.wait(timeout)
+        with self.lock:
+            entry = self.ready.pop(key, None)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self.hits += 1
+                return entry[1]
+        return self.inner.post(url, payload, headers, timeout)
+
+    def discard(self):
+        """Drop every parked response"""
+        with self.lock:
+            self.ready.clear()
+
+
+class ReplayTransport:
+    """In-process stub that serves recorded or synthetic lots like the real API
+
+    Lots are stored per query filter and paged on demand, so pagination works
+    regardless of how the data was captured. Latency, jitter and error
+    injection make the stub usable for both tests and benchmarks.
+    """
+
+    def __init__(self, lots_by_query=None, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_kind='graphql', page_size=None, seed=None):
+        self.lots_by_query = lots_by_query or {}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+        self.page_size = page_size
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+
+    @classmethod
+    def from_recording(cls, path, **kwargs):
+        """Build a replay transport from a RecordingTransport file"""
+        lots_by_query = {}
+        seen_ids = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                data = (entry.get('response') or {}).get('data') or {}
+                page = data.get('lots')
+                if not page:
+                    continue
+                key = query_key(entry.get('variables', {}))
+                lots = lots_by_query.setdefault(key, [])
+                ids = seen_ids.setdefault(key, set())
+                for lot in page.get('Lots', []):
+                    if lot.get('id') not in ids:
+                        ids.add(lot.get('id'))
+                        lots.append(lot)
+        return cls(lots_by_query, **kwargs)
+
+    def add_lots(self, variables_filter, lots):
+        """Register lots to be served for a query filter"""
+        key = json.dumps(variables_filter, sort_keys=True)
+        self.lots_by_query.setdefault(key, []).extend(lots)
+
+    def handle(self, payload):
+        """Produce (status, body) for a GraphQL payload"""
+        with self.lock:
+            self.request_count += 1
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate and self.random.random() < self.error_rate
+
+        if delay:
+            time.sleep(delay)
+
+        if fail:
+            if self.error_kind == 'http':
+                return 500, b'Internal Server Error'
+            body = {'errors': [{'message': 'Injected replay error'}], 'data': None}
+            return 200, json.dumps(body).encode('utf-8')
+
+        variables = payload.get('variables', {})
+        if payload.get('operationName') == 'GET_LOT':
+            # Detail lookups are answered from whatever lot lists are loaded
+            lot = next((lot for lots in self.lots_by_query.values() for lot in lots
+                        if str(lot.get('id')) == str(variables.get('id'))), None)
+            return 200, json.dumps({'data': {'lot': lot}}).encode('utf-8')
+
+        lots = self.lots_by_query.get(query_key(variables), [])
+        limit = variables.get('limit') or len(lots) or 1
+        if self.page_size:
+            limit = min(limit, self.page_size)
+        offset = variables.get('offset') or 0
+
+        page = lots[offset:offset + limit]
+        body = {
+            'data': {
+                'lots': {
+                    'Lots': page,
+                    'Pagination': {
+                        'total': len(lots),
+                        'currentPage': offset // limit + 1,
+                        'nextPageExists': offset + limit < len(lots),
+                        '__typename': 'Pagination'
+                    },
+                    '__typename': 'LotsResult'
+                }
+            }
+        }
+        return 200, json.dumps(body).encode('utf-8')
+
+    def post(self, url, payload, headers, timeout):
+        """Serve the payload in-process, mirroring HttpTransport.post"""
+        status, body = self.handle(payload)
+        if status >= 500:
+            raise TransportError(f"HTTP {status}")
+        return body
+
+
+class MockGraphQLServer:
+    """Local HTTP server that answers GraphQL requests from a ReplayTransport"""
+
+    def __init__(self, replay, host='127.0.0.1', port=0):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Test/benchmark only
+
+        self.replay = replay
+        replay_ref = replay
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    status, body = 400, b'{"errors": [{"message": "Invalid JSON"}]}'
+                else:
+                    status, body = replay_ref.handle(payload)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/graphql"
+
+    def start(self):
+        """Start serving in a background thread"""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the socket"""
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
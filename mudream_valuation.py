@@ -0,0 +1,157 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+BASE_CURRENCY = 'life'
+
+
+class ValuationEngine:
+    """Derive currency weights from lots listed in more than one currency
+
+    A lot priced "v_a of a or v_b of b" says v_a * W_a = v_b * W_b, i.e.
+    log W_a - log W_b = log v_b - log v_a. Those observations are kept per
+    currency pair as exponentially decayed sums, and the weight vector is a
+    weighted least-squares fit of log weights anchored at Life = 1.0. The
+    fit is cached until new observations arrive. Currencies that are not
+    connected to Life through any observation keep their fixed weight.
+    Only the last remember_lots listings are remembered for de-duplication.
+    """
+
+    def __init__(self, fallback, half_life=6 * 3600, remember_lots=20000):
+        self.half_life = half_life
+        self.fallback = dict(fallback)
+        self.remember_lots = remember_lots
+        self.lock = threading.Lock()
+        self.pairs = {}  # (a, b) with a < b -> [weight, weighted sum of log ratios, last update]
+        self.seen_lots = OrderedDict()
+        self.observed = 0
+        self.version = 0
+        self._cached = None
+        self._cached_version = -1
+
+    def decay(self, elapsed):
+        if elapsed <= 0:
+            return 1.0
+        return math.exp(-math.log(2) * elapsed / self.half_life)
+
+    def observe_lot(self, lot, now=None):
+        """Add the exchange rates implied by one lot's alternative prices"""
+        prices = {}
+        for price in lot.get('Prices', []):
+            value = price.get('value') or 0
+            if value > 0:
+                prices[price['Currency']['code'].lower()] = value
+        if len(prices) < 2:
+            return False
+
+        lot_id = lot.get('id')
+        signature = tuple(sorted(prices.items()))
+        now = time.time() if now is None else now
+
+        with self.lock:
+            # The same unchanged listing fetched again is not new evidence
+            if lot_id is not None and self.seen_lots.get(lot_id) == signature:
+                self.seen_lots.move_to_end(lot_id)
+                return False
+            if lot_id is not None:
+                self.seen_lots[lot_id] = signature
+                self.seen_lots.move_to_end(lot_id)
+                if len(self.seen_lots) > self.remember_lots:
+                    self.seen_lots.popitem(last=False)
+            self.observed += 1
+
+            codes = sorted(prices)
+            for i, a in enumerate(codes):
+                for b in codes[i + 1:]:
+                    ratio = math.log(prices[b]) - math.log(prices[a])
+                    entry = self.pairs.get((a, b))
+                    if entry is None:
+                        self.pairs[(a, b)] = [1.0, ratio, now]
+                    else:
+                        factor = self.decay(now - entry[2])
+                        entry[0] = entry[0] * factor + 1.0
+                        entry[1] = entry[1] * factor + ratio
+                        entry[2] = now
+            self.version += 1
+        return True
+
+    def observe_lots(self, lots, now=None):
+        """Feed a batch of fetched lots; returns how many added evidence"""
+        return sum(1 for lot in lots if self.observe_lot(lot, now))
+
+    def weights(self, now=None):
+        """Current weight vector (cached until new observations arrive)"""
+        with self.lock:
+            if self._cached is not None and self._cached_version == self.version:
+                return self._cached
+
+            now = time.time() if now is None else now
+            edges = {}
+            for (a, b), (weight, total, last) in self.pairs.items():
+                decayed = weight * self.decay(now - last)
+                if decayed <= 0:
+                    continue
+                mean = total / weight
+                edges.setdefault(a, []).append((b, decayed, mean))
+                edges.setdefault(b, []).append((a, decayed, -mean))
+            version = self.version
+
+        result = dict(self.fallback)
+        connected = self.connected_to_base(edges)
+        if len(connected) > 1:
+            logs = {code: math.log(self.fallback[code]) if self.fallback.get(code) else 0.0 for code in connected}
+            logs[BASE_CURRENCY] = 0.0
+            # Gauss-Seidel on the weighted least-squares normal equations
+            for _ in range(100):
+                change = 0.0
+                for code in connected:
+                    if code == BASE_CURRENCY:
+                        continue
+                    total_weight = 0.0
+                    total = 0.0
+                    for other, weight, mean in edges[code]:
+                        # log W_code - log W_other = mean
+                        total += weight * (logs[other] + mean)
+                        total_weight += weight
+                    value = total / total_weight
+                    change = max(change, abs(value - logs[code]))
+                    logs[code] = value
+                if change < 1e-9:
+                    break
+            for code in connected:
+                result[code] = math.exp(logs[code])
+
+        with self.lock:
+            self._cached = result
+            self._cached_version = version
+        return result
+
+    def connected_to_base(self, edges):
+        """Currencies reachable from the base currency through observations"""
+        if BASE_CURRENCY not in edges:
+            return set()
+        seen = {BASE_CURRENCY}
+        stack = [BASE_CURRENCY]
+        while stack:
+            code = stack.pop()
+            for other, _, _ in edges.get(code, []):
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        return seen
+
+    def observation_count(self):
+        with self.lock:
+            return self.observed
+
+    def describe(self, weights=None):
+        """One-line summary of the live rates"""
+        weights = weights or self.weights()
+        order = ['life', 'chaos', 'creat', 'bless', 'soul', 'dc', 'zen']
+        parts = []
+        for code in order + sorted(c for c in weights if c not in order):
+            if code in weights:
+                value = weights[code]
+                parts.append(f"{code}={value:.3g}" if value < 0.01 else f"{code}={value:.2f}")
+        return ", ".join(parts)
@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LEVELS = [0, 1, 2, 3, 4]
+
+
+def make_lot(lot_id, prices, piece='armor', gear_score=500, options=None):
+    """A lot shaped like the API's lot list entries; prices is {currency code: value}"""
+    lot = {
+        'id': lot_id,
+        'source': 'Market',
+        'isMine': False,
+        'type': piece,
+        'gearScore': gear_score,
+        'hasPendingCounterOffer': False,
+        'Prices': [{'value': value, 'Currency': {'id': code, 'code': code, 'type': 'jewel', 'title': code}}
+                   for code, value in prices.items()],
+        'Currencies': []
+    }
+    if options is not None:
+        lot['Item'] = {'options': list(options)}
+    return lot
+
+
+def lots_filter(set_name, piece, options):
+    return {'name': set_name, 'type': [piece], **{opt: LEVELS for opt in options}}
+
+
+def write_recording(path, queries, page_size=50):
+    """Write a RecordingTransport file serving {(set, piece, options): lots}, page by page"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for (set_name, piece, options), lots in queries.items():
+            for offset in range(0, max(1, len(lots)), page_size):
+                page = lots[offset:offset + page_size]
+                entry = {
+                    'operationName': 'GET_ALL_LOTS',
+                    'variables': {'filter': lots_filter(set_name, piece, options), 'limit': page_size,
+                                  'offset': offset},
+                    'response': {'data': {'lots': {
+                        'Lots': page,
+                        'Pagination': {'total': len(lots), 'nextPageExists': offset + page_size < len(lots)}
+                    }}},
+                    'recorded_at': 0
+                }
+                f.write(json.dumps(entry) + "\n")
+    return path
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """Factory writing a recording into the test's temp directory"""
+    def factory(queries, page_size=50):
+        return write_recording(str(tmp_path / "session.jsonl"), queries, page_size)
+    return factory
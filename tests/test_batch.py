@@ -0,0 +1,90 @@
+import itertools
+import random
+
+from conftest import lots_filter, make_lot
+
+from mudream_batch import lot_options, run_batch
+from mudream_market import MarketSearcher
+from mudream_transport import ReplayTransport
+
+OPTIONS = ['iml', 'dd', 'rd']
+PROFILES = {
+    'broad': {'sets': {'Leather': {'armor': {'options': ['iml'], 'collected': False}}}},
+    'strict': {'sets': {'Leather': {'armor': {'options': ['iml', 'dd'], 'collected': False}}}},
+    'stricter': {'sets': {'Leather': {'armor': {'options': ['iml', 'dd', 'rd'], 'collected': False}}}}
+}
+
+
+def build_market(label=lambda code: code, count=80, seed=3):
+    """Replay market where every option filter returns the lots having those options"""
+    rng = random.Random(seed)
+    lots = []
+    for i in range(count):
+        options = [code for code in OPTIONS if rng.random() < 0.6]
+        lots.append(make_lot(i, {'soul': rng.randint(1, 30)}, options=[label(code) for code in options]))
+    replay = ReplayTransport()
+    for size in range(1, len(OPTIONS) + 1):
+        for required in itertools.combinations(OPTIONS, size):
+            matching = [lot for lot in lots if set(required) <= set(o.lower() for o in lot['Item']['options'])]
+            replay.add_lots(lots_filter('Leather', 'armor', required), matching)
+    return replay
+
+
+def summary(results):
+    return {
+        (name, r['set'], r['piece']): (r.get('filtered_total'), [lot['id'] for lot in r.get('lots', [])])
+        for name, sets in results.items() for set_results in sets.values() for r in set_results
+    }
+
+
+def direct_results(profiles, replay, pages):
+    market = MarketSearcher("http://replay", replay, max_pages=pages)
+    return {
+        name: {set_name: [market.search_piece(set_name, piece, requirements, "token", {}) for piece in ['armor']]
+               for set_name, requirements in config['sets'].items()}
+        for name, config in profiles.items()
+    }
+
+
+def armor_only(results):
+    return {name: {s: [r for r in rs if r['piece'] == 'armor'] for s, rs in sets.items()}
+            for name, sets in results.items()}
+
+
+def test_derived_results_equal_sent_results():
+    results, batch, _ = run_batch(PROFILES, "token", build_market(), "http://replay", pages=3)
+    assert batch.derived >= 2
+    assert batch.subsume
+    assert summary(armor_only(results)) == summary(direct_results(PROFILES, build_market(), 3))
+
+
+def test_unknown_option_shapes_send_every_query():
+    market = build_market(label=str.upper)
+    results, batch, _ = run_batch(PROFILES, "token", market, "http://replay", pages=3)
+    assert batch.derived == 0
+    assert not batch.subsume
+    assert summary(armor_only(results)) == summary(direct_results(PROFILES, build_market(label=str.upper), 3))
+
+
+def test_lot_options_only_accepts_filter_codes():
+    assert lot_options({'Item': {'options': ['iml', {'code': 'dd'}]}}) == {'iml', 'dd'}
+    assert lot_options({'Item': {'options': []}}) == set()
+    assert lot_options({'Item': {'options': ['MH']}}) is None
+    assert lot_options({'Item': {'options': [3]}}) is None
+    assert lot_options({'Item': None}) is None
+
+
+def test_identical_queries_are_sent_once():
+    profiles = {'a': PROFILES['strict'], 'b': PROFILES['strict']}
+    _, batch, _ = run_batch(profiles, "token", build_market(), "http://replay", pages=1)
+    assert batch.sent == 1
+    assert batch.reused == 1
+
+
+def test_limits_do_not_carry_over_between_profiles():
+    capped = dict(PROFILES['broad'], limits={'max_lots_per_piece': 5})
+    profiles = {'capped': capped, 'uncapped': PROFILES['broad']}
+    results, _, _ = run_batch(profiles, "token", build_market(), "http://replay", pages=3)
+    lots = {name: next(r for r in sets['Leather'] if r['piece'] == 'armor')['lots'] for name, sets in results.items()}
+    assert len(lots['capped']) == 5
+    assert len(lots['uncapped']) > 5
@@ -0,0 +1,54 @@
+from conftest import make_lot
+
+from mudream_checkpoint import ScanCheckpoint
+from mudream_market import MarketSearcher
+from mudream_transport import ReplayTransport
+
+REQUIREMENTS = {'armor': {'options': ['iml'], 'collected': False}, 'pants': {'options': ['iml'], 'collected': False}}
+
+
+def scan_results(recording):
+    path = recording({('Leather', 'armor', ('iml',)): [make_lot(i, {'soul': i + 1, 'dc': 9}) for i in range(12)]})
+    market = MarketSearcher("http://replay", ReplayTransport.from_recording(path))
+    failing = MarketSearcher("http://replay", ReplayTransport.from_recording(path, error_rate=1.0))
+    price_filters = {'Soul': 8, 'DC': 10}
+    return (market.search_piece('Leather', 'armor', REQUIREMENTS, "token", price_filters),
+            failing.search_piece('Leather', 'pants', REQUIREMENTS, "token", price_filters),
+            market.search_piece('Leather', 'helm', REQUIREMENTS, "token", price_filters))
+
+
+def test_results_survive_a_round_trip(recording, tmp_path):
+    armor, pants, helm = scan_results(recording)
+    assert pants['error']
+    assert armor['deal_scores']
+
+    checkpoint = ScanCheckpoint(str(tmp_path / "checkpoint.jsonl"))
+    keys = [('Leather', 'armor'), ('Leather', 'pants'), ('Leather', 'helm'), ('Leather', 'boots')]
+    checkpoint.begin(keys, {'Soul': 8})
+    for result in (armor, pants, helm):
+        checkpoint.record(result)
+
+    state = ScanCheckpoint(checkpoint.path).load()
+    assert state['pieces'] == keys
+    assert state['price_filters'] == {'Soul': 8}
+    assert state['results'][('Leather', 'armor')] == armor
+    assert state['results'][('Leather', 'helm')] == helm
+    assert state['unfinished'] == [('Leather', 'pants'), ('Leather', 'boots')]
+
+
+def test_latest_line_per_piece_wins_and_torn_lines_are_skipped(recording, tmp_path):
+    armor, pants, _ = scan_results(recording)
+    checkpoint = ScanCheckpoint(str(tmp_path / "checkpoint.jsonl"))
+    checkpoint.begin([('Leather', 'pants')], {})
+    checkpoint.record(pants)
+    checkpoint.record(dict(armor, piece='pants'))
+    with open(checkpoint.path, 'a', encoding='utf-8') as f:
+        f.write('{"type": "piece", "set": "Leather", "pie')
+
+    state = checkpoint.load()
+    assert state['unfinished'] == []
+    assert state['results'][('Leather', 'pants')]['lots'] == armor['lots']
+
+
+def test_missing_checkpoint_loads_as_none(tmp_path):
+    assert ScanCheckpoint(str(tmp_path / "none.jsonl")).load() is None
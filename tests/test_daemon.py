@@ -0,0 +1,32 @@
+import json
+
+from conftest import make_lot
+
+from mudream_daemon import MarketDaemon
+from mudream_transport import ReplayTransport
+
+
+def piece_result(snapshot, set_name, piece):
+    return next(r for r in snapshot['results'][set_name] if r['piece'] == piece)
+
+
+def test_price_filters_see_lots_beyond_the_cap(recording, tmp_path):
+    # 100 cheap Soul lots fill the cap; the Life lots only come after them by value
+    lots = [make_lot(i, {'soul': 1}) for i in range(100)] + [make_lot(100 + i, {'life': 2}) for i in range(20)]
+    path = recording({('Leather', 'armor', ('iml',)): lots})
+    config_path = tmp_path / "collection_config.json"
+    config_path.write_text(json.dumps({'sets': {'Leather': {'armor': {'options': ['iml'], 'collected': False}}}}))
+
+    daemon = MarketDaemon(str(config_path), "token", "http://replay", ReplayTransport.from_recording(path),
+                          port=0, pages=3)
+    try:
+        daemon.poll_due()
+        armor = piece_result(daemon.snapshot(['Leather'], {'Life': 2}), 'Leather', 'armor')
+        assert armor['filtered_total'] == 20
+        assert {lot['id'] for lot in armor['lots']} == set(range(100, 120))
+
+        unfiltered = piece_result(daemon.snapshot(['Leather']), 'Leather', 'armor')
+        assert unfiltered['filtered_total'] == 120
+        assert len(unfiltered['lots']) == 100
+    finally:
+        daemon.server.server_close()
@@ -0,0 +1,46 @@
+import random
+
+from conftest import make_lot
+
+from mudream_deals import DealTracker, TDigest
+
+
+def test_digest_quantiles_track_exact_ranks():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(3, 1) for _ in range(20000)]
+    digest = TDigest(compression=100)
+    for value in values:
+        digest.add(value)
+    values.sort()
+    assert len(digest) == len(values)
+    for q in (0.01, 0.05, 0.5, 0.95, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(digest.cdf(exact) - q) < 0.01
+
+
+def test_digest_ignores_infinite_values():
+    digest = TDigest()
+    digest.add(float('inf'))
+    digest.add(float('nan'))
+    assert len(digest) == 0
+    assert digest.cdf(1.0) is None
+
+
+def test_rescans_count_each_listing_once():
+    tracker = DealTracker()
+    lots = [make_lot(i, {'soul': i + 1}) for i in range(10)]
+    assert tracker.observe('Leather', 'armor', lots, lambda lot: lot['Prices'][0]['value']) == 10
+    assert tracker.observe('Leather', 'armor', lots, lambda lot: lot['Prices'][0]['value']) == 0
+    assert tracker.sample_size('Leather', 'armor') == 10
+
+
+def test_rate_changes_do_not_recount_unchanged_listings():
+    tracker = DealTracker()
+    lots = [make_lot(i, {'soul': i + 1}) for i in range(10)]
+    tracker.observe('Leather', 'armor', lots, lambda lot: lot['Prices'][0]['value'])
+    # A new Soul rate changes every computed value but no listing was re-priced
+    assert tracker.observe('Leather', 'armor', lots, lambda lot: lot['Prices'][0]['value'] * 1.5) == 0
+
+    repriced = [make_lot(0, {'soul': 99})] + lots[1:]
+    assert tracker.observe('Leather', 'armor', repriced, lambda lot: lot['Prices'][0]['value']) == 1
+    assert tracker.sample_size('Leather', 'armor') == 11
@@ -0,0 +1,62 @@
+import itertools
+import random
+
+from conftest import make_lot
+
+from mudream_market import PRICE_WEIGHTS
+from mudream_planner import PurchasePlanner, piece_offers
+
+CURRENCIES = ['life', 'soul', 'dc']
+
+
+def random_results(rng, pieces=5, lots=3):
+    results = []
+    for index in range(pieces):
+        piece_lots = []
+        for lot_index in range(lots):
+            codes = rng.sample(CURRENCIES, rng.randint(1, 2))
+            piece_lots.append(make_lot(index * 100 + lot_index, {code: rng.randint(1, 12) for code in codes}))
+        results.append({'piece': f"piece{index}", 'set': 'Random', 'lots': piece_lots})
+    return {'Random': results}
+
+
+def brute_force(all_results, budget):
+    """(pieces bought, normalized cost) of the best plan, trying every combination of every price"""
+    per_piece = []
+    for result in all_results['Random']:
+        offers = [None] + [(price['Currency']['code'], price['value'])
+                           for lot in result['lots'] for price in lot['Prices']]
+        per_piece.append(offers)
+
+    best = (0, 0.0)
+    for combination in itertools.product(*per_piece):
+        spent = {}
+        for offer in combination:
+            if offer is not None:
+                spent[offer[0]] = spent.get(offer[0], 0) + offer[1]
+        if any(value > budget.get(code, 0) for code, value in spent.items()):
+            continue
+        count = sum(1 for offer in combination if offer is not None)
+        cost = sum(PRICE_WEIGHTS[code] * value for code, value in spent.items())
+        if count > best[0] or (count == best[0] and cost < best[1]):
+            best = (count, cost)
+    return best
+
+
+def test_planner_matches_brute_force():
+    rng = random.Random(11)
+    for _ in range(25):
+        all_results = random_results(rng)
+        budget = {code: rng.randint(0, 20) for code in CURRENCIES}
+        plan = PurchasePlanner(budget).solve(all_results)
+        count, cost = brute_force(all_results, budget)
+        assert plan['optimal']
+        assert len(plan['picks']) == count
+        assert abs(plan['normalized_total'] - cost) < 1e-9
+        assert all(plan['spent'][code] <= budget[code] for code in plan['spent'])
+
+
+def test_piece_offers_keep_the_cheapest_lot_per_currency():
+    lots = [make_lot(1, {'soul': 5, 'life': 2}), make_lot(2, {'soul': 3}), make_lot(3, {'life': 4})]
+    offers = piece_offers(lots)
+    assert {code: (value, lot['id']) for code, (value, lot) in offers.items()} == {'soul': (3, 2), 'life': (2, 1)}
@@ -0,0 +1,43 @@
+import threading
+
+from mudream_transport import PrefetchTransport
+
+URL = "http://replay"
+HEADERS = {'Authorization': "Bearer token"}
+
+
+class CountingTransport:
+    def __init__(self, on_post=None):
+        self.calls = 0
+        self.on_post = on_post
+
+    def post(self, url, payload, headers, timeout):
+        self.calls += 1
+        if self.on_post is not None:
+            self.on_post()
+        return b'{"data": {}}'
+
+
+def test_parked_body_is_used_once():
+    inner = CountingTransport()
+    prefetcher = PrefetchTransport(inner)
+    assert prefetcher.prefetch(URL, {'n': 1}, HEADERS, 1)
+    prefetcher.post(URL, {'n': 1}, HEADERS, 1)
+    prefetcher.post(URL, {'n': 1}, HEADERS, 1)
+    assert (inner.calls, prefetcher.hits) == (2, 1)
+
+
+def test_discard_drops_parked_bodies():
+    inner = CountingTransport()
+    prefetcher = PrefetchTransport(inner)
+    prefetcher.prefetch(URL, {'n': 1}, HEADERS, 1)
+    prefetcher.discard()
+    prefetcher.post(URL, {'n': 1}, HEADERS, 1)
+    assert (inner.calls, prefetcher.hits) == (2, 0)
+
+
+def test_bodies_arriving_after_cancel_are_not_parked():
+    cancelled = threading.Event()
+    prefetcher = PrefetchTransport(CountingTransport(on_post=cancelled.set))
+    assert not prefetcher.prefetch(URL, {'n': 1}, HEADERS, 1, cancelled)
+    assert not prefetcher.ready
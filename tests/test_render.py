@@ -0,0 +1,43 @@
+import random
+
+from mudream_render import diff_sections
+
+
+def lot_section(lot_id, price):
+    return (('lot', 'Leather', 'armor', lot_id), [(f"Lot #{lot_id}\n", ()), (f"{price} soul\n", ("price",))])
+
+
+def apply_diff(old_sections, diff):
+    """Apply diff_sections output to a plain list, the way the text widget is updated"""
+    deleted, replaced, inserted = diff
+    sections = [section for section in old_sections if section[0] not in set(deleted)]
+    replacements = {key: segments for key, segments, _ in replaced}
+    sections = [(key, replacements.get(key, segments)) for key, segments in sections]
+    for key, segments, anchor, _ in inserted:
+        keys = [k for k, _ in sections]
+        sections.insert(keys.index(anchor) if anchor is not None else len(sections), (key, segments))
+    return sections
+
+
+def test_applying_the_diff_reproduces_the_new_sections():
+    rng = random.Random(5)
+    for _ in range(200):
+        old = [lot_section(i, rng.randint(1, 3)) for i in rng.sample(range(30), rng.randint(0, 15))]
+        new = [lot_section(i, rng.randint(1, 3)) for i in rng.sample(range(30), rng.randint(0, 15))]
+        old.append((('summary',), [("old summary\n", ())]))
+        new.append((('summary',), [("new summary\n", ())]))
+        assert apply_diff(old, diff_sections(old, new)) == new
+
+
+def test_highlights_new_and_repriced_lots_only():
+    old = [lot_section(1, 5), lot_section(2, 5), lot_section(3, 5)]
+    new = [lot_section(1, 5), lot_section(2, 4), lot_section(4, 5)]
+    deleted, replaced, inserted = diff_sections(old, new)
+    assert deleted == [('lot', 'Leather', 'armor', 3)]
+    assert [(key[3], highlight) for key, _, highlight in replaced] == [(2, 'changed')]
+    assert [(key[3], anchor, highlight) for key, _, anchor, highlight in inserted] == [(4, None, 'new')]
+
+
+def test_identical_sections_need_no_update():
+    sections = [lot_section(1, 5), lot_section(2, 3)]
+    assert diff_sections(sections, list(sections)) == ([], [], [])
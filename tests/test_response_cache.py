@@ -0,0 +1,80 @@
+import json
+import os
+
+from conftest import make_lot
+
+from mudream_transport import DiskCacheTransport, ResponseCache, TransportError
+
+URL = "http://replay"
+PAYLOAD = {'operationName': 'GET_ALL_LOTS', 'variables': {'filter': {'name': 'Leather'}, 'offset': 0}}
+
+
+class StatusTransport:
+    """Answers every request with a fixed HTTP status and body"""
+
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    def post_status(self, url, payload, headers, timeout):
+        return self.status, self.body
+
+    def post(self, url, payload, headers, timeout):
+        return self.body
+
+
+def lots_body(lots):
+    return json.dumps({'data': {'lots': {'Lots': lots, 'Pagination': {'total': len(lots)}}}}).encode('utf-8')
+
+
+def test_cached_bodies_drop_per_account_fields(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    mine = dict(make_lot(1, {'soul': 2}), isMine=True)
+    body = lots_body([mine])
+    assert DiskCacheTransport(StatusTransport(200, body), cache).post(URL, PAYLOAD, {}, 1) == body
+
+    cached = json.loads(cache.post(URL, PAYLOAD, {}, 1))
+    lot = cached['data']['lots']['Lots'][0]
+    assert 'isMine' not in lot
+    assert lot['Prices'] == mine['Prices']
+
+
+def test_only_successful_responses_are_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    DiskCacheTransport(StatusTransport(403, lots_body([])), cache).post(URL, PAYLOAD, {}, 1)
+    errors = json.dumps({'errors': [{'message': 'Unauthorized'}]}).encode('utf-8')
+    DiskCacheTransport(StatusTransport(200, errors), cache).post(URL, PAYLOAD, {}, 1)
+    assert cache.usage() == (0, 0)
+    try:
+        cache.post(URL, PAYLOAD, {}, 1)
+    except TransportError:
+        pass
+    else:
+        raise AssertionError("expected a cache miss")
+
+
+def test_failed_rename_leaves_no_temporary_file(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path))
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, 'replace', failing_replace)
+    cache.put(URL, PAYLOAD, lots_body([make_lot(1, {'soul': 2})]))
+    assert os.listdir(tmp_path) == []
+
+
+def test_refreshing_an_entry_does_not_grow_the_cache(tmp_path):
+    body = lots_body([make_lot(i, {'soul': i + 1}) for i in range(20)])
+    cache = ResponseCache(str(tmp_path))
+    cache.put(URL, PAYLOAD, body)
+    other = dict(PAYLOAD, variables={'filter': {'name': 'Dragon'}, 'offset': 0})
+    cache.put(URL, other, body)
+    _, size = cache.usage()
+    # Room for both entries, but not for one more copy of either
+    cache.max_bytes = size + size // 20
+
+    for _ in range(10):
+        cache.put(URL, PAYLOAD, body)
+    assert cache.usage() == (2, size)
+    assert cache.size == size
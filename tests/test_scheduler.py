@@ -0,0 +1,25 @@
+import pytest
+
+from mudream_daemon import main as daemon_main
+from mudream_scheduler import RefreshScheduler
+
+
+def test_wait_time_counts_down_to_the_next_token():
+    scheduler = RefreshScheduler(min_interval=60, budget_per_minute=30)
+    scheduler.sync([('Leather', 'armor')], 0.0)
+    scheduler.tokens = 0.5
+    scheduler.tokens_at = 0.0
+    assert scheduler.wait_time(0.0) == pytest.approx(1.0)
+
+
+def test_zero_budget_waits_instead_of_dividing_by_zero():
+    scheduler = RefreshScheduler(max_interval=3600, budget_per_minute=0)
+    scheduler.sync([('Leather', 'armor')], 0.0)
+    assert scheduler.next_batch(0.0) == []
+    assert scheduler.wait_time(0.0) == 3600
+
+
+@pytest.mark.parametrize("budget", ["0", "-5"])
+def test_daemon_rejects_a_non_positive_budget(budget):
+    with pytest.raises(SystemExit):
+        daemon_main(["--token", "t", "--budget", budget])
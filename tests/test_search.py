@@ -0,0 +1,102 @@
+from conftest import make_lot
+
+from mudream_market import MarketSearcher
+from mudream_transport import ReplayTransport, TransportError
+
+REQUIREMENTS = {'armor': ['iml', 'dd'], 'pants': ['rd']}
+
+
+def searcher(recording_path, pages=3, **kwargs):
+    return MarketSearcher("http://replay", ReplayTransport.from_recording(recording_path, **kwargs), max_pages=pages)
+
+
+def armor_lots(count):
+    return [make_lot(i, {'soul': 1 + i % 40}) for i in range(count)]
+
+
+def test_follows_pagination_up_to_max_pages(recording):
+    path = recording({('Leather', 'armor', ('iml', 'dd')): armor_lots(120)})
+    result = searcher(path, pages=3).search_piece('Leather', 'armor', REQUIREMENTS, "token", {})
+    assert result['total'] == 120
+
+    limited = searcher(path, pages=2).search_piece('Leather', 'armor', REQUIREMENTS, "token", {})
+    assert limited['total'] == 100
+
+
+def test_queries_with_the_configured_options(recording):
+    path = recording({
+        ('Leather', 'armor', ('iml', 'dd')): armor_lots(3),
+        ('Leather', 'armor', ('iml',)): armor_lots(30)
+    })
+    result = searcher(path).search_piece('Leather', 'armor', REQUIREMENTS, "token", {})
+    assert result['total'] == 3
+
+    other = searcher(path).search_piece('Leather', 'armor', {'armor': {'options': ['iml'], 'collected': False}},
+                                        "token", {})
+    assert other['total'] == 30
+
+
+def test_skips_collected_missing_and_unconfigured_pieces(recording):
+    path = recording({})
+    market = searcher(path)
+    collected = market.search_piece('Leather', 'armor', {'armor': {'options': ['iml'], 'collected': True}}, "t", {})
+    assert collected['skipped'] and collected['collected']
+    assert market.search_piece('Leather', 'boots', REQUIREMENTS, "t", {})['skipped']
+    assert market.transport.request_count == 0
+
+
+def test_price_filter_and_value_order(recording):
+    lots = [
+        make_lot(1, {'soul': 5}),
+        make_lot(2, {'soul': 1}),
+        make_lot(3, {'soul': 3, 'bless': 1}),
+        make_lot(4, {'zen': 1000000}),
+        make_lot(5, {'soul': 2})
+    ]
+    path = recording({('Leather', 'armor', ('iml', 'dd')): lots})
+    result = searcher(path).search_piece('Leather', 'armor', REQUIREMENTS, "token", {'Soul': 3})
+    # Lot 3 also costs Bless, which has no limit; zen-only lot 4 has no zen limit
+    assert [lot['id'] for lot in result['lots']] == [2, 5]
+    assert result['filtered_total'] == 2
+    assert result['total'] == 5
+
+
+def test_max_lots_cap_keeps_the_real_match_count(recording):
+    path = recording({('Leather', 'armor', ('iml', 'dd')): armor_lots(120)})
+    market = searcher(path)
+    market.apply_limits({'max_lots_per_piece': 10})
+    result = market.search_piece('Leather', 'armor', REQUIREMENTS, "token", {})
+    assert len(result['lots']) == 10
+    assert result['filtered_total'] == 120
+    values = [market.calculate_normalized_price(lot) for lot in result['lots']]
+    assert values == sorted(values)
+
+
+def test_graphql_and_http_errors_become_error_results(recording):
+    path = recording({('Leather', 'armor', ('iml', 'dd')): armor_lots(5)})
+    for kind in ('graphql', 'http'):
+        market = searcher(path, error_rate=1.0, error_kind=kind)
+        result = market.search_piece('Leather', 'armor', REQUIREMENTS, "token", {})
+        assert result['error']
+
+
+def test_replay_transport_raises_on_server_errors(recording):
+    path = recording({('Leather', 'armor', ('iml', 'dd')): armor_lots(5)})
+    transport = ReplayTransport.from_recording(path, error_rate=1.0, error_kind='http')
+    try:
+        transport.post("http://replay", {'variables': {}}, {}, 1)
+    except TransportError:
+        pass
+    else:
+        raise AssertionError("expected TransportError")
+
+
+def test_lowering_the_cap_applies_to_unchanged_responses(recording):
+    path = recording({('Leather', 'armor', ('iml', 'dd')): armor_lots(60)})
+    market = searcher(path)
+    assert len(market.search_piece('Leather', 'armor', REQUIREMENTS, "token", {})['lots']) == 60
+
+    market.apply_limits({'max_lots_per_piece': 10})
+    result = market.search_piece('Leather', 'armor', REQUIREMENTS, "token", {})
+    assert not result.get('unchanged')
+    assert len(result['lots']) == 10
@@ -0,0 +1,67 @@
+import json
+
+from conftest import make_lot
+
+from mudream_snapdiff import diff_snapshots
+from mudream_snapshots import SnapshotWriter, lot_row
+
+
+def value_of(lot):
+    return lot['Prices'][0]['value']
+
+
+def write_scan(directory, pieces):
+    """Snapshot of one scan covering {(set, piece): lots}"""
+    writer = SnapshotWriter(str(directory))
+    writer.begin_scan()
+    for (set_name, piece), lots in pieces.items():
+        writer(set_name, piece, lots, value_of)
+    return writer.end_scan()
+
+
+def changes(old_path, new_path):
+    return sorted((c['change'], c['set'], c['piece'], c.get('id')) for c in diff_snapshots(old_path, new_path))
+
+
+def test_new_removed_and_repriced_lots(tmp_path):
+    old = write_scan(tmp_path / "old", {('A', 'armor'): [make_lot(1, {'soul': 2}), make_lot(2, {'soul': 3})]})
+    new = write_scan(tmp_path / "new", {('A', 'armor'): [make_lot(2, {'soul': 4}), make_lot(3, {'soul': 1})]})
+    assert changes(old, new) == [
+        ('new', 'A', 'armor', 3),
+        ('removed', 'A', 'armor', 1),
+        ('repriced', 'A', 'armor', 2)
+    ]
+
+
+def test_pieces_not_rescanned_are_not_reported_gone(tmp_path):
+    old = write_scan(tmp_path / "old", {
+        ('A', 'armor'): [make_lot(1, {'soul': 2})],
+        ('B', 'armor'): [make_lot(10, {'soul': 2}), make_lot(11, {'soul': 3})],
+        ('C', 'boots'): [make_lot(20, {'soul': 2})]
+    })
+    # Only set A was scanned again; C's boots were scanned and found empty
+    new = write_scan(tmp_path / "new", {('A', 'armor'): [make_lot(1, {'soul': 2})], ('C', 'boots'): []})
+
+    found = list(diff_snapshots(old, new))
+    assert [(c['change'], c['set'], c.get('id')) for c in found if c['change'] == 'removed'] == [('removed', 'C', 20)]
+    assert [c for c in found if c['change'] == 'not_compared'] == [
+        {'change': 'not_compared', 'set': 'B', 'piece': 'armor', 'lots': 2}
+    ]
+
+
+def test_snapshots_without_coverage_rows_use_the_listed_pieces(tmp_path):
+    def write_rows(path, pieces):
+        with open(path, 'w', encoding='utf-8') as f:
+            for (set_name, piece), lots in pieces.items():
+                for lot in lots:
+                    f.write(json.dumps(lot_row(0, set_name, piece, lot, value_of(lot))) + "\n")
+        return str(path)
+
+    old = write_rows(tmp_path / "old.jsonl", {('A', 'armor'): [make_lot(1, {'soul': 2})],
+                                              ('B', 'armor'): [make_lot(10, {'soul': 2})]})
+    new = write_rows(tmp_path / "new.jsonl", {('A', 'armor'): [make_lot(2, {'soul': 2})]})
+    assert changes(old, new) == [
+        ('new', 'A', 'armor', 2),
+        ('not_compared', 'B', 'armor', None),
+        ('removed', 'A', 'armor', 1)
+    ]